@@ -1,15 +1,19 @@
 import sys
 import os
 import threading
+import multiprocessing
 from PyQt6 import uic
 from PyQt6.QtWidgets import QApplication, QMainWindow, QMessageBox
 from PyQt6.QtCore import QTimer, pyqtSignal, QObject
 from PyQt6.QtGui import QPixmap, QIcon
 from browser_automation import BrowserAutomation
+from browser_service import BrowserService
+from config import AUTOMATION_ENGINE_ASYNC
 from logger import AutomationLogger
 from logs_window import LogsWindow
 from settings_manager import SettingsManager
 from settings_window import SettingsWindow
+from case_store import CaseStore
 
 def resource_path(relative_path):
     """Get absolute path to resource, works for dev and for PyInstaller"""
@@ -42,6 +46,8 @@ class MainWindow(QMainWindow):
         
         self.automation = None
         self.logger = AutomationLogger(settings_manager=self.settings_manager)
+        self.browser_service = BrowserService(self.logger)
+        self.browser_service.start()
         self.worker_signals = WorkerSignals()
         
         self.setup_connections()
@@ -97,16 +103,36 @@ class MainWindow(QMainWindow):
             QMessageBox.critical(self, "Error", "Por favor ingrese usuario y contraseña")
             return
         
+        resume = False
+        try:
+            case_store = CaseStore()
+            has_unfinished = case_store.has_unfinished_cases()
+            case_store.close()
+        except Exception as e:
+            self.logger.warning(f"No se pudo consultar el almacén local de casos: {str(e)}")
+            has_unfinished = False
+        
+        if has_unfinished:
+            reply = QMessageBox.question(self, "Ejecución interrumpida",
+                                       "Hay casos pendientes de una ejecución anterior.\n\n¿Desea reanudarlos sin volver a leer Google Sheets?",
+                                       QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
+            resume = reply == QMessageBox.StandardButton.Yes
+        
         self.startAutomation.setEnabled(False)
         self.startAutomation.setText("Ejecutando...")
         self.stopAutomation.setEnabled(True)
         self.stopAutomation.setText("Detener")
         
-        thread = threading.Thread(target=self.run_automation, args=(username, password))
-        thread.daemon = True
-        thread.start()
+        if self.settings_manager.get_automation_engine() == AUTOMATION_ENGINE_ASYNC:
+            thread = threading.Thread(target=self.run_automation, args=(username, password, resume))
+            thread.daemon = True
+            thread.start()
+        else:
+            # El navegador abierto pertenece al hilo del servicio: la ejecución corre en ese hilo
+            self.browser_service.submit(self.run_automation, username, password, resume)
     
-    def run_automation(self, username, password):
+    def run_automation(self, username, password, resume=False):
+        warm_browser = False
         try:
             self.logger.info("Iniciando automatización")
             self.worker_signals.status_update.emit("Iniciando automatización...", "orange")
@@ -114,32 +140,50 @@ class MainWindow(QMainWindow):
             self.logger.info("Creando instancia de BrowserAutomation")
             self.automation = BrowserAutomation(self.logger, self.settings_manager)
 
-            self.logger.info("Leyendo datos de Excel")
-            self.worker_signals.status_update.emit("Leyendo datos de Excel...", "orange")
-            excel_data = self.automation.read_excel_data()
+            if resume:
+                self.logger.info("Reanudando casos pendientes desde el almacén local")
+                self.worker_signals.status_update.emit("Reanudando ejecución anterior...", "orange")
+                excel_data = self.automation.resume_from_store()
+            else:
+                self.logger.info("Leyendo datos de Excel")
+                self.worker_signals.status_update.emit("Leyendo datos de Excel...", "orange")
+                excel_data = self.automation.read_excel_data()
 
-            self.logger.info("Iniciando navegador")
-            self.worker_signals.status_update.emit("Iniciando navegador...", "orange")
-            self.automation.start_browser()
-            
-            self.logger.info("Navegando a página de login")
-            self.worker_signals.status_update.emit("Navegando a login...", "orange")
-            self.automation.navigate_to_login()
-            
-            self.logger.info("Completando formulario de login")
-            self.worker_signals.status_update.emit("Completando login...", "orange")
-            self.automation.fill_login_form(username, password)
-            
-            self.logger.info("Haciendo clic en botón OME")
-            self.worker_signals.status_update.emit("Navegando a OME...", "orange")
-            self.automation.click_ome_button()
-            
-            self.logger.info("Haciendo clic en Panel de prestaciones")
-            self.worker_signals.status_update.emit("Navegando a Panel...", "orange")
-            self.automation.click_panel_prestaciones()
+            if self.settings_manager.get_process_workers() > 1:
+                self.worker_signals.status_update.emit("Procesando en varios procesos...", "orange")
+                self.automation.process_in_worker_processes(username, password, excel_data)
+            elif self.settings_manager.get_automation_engine() == AUTOMATION_ENGINE_ASYNC:
+                self.worker_signals.status_update.emit("Procesando con el motor asíncrono...", "orange")
+                self.automation.process_with_async_engine(username, password, excel_data)
+            else:
+                self.logger.info("Preparando navegador")
+                self.worker_signals.status_update.emit("Preparando navegador...", "orange")
+                warm_browser = True
+                reused_page = self.browser_service.prepare(self.automation, username)
+
+                if not reused_page:
+                    self.worker_signals.status_update.emit("Verificando sesión guardada...", "orange")
+                if not reused_page and not self.automation.open_saved_session(username, password):
+                    self.logger.info("Navegando a página de login")
+                    self.worker_signals.status_update.emit("Navegando a login...", "orange")
+                    self.automation.navigate_to_login()
+                
+                    self.logger.info("Completando formulario de login")
+                    self.worker_signals.status_update.emit("Completando login...", "orange")
+                    self.automation.fill_login_form(username, password)
+                
+                    self.logger.info("Haciendo clic en botón OME")
+                    self.worker_signals.status_update.emit("Navegando a OME...", "orange")
+                    self.automation.click_ome_button()
+                
+                    self.logger.info("Haciendo clic en Panel de prestaciones")
+                    self.worker_signals.status_update.emit("Navegando a Panel...", "orange")
+                    self.automation.click_panel_prestaciones()
+                    self.automation.save_session(username, password)
 
-            self.worker_signals.status_update.emit("Loopeando sobre el excel", "orange")
-            self.automation.process_excel_data(excel_data)
+                self.automation.remember_credentials(username, password)
+                self.worker_signals.status_update.emit("Loopeando sobre el excel", "orange")
+                self.automation.process_excel_data(excel_data)
 
             self.logger.info("Automatización completada exitosamente")
             self.worker_signals.status_update.emit("Automatización completada", "green")
@@ -152,7 +196,10 @@ class MainWindow(QMainWindow):
         
         finally:
             if self.automation:
-                self.automation.close_browser()
+                if warm_browser:
+                    self.browser_service.release(self.automation, username)
+                else:
+                    self.automation.close_browser()
             self.worker_signals.automation_finished.emit()
     
     def stop_automation(self):
@@ -178,7 +225,9 @@ class MainWindow(QMainWindow):
         failed_rows = getattr(self.automation, 'failed_rows', [])
         already_processed = getattr(self.automation, 'already_processed_cases', [])
         
-        log_file = self.logger.save_to_excel(processed_rows, failed_rows, already_processed)
+        run_report = self.automation.build_run_report() if self.automation else None
+        
+        log_file = self.logger.save_to_excel(processed_rows, failed_rows, already_processed, run_report)
         if log_file:
             self.logger.info(f"Log guardado en: {log_file}")
     
@@ -190,7 +239,12 @@ class MainWindow(QMainWindow):
         settings_window = SettingsWindow(self.settings_manager, self)
         settings_window.exec()
 
+    def closeEvent(self, event):
+        self.browser_service.stop()
+        super().closeEvent(event)
+
 def main():
+    multiprocessing.freeze_support()
     app = QApplication(sys.argv)
     
     app.setApplicationName("Pami Automation")
@@ -0,0 +1,630 @@
+import asyncio
+import os
+import sys
+from playwright.async_api import async_playwright
+from config import *
+from browser_automation import (AutomationError, TABLE_SNAPSHOT_SCRIPT, MODAL_OPTIONS_READY_SCRIPT,
+                                ROW_BUTTONS_READY_SCRIPT, can_check_results, match_practica, row_without_buttons, stale_result_ids,
+                                table_rows, table_snapshot_args, transmit_buttons_args, validation_button_args)
+from case_outcomes import (CaseOutcome, ROW_ALREADY_COMPLETED, ROW_PROCESSED, UPLOAD_DONE, UPLOAD_STATE_LOGS,
+                           UPLOAD_UNKNOWN, VALIDATION_STATE_LOGS, ready_to_transmit, upload_state, validation_state)
+from case_store import CaseStore
+from case_records import group_cases_by_ndo
+from retry_scheduler import ERROR_CLASS_LABELS
+
+# Reads the upload modal's document type options in one call
+MODAL_OPTIONS_SCRIPT = """
+(selector) => Array.from(document.querySelectorAll(selector + ' option'))
+    .map((option) => ({text: option.textContent, value: option.getAttribute('value')}))
+"""
+
+
+class AsyncBrowserAutomation:
+    """asyncio engine for the per-case portal work, on playwright.async_api.
+
+    Cases run concurrently on several tabs of one logged-in context (as many
+    as the tab workers setting), so page waits, informe downloads and status
+    writes of different cases overlap on one event loop. Blocking work
+    (SQLite, status writes handed to the case source's writer, the streaming
+    informe downloader) runs in worker threads.
+
+    It is driven from a BrowserAutomation that has already read the cases
+    (see BrowserAutomation.process_with_async_engine) and reuses its case
+    source, store, pacing, result lists, retry scheduler and run report.
+    Failed cases with retry budget left go back into the tabs' queue once
+    their backoff elapses, after a check that the portal session is still
+    valid.
+    """
+
+    def __init__(self, automation):
+        self.automation = automation
+        self.settings_manager = automation.settings_manager
+        self.case_store = automation.case_store
+        self.pacer = automation.pacer
+        self.portal_waits = automation.portal_waits
+        self.playwright = None
+        self.browser = None
+        self.context = None
+        self.informe_cache = None
+        self.prefetch_depth = 0
+        self.case_groups = []
+        self.group_numbers = {}
+        self.informe_tasks = {}
+        self.last_searches = {}
+        self.retry_scheduler = automation.retry_scheduler
+        self.retries_enabled = False
+        self.credentials = None
+        self.session_lock = None
+
+    def log(self, level, message, screenshot_path=None):
+        self.automation.log(level, message, screenshot_path)
+
+    async def pace(self, kind, seconds=None):
+        return await self.pacer.async_wait(kind, seconds)
+
+    @property
+    def stop_requested(self):
+        return self.automation.stop_requested
+
+    async def run(self, username, password, excel_data):
+        self.automation.processed_rows = []
+        self.automation.failed_rows = []
+        self.case_groups = group_cases_by_ndo(excel_data)
+        self.group_numbers = {index: (number, row) for number, cases in enumerate(self.case_groups) for index, row in cases}
+        self.retries_enabled = self.automation.case_retries_enabled()
+        self.credentials = (username, password)
+        self.session_lock = asyncio.Lock()
+        self.informe_cache = self.automation.open_informe_cache()
+        self.prefetch_depth = self.settings_manager.get_informe_prefetch_depth() if self.settings_manager else INFORME_PREFETCH_DEPTH
+        self.playwright = await async_playwright().start()
+        try:
+            await self.start_browser()
+            ome_page = await self.open_saved_session(username, password)
+            if ome_page is None:
+                ome_page = await self.login(username, password)
+                await self.open_panel(ome_page)
+                await self.save_session(username, password, ome_page)
+
+            tab_count = self.settings_manager.get_tab_workers() if self.settings_manager else TAB_WORKERS
+            tab_count = max(1, min(tab_count, len(self.case_groups)))
+            if tab_count > 1:
+                rate_ceiling = self.settings_manager.get_portal_rate_ceiling() if self.settings_manager else PORTAL_RATE_CEILING
+                self.pacer.limit_rate(rate_ceiling)
+
+            queue = asyncio.Queue()
+            for group_number, cases in enumerate(self.case_groups):
+                queue.put_nowait((group_number, cases, False))
+
+            pages = [ome_page]
+            for _ in range(tab_count - 1):
+                page = await self.new_tab(ome_page.url)
+                await self.open_panel(page)
+                pages.append(page)
+
+            self.log("info", f"Motor asíncrono: {len(excel_data)} casos ({len(self.case_groups)} NDO) en {len(pages)} pestañas")
+            await asyncio.gather(*(self.case_worker(number, page, queue) for number, page in enumerate(pages, start=1)))
+
+            if not queue.empty() and not self.stop_requested:
+                self.log("warning", f"{queue.qsize()} NDO quedaron sin procesar - Se retomarán en la próxima ejecución")
+            if self.stop_requested and self.retry_scheduler.pending():
+                self.log("info", f"Parada solicitada - {self.retry_scheduler.pending()} casos en espera de reintento quedan para la próxima ejecución")
+        finally:
+            await self.close()
+
+    async def start_browser(self):
+        self.log("info", "Lanzando navegador Chromium (motor asíncrono)")
+        if hasattr(sys, '_MEIPASS'):
+            browsers_path = os.path.join(sys._MEIPASS, 'playwright', 'driver', 'package', '.local-browsers')
+            if os.path.exists(browsers_path):
+                os.environ['PLAYWRIGHT_BROWSERS_PATH'] = browsers_path
+        self.browser = await self.playwright.chromium.launch(headless=self.automation.headless(),
+                                                             args=self.automation.resource_launch_args())
+
+    async def new_context(self, storage_state=None):
+        self.context = await self.browser.new_context(storage_state=storage_state)
+        self.context.set_default_timeout(self.settings_manager.get_browser_timeout() if self.settings_manager else BROWSER_TIMEOUT)
+        await self.automation.resource_router.install_async(self.context)
+        return self.context
+
+    async def watch_page(self, page):
+        self.pacer.watch_page(page)
+        await self.automation.resource_router.watch_page_async(page)
+
+    async def open_saved_session(self, username, password):
+        """OME page on transmision.php through the saved session, or None when a login is needed"""
+        if not self.automation.saved_session_enabled():
+            return None
+        session_store = self.automation.session_store
+        saved = await asyncio.to_thread(session_store.load, username, password)
+        if not saved:
+            return None
+
+        self.log("info", "Verificando sesión guardada del portal")
+        context = await self.new_context(saved['storage_state'])
+        try:
+            response = await context.request.get(saved['transmision_url'], max_redirects=0, timeout=10000)
+            if not response.ok or SESSION_PROBE_MARKER not in await response.text():
+                self.log("info", "La sesión guardada venció - Iniciando sesión nuevamente")
+                await asyncio.to_thread(session_store.delete, username)
+                await context.close()
+                return None
+
+            page = await context.new_page()
+            await self.watch_page(page)
+            await self.portal_waits.async_step(page, "apertura con sesión guardada",
+                                               lambda: page.goto(saved['transmision_url']),
+                                               response_urls=PANEL_RESPONSE_URLS, load_state="load", fallback_kind="medium")
+            await page.wait_for_selector(AFILIADO_DROPDOWN, state="visible", timeout=10000)
+        except Exception as e:
+            self.log("warning", f"No se pudo usar la sesión guardada - Iniciando sesión nuevamente: {str(e)}")
+            await context.close()
+            return None
+
+        self.log("info", f"Sesión guardada válida - Panel de prestaciones abierto sin login: {page.url}")
+        return page
+
+    async def save_session(self, username, password, page):
+        if not self.automation.saved_session_enabled():
+            return
+        try:
+            storage_state = await self.context.storage_state()
+            await asyncio.to_thread(self.automation.session_store.save, username, password, storage_state, page.url)
+            self.log("info", "Sesión del portal guardada para la próxima ejecución")
+        except Exception as e:
+            self.log("warning", f"No se pudo guardar la sesión del portal: {str(e)}")
+
+    async def login(self, username, password):
+        await self.new_context()
+        return await self.sign_in(username, password)
+
+    async def sign_in(self, username, password):
+        """Log in on a new page of the current context; returns the OME page"""
+        page = await self.context.new_page()
+        await page.goto(LOGIN_URL)
+        await page.wait_for_selector(LOGIN_USERNAME_FIELD, state="visible")
+        await page.fill(LOGIN_USERNAME_FIELD, username)
+        await page.fill(LOGIN_PASSWORD_FIELD, password)
+        await self.portal_waits.async_step(page, "login", lambda: page.click(LOGIN_SUBMIT_BUTTON),
+                                           response_urls=LOGIN_RESPONSE_URLS, load_state="load",
+                                           fixed_delay=self.pacer.compute_delay("settle", 3))
+
+        page_content = (await page.content()).lower()
+        for error_indicator in ERROR_INDICATORS:
+            if error_indicator in page_content:
+                raise AutomationError(f"Login failed: {error_indicator}")
+        try:
+            await page.wait_for_selector(OME_BUTTON, state="visible", timeout=5000)
+        except Exception:
+            raise AutomationError("Login failed: OME button not found")
+        self.log("info", "Login exitoso: Botón OME encontrado")
+
+        async with self.context.expect_page() as new_page_info:
+            await page.click(OME_BUTTON)
+        ome_page = await new_page_info.value
+        await ome_page.wait_for_load_state("load")
+        await self.watch_page(ome_page)
+        return ome_page
+
+    async def new_tab(self, ome_url):
+        page = await self.context.new_page()
+        await self.watch_page(page)
+        await page.goto(ome_url)
+        return page
+
+    async def open_panel(self, page):
+        await page.wait_for_selector(PANEL_PRESTACIONES_LINK, state="visible")
+        await self.portal_waits.async_step(page, "panel de prestaciones", lambda: page.click(PANEL_PRESTACIONES_LINK),
+                                           response_urls=PANEL_RESPONSE_URLS, load_state="load", fallback_kind="medium")
+
+    async def close(self):
+        for task in self.informe_tasks.values():
+            task.cancel()
+        self.informe_tasks = {}
+        try:
+            if self.browser:
+                await self.browser.close()
+        finally:
+            await self.playwright.stop()
+
+    async def case_worker(self, number, page, queue):
+        first_case = True
+        while not self.stop_requested:
+            item = await self.next_group(queue)
+            if item is None:
+                break
+            group_number, cases, retried = item
+            if not first_case:
+                delay = await self.pace("long")
+                self.log("info", f"Pestaña {number}: Esperando {delay:.1f} segundos antes del siguiente caso")
+                if self.stop_requested:
+                    queue.put_nowait((group_number, cases, retried))
+                    break
+            first_case = False
+            if retried:
+                await self.ensure_portal_session(page)
+            await self.process_patient(page, group_number, cases)
+
+    async def next_group(self, queue):
+        """(group_number, cases, retried): queued NDOs first, then retries whose backoff elapsed.
+
+        While retries are still waiting the tab sleeps instead of finishing,
+        so the last tab left picks them up.
+        """
+        while not self.stop_requested:
+            if self.retries_enabled:
+                for group_number, cases in self.retry_scheduler.due():
+                    queue.put_nowait((group_number, cases, True))
+            try:
+                return queue.get_nowait()
+            except asyncio.QueueEmpty:
+                pass
+            if not self.retries_enabled or not self.retry_scheduler.pending():
+                return None
+            await asyncio.sleep(min(1.0, max(self.retry_scheduler.seconds_until_next(), 0.05)))
+        return None
+
+    async def ensure_portal_session(self, page):
+        """Log in again on the shared context before a retry when the portal session expired"""
+        async with self.session_lock:
+            try:
+                response = await page.context.request.get(page.url, max_redirects=0, timeout=10000)
+                if response.ok and SESSION_PROBE_MARKER in await response.text():
+                    return
+            except Exception as e:
+                self.log("warning", f"No se pudo verificar la sesión del portal antes de reintentar: {str(e)}")
+                return
+
+            self.log("warning", "La sesión del portal venció - Iniciando sesión nuevamente antes de reintentar")
+            ome_page = await self.sign_in(*self.credentials)
+            login_page = await ome_page.opener()
+            await page.goto(ome_page.url)
+            await self.open_panel(page)
+            for extra_page in (ome_page, login_page):
+                if extra_page is not None:
+                    await extra_page.close()
+
+    async def take_screenshot(self, page, description="error"):
+        try:
+            return await self.automation.screenshots.capture_async(page, description)
+        except Exception as e:
+            self.log("error", f"Failed to take screenshot: {str(e)}")
+        return None
+
+    async def finish_case(self, index, row_data, value):
+        self.release_informe(index)
+        if value == 'Si':
+            self.automation.processed_rows.append(row_data)
+            await asyncio.to_thread(self.automation.update_case_status, index, value)
+            self.retry_scheduler.record_success(index)
+            return
+        if await self.schedule_retry(index, row_data):
+            return
+        self.automation.failed_rows.append(row_data)
+        await asyncio.to_thread(self.automation.update_case_status, index, value)
+
+    async def schedule_retry(self, index, row_data):
+        """Send a failed case to the delayed retry queue instead of marking it 'No'; False when it must fail"""
+        if not self.retries_enabled or index not in self.group_numbers:
+            return False
+        group_number, row = self.group_numbers[index]
+        stage = await asyncio.to_thread(self.case_store.stage, CaseStore.case_key(row))
+        error_class, retry, delay = self.retry_scheduler.schedule(group_number, index, row, row_data, stage)
+        if retry is None:
+            return False
+        self.log("warning", f"NDO {row.get('NDO')}: Error {ERROR_CLASS_LABELS[error_class]} ({row_data.get('Status')}) - "
+                            f"Reintento {retry}/{self.retry_scheduler.budgets[error_class]} en {delay:.0f} segundos")
+        return True
+
+    async def process_patient(self, page, group_number, cases):
+        """Search one NDO once, then handle each of its sheet rows against that results table"""
+        first_index, first_row = cases[0]
+        ndo = first_row.get('NDO', f'Fila_{first_index + 1}')
+        self.log("info", f"Iniciando procesamiento de NDO: {ndo} (Filas {', '.join(str(index + 1) for index, _ in cases)})")
+        for _, row in cases:
+            await asyncio.to_thread(self.case_store.start_attempt, CaseStore.case_key(row))
+        self.prefetch_informes(group_number)
+
+        matched_ids, data_id_hints = set(), {}
+        cache_ttl = self.automation.search_cache_ttl()
+        if cache_ttl:
+            cases, matched_ids, data_id_hints = await asyncio.to_thread(
+                self.automation.resolve_from_search_cache, ndo, cases, cache_ttl)
+            if not cases:
+                return
+
+        try:
+            # only a table told apart from the previous NDO's results is safe to reuse in a later run
+            checked = can_check_results(ndo, self.last_searches.get(page))
+            table_data = await self.search(page, ndo)
+            if table_data and cache_ttl and checked:
+                await asyncio.to_thread(self.case_store.save_search, ndo, table_data)
+        except Exception as e:
+            screenshot_path = await self.take_screenshot(page, f"error_ndo_{ndo}")
+            self.log("error", f"NDO {ndo}: Error en procesamiento - {str(e)}", screenshot_path)
+            for index, _ in cases:
+                await self.finish_case(index, *CaseOutcome(ndo).error(e, screenshot_path))
+            return
+
+        for position, (index, row) in enumerate(cases):
+            if position > 0:
+                if self.stop_requested:
+                    self.log("info", f"Parada solicitada - NDO {ndo}: quedan {len(cases) - position} casos para la próxima ejecución")
+                    return
+                await self.pace("micro")
+                try:
+                    table_data = await self.snapshot_table_rows(page) or table_data
+                except Exception as e:
+                    self.log("warning", f"NDO {ndo}: No se pudo releer la tabla, se usan los datos de la búsqueda: {str(e)}")
+            await self.process_case(page, index, row, table_data, matched_ids, data_id_hints.get(index))
+
+    async def process_case(self, page, index, row, table_data, matched_ids, data_id_hint=None):
+        ndo = row.get('NDO', f'Fila_{index + 1}')
+        cod_excel = row.get('CODIGO_PAMI', '')
+        case_key = CaseStore.case_key(row)
+        outcome = CaseOutcome(ndo, cod_excel, len(table_data))
+
+        try:
+            if not table_data:
+                self.log("warning", f"NDO {ndo}: No se encontraron datos en la tabla.")
+                await self.finish_case(index, *outcome.no_results())
+                return
+
+            matching_row = match_practica(table_data, cod_excel, matched_ids, data_id_hint)
+            if not matching_row:
+                self.log("warning", f"NDO {ndo}: COD {cod_excel} no encontrado en ninguna fila de la tabla")
+                await self.finish_case(index, *outcome.cod_not_found())
+                return
+
+            self.log("info", f"NDO {ndo}: COD {cod_excel} encontrado en la tabla.")
+            matched_ids.add(matching_row.get('data_id'))
+            await asyncio.to_thread(self.case_store.set_stage, case_key, 'matched', matching_row.get('data_id'))
+            await self.pace("micro")
+            matching_row.update(await self.current_row_buttons(page, ndo, matching_row.get('data_id')))
+            await self.handle_matched_row(page, index, row, case_key, outcome, matching_row)
+
+        except Exception as e:
+            screenshot_path = await self.take_screenshot(page, f"error_ndo_{ndo}")
+            self.log("error", f"NDO {ndo}: Error en procesamiento - {str(e)}", screenshot_path)
+            await self.finish_case(index, *outcome.error(e, screenshot_path))
+
+    async def handle_matched_row(self, page, index, row, case_key, outcome, matching_row):
+        ndo = outcome.ndo
+        button_status = validation_state(matching_row)
+        self.log("info", f"NDO {ndo}: {VALIDATION_STATE_LOGS[button_status]}")
+        if button_status == ROW_ALREADY_COMPLETED:
+            await self.finish_case(index, *outcome.already_completed())
+            return
+        if button_status == ROW_PROCESSED:
+            await self.finish_case(index, *outcome.already_processed())
+            return
+
+        upload_status = upload_state(matching_row)
+        self.log("info", f"NDO {ndo}: {UPLOAD_STATE_LOGS[upload_status]}")
+        if upload_status == UPLOAD_UNKNOWN:
+            await self.finish_case(index, *outcome.unknown_upload(upload_status))
+            return
+
+        already_uploaded = upload_status == UPLOAD_DONE
+        if not already_uploaded:
+            informe_url = row.get('Informe', '')
+            if not informe_url:
+                self.log("error", f"NDO {ndo}: No se encontró URL de informe en el Excel")
+                await self.finish_case(index, *outcome.missing_informe_url())
+                return
+
+            await asyncio.to_thread(self.case_store.set_stage, case_key, 'uploading')
+            await asyncio.to_thread(self.case_store.invalidate_search, ndo)
+            uploaded, screenshot_path = await self.upload_informe(page, ndo, matching_row, informe_url)
+            if not uploaded:
+                await self.finish_case(index, *outcome.upload_failed(screenshot_path))
+                return
+
+        await asyncio.to_thread(self.case_store.set_stage, case_key, 'transmitting')
+        await asyncio.to_thread(self.case_store.invalidate_search, ndo)
+        transmitted, screenshot_path = await self.transmit(page, ndo, matching_row)
+        if transmitted:
+            await self.finish_case(index, *outcome.transmitted(already_uploaded))
+        else:
+            await self.finish_case(index, *outcome.transmit_failed(already_uploaded, screenshot_path))
+
+    async def search(self, page, ndo):
+        await page.wait_for_selector(AFILIADO_DROPDOWN, state="visible")
+        await page.select_option(AFILIADO_DROPDOWN, value=AFILIADO_DROPDOWN_VALUE)
+        await self.pace("micro")
+
+        await page.wait_for_selector(FECHA_TURNO_FIELD, state="visible")
+        await page.click(FECHA_TURNO_FIELD)
+        await page.fill(FECHA_TURNO_FIELD, "")
+        await page.type(FECHA_TURNO_FIELD, get_first_day_of_month(), delay=100)
+        await page.press(FECHA_TURNO_FIELD, "Enter")
+        await self.pace("short")
+
+        await page.wait_for_selector(AFILIADO_NUMBER_FIELD, state="visible")
+        await page.fill(AFILIADO_NUMBER_FIELD, str(ndo))
+        await self.pace("micro")
+
+        await page.wait_for_selector(SEARCH_BUTTON, state="visible")
+        searched = await self.portal_waits.async_step(page, "búsqueda", lambda: page.click(SEARCH_BUTTON), ndo=ndo,
+                                                      response_urls=SEARCH_RESPONSE_URLS,
+                                                      mutation_selector=ORDERS_TABLE_BODY, fallback_kind="short")
+        if not searched:
+            raise AutomationError(f"La búsqueda del NDO {ndo} no actualizó la tabla de resultados")
+        await page.wait_for_selector(RESULTS_TABLE, state="visible", timeout=10000)
+        table_data = await self.snapshot_table_rows(page)
+        last_search = self.last_searches.get(page)
+        if stale_result_ids(ndo, table_data, last_search):
+            raise AutomationError(f"La tabla de resultados todavía muestra órdenes del NDO {last_search[0]}")
+        self.last_searches[page] = (ndo, {row.get('data_id') for row in table_data})
+        self.log("info", f"NDO {ndo}: Extracción de tabla completada. {len(table_data)} filas procesadas")
+        return table_data
+
+    async def snapshot_table_rows(self, page, data_id=None):
+        return table_rows(await page.evaluate(TABLE_SNAPSHOT_SCRIPT, table_snapshot_args(data_id)))
+
+    async def current_row_buttons(self, page, ndo, data_id):
+        """Re-read the row's buttons, waiting up to VALIDATION_BUTTON_TIMEOUT for its validation button"""
+        current_rows = await self.snapshot_table_rows(page, data_id)
+        button = current_rows[0].get('validation_button') if current_rows else None
+        if not button or not button['visible']:
+            try:
+                await page.wait_for_function(ROW_BUTTONS_READY_SCRIPT, arg=validation_button_args(data_id),
+                                             timeout=VALIDATION_BUTTON_TIMEOUT)
+            except Exception:
+                self.log("info", f"NDO {ndo}: El botón de validación no apareció en {VALIDATION_BUTTON_TIMEOUT / 1000:.0f} segundos")
+                return row_without_buttons()
+            current_rows = await self.snapshot_table_rows(page, data_id)
+        return current_rows[0] if current_rows else row_without_buttons()
+
+    def prefetch_informes(self, group_number):
+        """Start downloading the informes of this NDO's other cases and of the next queued cases"""
+        current = self.case_groups[group_number][1:]
+        upcoming = [case for cases in self.case_groups[group_number + 1:] for case in cases]
+        for _, row in current + upcoming[:self.prefetch_depth]:
+            url = row.get('Informe', '')
+            if isinstance(url, str) and url.strip() and url not in self.informe_tasks:
+                self.informe_tasks[url] = asyncio.ensure_future(self.fetch_informe(url))
+
+    def release_informe(self, index):
+        """Cancel the prefetch of a finished case's informe if it was never used"""
+        if index not in self.group_numbers:
+            return
+        task = self.informe_tasks.pop(self.group_numbers[index][1].get('Informe', ''), None)
+        if task is not None and not task.done():
+            task.cancel()
+
+    async def fetch_informe(self, url):
+        """Cached informe for url; a miss is streamed to disk by the pooled downloader in a thread"""
+        return await asyncio.to_thread(self.informe_cache.fetch, url)
+
+    async def download_informe(self, ndo, informe_url):
+        """Return the informe's cached file path (prefetched when possible) or None"""
+        try:
+            task = self.informe_tasks.pop(informe_url, None)
+            if task is not None:
+                try:
+                    filepath = await task
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    self.log("warning", f"NDO {ndo}: Descarga anticipada fallida, se reintenta: {str(e)}")
+                    filepath = await self.fetch_informe(informe_url)
+            else:
+                filepath = await self.fetch_informe(informe_url)
+            self.log("info", f"NDO {ndo}: Archivo disponible: {filepath}")
+            return filepath
+        except Exception as e:
+            self.log("error", f"NDO {ndo}: Error descargando el archivo: {str(e)}")
+            return None
+
+    async def upload_informe(self, page, ndo, matching_row, informe_url):
+        download = asyncio.ensure_future(self.download_informe(ndo, informe_url))
+        try:
+            row_selector = f"{TABLE_ROWS}[data-id='{matching_row.get('data_id')}']"
+            options_ready = (MODAL_OPTIONS_READY_SCRIPT, {'selector': MODAL_DOCTYPE_DROPDOWN, 'text': INFORME_OPTION_TEXT})
+            await self.pace("micro")
+            await self.portal_waits.async_step(page, "modal de carga", lambda: page.click(f"{row_selector} {UPLOAD_BUTTON}"),
+                                               ndo=ndo, condition=options_ready, fallback_kind="short")
+            await page.wait_for_selector(MODAL_DOCTYPE_DROPDOWN, state="visible", timeout=10000)
+
+            options = await page.evaluate(MODAL_OPTIONS_SCRIPT, MODAL_DOCTYPE_DROPDOWN)
+            informe_option = next((option for option in options if INFORME_OPTION_TEXT in option['text']), None)
+            if not informe_option:
+                self.log("error", f"NDO {ndo}: No se encontró opción 'Informe/Resultados' en el dropdown")
+                return False, await self.take_screenshot(page, f"no_informe_option_ndo_{ndo}")
+            await page.select_option(MODAL_DOCTYPE_DROPDOWN, value=informe_option['value'])
+            await page.wait_for_selector(MODAL_FILE_INPUT, state="visible", timeout=10000)
+
+            downloaded_file_path = await download
+            if not downloaded_file_path:
+                self.log("error", f"NDO {ndo}: No se pudo descargar el archivo")
+                await self.close_modal(page, ndo)
+                return False, None
+            await self.pace("settle", 2)
+
+            upload_file = await asyncio.to_thread(self.automation.informe_upload_file, ndo, downloaded_file_path)
+            async with page.expect_file_chooser() as fc_info:
+                await page.click(MODAL_FILE_INPUT)
+            file_chooser = await fc_info.value
+            await self.portal_waits.async_step(page, "carga de archivo", lambda: file_chooser.set_files(upload_file),
+                                               ndo=ndo, response_urls=UPLOAD_RESPONSE_URLS,
+                                               mutation_selector=DOCUMENTS_TABLE_BODY, fallback_kind="file_operations")
+
+            try:
+                await page.wait_for_selector(MODAL_CONFIRMATION_ROWS, state="visible", timeout=15000)
+                row_content = await page.locator(MODAL_CONFIRMATION_ROWS).first.inner_text()
+            except Exception as confirmation_error:
+                self.log("error", f"NDO {ndo}: Error esperando confirmación de carga: {str(confirmation_error)}")
+                return False, await self.take_screenshot(page, f"upload_confirmation_error_ndo_{ndo}")
+
+            if INFORME_OPTION_TEXT in row_content:
+                self.log("info", f"NDO {ndo}: Archivo subido y confirmado exitosamente")
+            else:
+                self.log("warning", f"NDO {ndo}: Confirmación no contiene 'Informe/Resultados'")
+            await self.close_modal(page, ndo)
+            return True, None
+
+        except Exception as e:
+            screenshot_path = await self.take_screenshot(page, f"upload_modal_error_ndo_{ndo}")
+            self.log("error", f"NDO {ndo}: Error procesando modal de carga: {str(e)}", screenshot_path)
+            return False, screenshot_path
+        finally:
+            if not download.done():
+                download.cancel()
+
+    async def close_modal(self, page, ndo):
+        try:
+            close_button = page.locator(MODAL_CLOSE_BUTTON).filter(has_text=CLOSE_BUTTON_TEXT)
+            if await close_button.count():
+                await close_button.first.click()
+            else:
+                await page.press("body", "Escape")
+        except Exception as e:
+            self.log("warning", f"NDO {ndo}: Error cerrando modal: {str(e)}")
+
+    async def transmit(self, page, ndo, matching_row):
+        try:
+            data_id = matching_row.get('data_id')
+            row_selector = f"{TABLE_ROWS}[data-id='{data_id}']"
+            fixed_delay = self.pacer.compute_delay("short") + self.pacer.compute_delay("settle", 3)
+            buttons_ready = (ROW_BUTTONS_READY_SCRIPT, transmit_buttons_args(data_id))
+            await self.portal_waits.async_step(page, "botones listos para transmitir", lambda: asyncio.sleep(0), ndo=ndo,
+                                               condition=buttons_ready, fixed_delay=fixed_delay,
+                                               timeout=max(int(fixed_delay * 1000), 3000))
+
+            current_rows = await self.snapshot_table_rows(page, data_id)
+            current_row = current_rows[0] if current_rows else {}
+            if not ready_to_transmit(current_row):
+                self.log("error", f"NDO {ndo}: Los botones de validación y carga no están listos para transmitir")
+                return False, None
+
+            await self.pace("short")
+            transmit_selector = f"{row_selector} {TRANSMIT_BUTTON}"
+            await page.wait_for_selector(transmit_selector, state="visible", timeout=5000)
+            await page.click(transmit_selector)
+
+            await page.wait_for_selector(TRANSMIT_CONFIRM_BUTTON, state="visible", timeout=10000)
+            confirm_button = page.locator(f"{TRANSMIT_CONFIRM_BUTTON}.btn.btn-success").filter(has_text=CONFIRM_BUTTON_TEXT)
+            if not await confirm_button.count():
+                self.log("error", f"NDO {ndo}: No se encontró el botón 'Confirmar' específico")
+                return False, None
+
+            try:
+                async with page.expect_event("dialog", timeout=15000) as dialog_info:
+                    await confirm_button.first.click()
+                dialog = await dialog_info.value
+                dialog_message = dialog.message
+                await dialog.accept()
+            except Exception as dialog_error:
+                self.log("error", f"NDO {ndo}: Error manejando diálogo: {str(dialog_error)}")
+                return False, None
+
+            if TRANSMISSION_SUCCESS_TEXT in dialog_message:
+                self.log("info", f"NDO {ndo}: Diálogo de confirmación aceptado - Transmisión completada")
+            else:
+                self.log("warning", f"NDO {ndo}: Mensaje de diálogo inesperado: {dialog_message}")
+            return True, None
+
+        except Exception as e:
+            screenshot_path = await self.take_screenshot(page, f"transmit_error_ndo_{ndo}")
+            self.log("error", f"NDO {ndo}: Error verificando/transmitiendo: {str(e)}", screenshot_path)
+            return False, screenshot_path
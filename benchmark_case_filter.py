@@ -0,0 +1,80 @@
+import random
+import time
+from datetime import datetime, timedelta
+import pandas as pd
+from case_records import classify_cases
+
+ROWS = 100_000
+DATE_RANGE_START = datetime(2025, 6, 1)
+DATE_RANGE_END = datetime(2025, 8, 31)
+
+
+def build_synthetic_frame(rows=ROWS, seed=42):
+    """Build a frame shaped like the projected prestaciones_PAMI sheet"""
+    rng = random.Random(seed)
+    base = datetime(2025, 1, 1, 7, 0)
+    return pd.DataFrame({
+        'NDO': [rng.randint(5_000_000, 45_000_000) for _ in range(rows)],
+        'CODIGO_PAMI': [rng.choice([420101, 420102, 180104, 340201, 340301]) for _ in range(rows)],
+        'FechaTurno': [(base + timedelta(minutes=rng.randint(0, 365 * 24 * 60))).strftime("%Y-%m-%d %H:%M:%S") for _ in range(rows)],
+        'Informe': [f"https://informes.example.org/{index}.pdf" for index in range(rows)],
+        'Procesado': [rng.choice(['Si', 'No', '', 0]) for _ in range(rows)],
+        'APE': [f"APELLIDO{index % 997}" for index in range(rows)],
+        'NOM': [f"NOMBRE{index % 389}" for index in range(rows)],
+        '_original_sheet_row': range(2, rows + 2),
+    })
+
+
+def legacy_classify(df, date_range_start, date_range_end):
+    """The read_excel_data filtering as it was before vectorization"""
+    df = df.copy()
+    df['FechaTurno'] = pd.to_datetime(df['FechaTurno'], errors='coerce')
+    df = df[df['FechaTurno'] >= date_range_start]
+    df = df[df['FechaTurno'] <= pd.Timestamp(date_range_end).replace(hour=23, minute=59, second=59)]
+    df = df.dropna(subset=['FechaTurno'])
+
+    df['Procesado'] = df['Procesado'].fillna('No')
+    df.loc[df['Procesado'].isin(['', None, 0]), 'Procesado'] = 'No'
+
+    already_processed = []
+    for _, row in df[df['Procesado'] == 'Si'].iterrows():
+        already_processed.append({
+            'NDO': row.get('NDO', 'N/A'),
+            'COD': row.get('CODIGO_PAMI', 'N/A'),
+            'Status': 'Ya procesado anteriormente',
+            'Timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            'APE': row.get('APE', ''),
+            'NOM': row.get('NOM', '')
+        })
+    pending = df[df['Procesado'] == 'No'].to_dict('records')
+    return df, pending, already_processed
+
+
+def best_of(func, repeat=3):
+    timings = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def benchmark_case_filter():
+    print(f"=== BENCHMARK FILTRADO Y CLASIFICACIÓN ({ROWS} filas sintéticas) ===")
+    df = build_synthetic_frame()
+
+    legacy_time, (_, legacy_pending, legacy_processed) = best_of(lambda: legacy_classify(df, DATE_RANGE_START, DATE_RANGE_END))
+    vector_time, (_, pending, processed) = best_of(lambda: classify_cases(df, DATE_RANGE_START, DATE_RANGE_END))
+
+    assert len(pending) == len(legacy_pending), "pending case count differs"
+    assert len(processed) == len(legacy_processed), "already processed count differs"
+
+    print(f"Implementación anterior: {legacy_time:8.3f} s")
+    print(f"Vectorizada:             {vector_time:8.3f} s")
+    print(f"Pendientes: {len(pending)}, Ya procesados: {len(processed)}")
+    print(f"Aceleración: {legacy_time / max(vector_time, 1e-9):.1f}x")
+
+
+if __name__ == "__main__":
+    benchmark_case_filter()
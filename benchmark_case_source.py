@@ -0,0 +1,89 @@
+import argparse
+import os
+import tempfile
+import time
+from openpyxl import Workbook
+from benchmark_case_filter import build_synthetic_frame
+from browser_automation import BrowserAutomation
+from case_source import FileCaseSource
+from case_store import CaseStore
+from config import CASE_SOURCE_FILE
+from logger import AutomationLogger
+from settings_manager import SettingsManager
+
+
+class QuietLogger(AutomationLogger):
+    """Keeps warnings and errors only, so per-case info lines do not dominate the timings"""
+
+    def log(self, level, message, screenshot_path=None):
+        if level != "INFO":
+            super().log(level, message, screenshot_path)
+
+
+def write_synthetic_file(path, rows):
+    """Write a synthetic prestaciones sheet (without 'Procesado') as .csv or streamed .xlsx"""
+    df = build_synthetic_frame(rows).drop(columns=['Procesado', '_original_sheet_row'])
+    if path.lower().endswith('.csv'):
+        df.to_csv(path, index=False)
+        return
+
+    workbook = Workbook(write_only=True)
+    worksheet = workbook.create_sheet("prestaciones_PAMI")
+    worksheet.append(list(df.columns))
+    for values in df.itertuples(index=False):
+        worksheet.append(list(values))
+    workbook.save(path)
+
+
+def timed(label, func):
+    start = time.perf_counter()
+    result = func()
+    print(f"{label:<40} {time.perf_counter() - start:8.2f} s")
+    return result
+
+
+def benchmark_case_source(rows, file_format):
+    print(f"=== PRUEBA DE CARGA CON ARCHIVO LOCAL ({rows} filas, {file_format}) ===")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, f"casos.{file_format}")
+        timed("Generar archivo sintético", lambda: write_synthetic_file(path, rows))
+
+        logger = QuietLogger(log_dir=os.path.join(tmp_dir, "logs"), screenshot_dir=os.path.join(tmp_dir, "screenshots"))
+        case_store = CaseStore(os.path.join(tmp_dir, "case_state.db"))
+        settings_manager = SettingsManager()
+        settings_manager.set_case_source(CASE_SOURCE_FILE)
+        settings_manager.set_case_file_path(path)
+        settings_manager.set_date_range_start(None, enabled=False)
+        settings_manager.set_date_range_end(None, enabled=False)
+        automation = BrowserAutomation(logger, settings_manager, case_store=case_store)
+
+        cases = timed("Leer, filtrar y clasificar", automation.read_excel_data)
+        print(f"Casos pendientes: {len(cases)}")
+
+        def mark_all():
+            for index in range(len(cases)):
+                if index % 2:
+                    automation.update_case_as_failed(index)
+                else:
+                    automation.update_case_as_processed(index)
+
+        timed("Marcar todos los casos", mark_all)
+        timed("Escribir estados en el archivo", automation.stop_writeback)
+
+        reread = FileCaseSource(path)
+        _, columns = reread.read()
+        marked = sum(1 for value in columns['Procesado'] if value == 'Si')
+        print(f"Filas marcadas 'Si' en el archivo: {marked}")
+        case_store.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prueba de carga del pipeline con un archivo local")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--format", choices=["xlsx", "csv"], default="xlsx")
+    args = parser.parse_args()
+    benchmark_case_source(args.rows, args.format)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+import time
+from sheets_client import get_client_session, get_worksheet
+from sheets_reader import ProjectedSheetReader
+from config import *
+
+
+class TransferCounter:
+    """Counts response bytes and requests seen by a requests session"""
+
+    def __init__(self, session):
+        self.bytes = 0
+        self.requests = 0
+        session.hooks['response'].append(self.on_response)
+
+    def on_response(self, response, *args, **kwargs):
+        self.requests += 1
+        self.bytes += len(response.content)
+        return response
+
+    def reset(self):
+        self.bytes = 0
+        self.requests = 0
+
+
+def measure(name, counter, func):
+    counter.reset()
+    start = time.perf_counter()
+    rows = func()
+    elapsed = time.perf_counter() - start
+    print(f"{name:<30} {elapsed:8.2f} s  {counter.bytes / 1024:10.1f} KiB  {counter.requests:4d} requests  {rows} filas")
+    return elapsed, counter.bytes
+
+
+def benchmark_sheets_read():
+    print("=== BENCHMARK LECTURA DE GOOGLE SHEETS ===")
+    sheet = get_worksheet(SERVICE_ACCOUNT_FILE, GOOGLE_SHEETS_ID, WORKSHEET_NAME)
+    counter = TransferCounter(get_client_session(sheet.client))
+
+    def full_read():
+        all_values = sheet.get_all_values()
+        return max(len(all_values) - 1, 0)
+
+    def projected_read(max_workers):
+        reader = ProjectedSheetReader(sheet, max_workers=max_workers)
+        _, columns = reader.read()
+        return len(next(iter(columns.values()), []))
+
+    full_time, full_bytes = measure("get_all_values (actual)", counter, full_read)
+    serial_time, serial_bytes = measure("proyectado, 1 worker", counter, lambda: projected_read(1))
+    parallel_time, parallel_bytes = measure(f"proyectado, {SHEETS_READ_MAX_WORKERS} workers", counter,
+                                            lambda: projected_read(SHEETS_READ_MAX_WORKERS))
+
+    print()
+    print(f"Bytes: {full_bytes / max(parallel_bytes, 1):.1f}x menos con lectura proyectada")
+    print(f"Tiempo: {full_time / max(parallel_time, 1e-9):.1f}x más rápido con lectura proyectada en paralelo")
+
+
+if __name__ == "__main__":
+    benchmark_sheets_read()
@@ -1,18 +1,162 @@
+import asyncio
 from playwright.sync_api import sync_playwright
 from config import *
 import time
 import os 
-from datetime import datetime
 import pandas as pd
-import requests
-import  gspread
-from google.oauth2.service_account import Credentials
+from case_source import create_case_source
+from case_store import CaseStore
+from case_records import classify_cases, group_cases_by_ndo
+from pacing import configure_pacing
+from portal_waits import PortalWaits
+from tab_workers import TabWorkerPool, find_free_port
+from process_pool import ProcessPoolRunner
+from informe_cache import InformeCache, InformePrefetcher
+from session_store import SessionStore
+from resource_router import ResourceRouter
+from screenshot_pipeline import ScreenshotPipeline
+from retry_scheduler import RetryScheduler, ERROR_CLASS_LABELS
+from case_outcomes import (CaseOutcome, ROW_ALREADY_COMPLETED, ROW_NEEDS_UPLOAD, ROW_PROCESSED, UPLOAD_DONE,
+                           UPLOAD_NEEDED, UPLOAD_STATE_LOGS, VALIDATION_STATE_LOGS, is_completed_row,
+                           ready_to_transmit, upload_state, validation_state)
+
+# Reads every results row in one round trip: data attributes, cell texts and
+# the class/visibility of the row's validation, upload and transmit buttons
+TABLE_SNAPSHOT_SCRIPT = """
+(args) => {
+    const isVisible = (el) => !!(el.offsetWidth || el.offsetHeight || el.getClientRects().length);
+    const button = (row, selector) => {
+        const el = row.querySelector(selector);
+        if (!el) return null;
+        return {
+            classes: el.getAttribute('class') || '',
+            visible: isVisible(el),
+            background: window.getComputedStyle(el).backgroundColor,
+        };
+    };
+    let rows = Array.from(document.querySelectorAll(args.rows));
+    if (args.dataId !== null) {
+        rows = rows.filter((row) => row.getAttribute('data-id') === args.dataId);
+    }
+    return rows.map((row) => ({
+        data_id: row.getAttribute('data-id'),
+        data_practica: row.getAttribute('data-practica'),
+        data_n_orden: row.getAttribute('data-n_orden'),
+        data_n_beneficio: row.getAttribute('data-n_beneficio'),
+        cells: Array.from(row.querySelectorAll('td')).map((cell) => cell.innerText.trim()),
+        validation_button: button(row, args.validation),
+        upload_button: button(row, args.upload),
+        transmit_button: button(row, args.transmit),
+    }));
+}
+"""
+
+# True once the upload modal's document type dropdown lists the given option
+MODAL_OPTIONS_READY_SCRIPT = """
+(args) => Array.from(document.querySelectorAll(args.selector + ' option'))
+    .some((option) => option.textContent.includes(args.text))
+"""
+
+# True once a results row shows its validation button, and its upload button when
+# given, in the given class (or just visible when no class is given)
+ROW_BUTTONS_READY_SCRIPT = """
+(args) => {
+    const row = Array.from(document.querySelectorAll(args.rows))
+        .find((candidate) => candidate.getAttribute('data-id') === args.dataId);
+    if (!row) return false;
+    const ready = (el) => !!el && (args.className
+        ? el.classList.contains(args.className)
+        : !!(el.offsetWidth || el.offsetHeight || el.getClientRects().length));
+    return ready(row.querySelector(args.validation)) && (!args.upload || ready(row.querySelector(args.upload)));
+}
+"""
+
+TABLE_CELL_FIELDS = ['nro_orden', 'fecha_emision', 'nro_beneficio', 'apellido_nombre',
+                     'practica', 'turno', 'transmitida']
+
+
+def practica_code(practica_full):
+    """COD of a results row's practica cell ('123 - Descripción' or '123 Descripción')"""
+    if ' - ' in practica_full:
+        return practica_full.split(' - ')[0].strip()
+    return practica_full.split()[0] if practica_full else ''
+
+
+def find_practica(table_data, cod_excel, matched_ids=()):
+    """First results row with the case's COD that was not matched to another case"""
+    for table_row in table_data:
+        if table_row.get('data_id') in matched_ids:
+            continue
+        if str(cod_excel) == str(practica_code(table_row.get('practica', ''))):
+            return table_row
+    return None
+
+
+def match_practica(table_data, cod_excel, matched_ids=(), data_id_hint=None):
+    """Results row of a case: the row the search cache pointed at if it still has the COD, else find_practica"""
+    if data_id_hint is not None and data_id_hint not in matched_ids:
+        for table_row in table_data:
+            if table_row.get('data_id') == data_id_hint and str(cod_excel) == str(practica_code(table_row.get('practica', ''))):
+                return table_row
+    return find_practica(table_data, cod_excel, matched_ids)
+
+
+def can_check_results(ndo, last_search):
+    """True when the results of searching ndo can be told apart from the previous search on the page"""
+    return bool(last_search) and str(last_search[0]) != str(ndo)
+
+
+def stale_result_ids(ndo, table_data, last_search):
+    """data_ids of the results that were already shown for the NDO searched before on the same page"""
+    if not can_check_results(ndo, last_search):
+        return set()
+    return {row.get('data_id') for row in table_data} & last_search[1]
+
+
+def table_snapshot_args(data_id=None):
+    """TABLE_SNAPSHOT_SCRIPT arguments for every results row, or only the one with data_id"""
+    return {'rows': TABLE_ROWS, 'dataId': None if data_id is None else str(data_id),
+            'validation': VALIDATION_BUTTON, 'upload': UPLOAD_BUTTON, 'transmit': TRANSMIT_BUTTON}
+
+
+def table_rows(snapshot):
+    """Results rows of a TABLE_SNAPSHOT_SCRIPT snapshot, with their cells named; incomplete rows are skipped"""
+    table_data = []
+    for row in snapshot:
+        cells = row.pop('cells')
+        if len(cells) < len(TABLE_CELL_FIELDS):
+            continue
+        row.update(zip(TABLE_CELL_FIELDS, cells))
+        table_data.append(row)
+    return table_data
+
+
+def validation_button_args(data_id):
+    """ROW_BUTTONS_READY_SCRIPT arguments that wait for a visible validation button on the row"""
+    return {'rows': TABLE_ROWS, 'dataId': str(data_id), 'validation': VALIDATION_BUTTON,
+            'upload': None, 'className': None}
+
+
+def transmit_buttons_args(data_id):
+    """ROW_BUTTONS_READY_SCRIPT arguments that wait for the row's validation and upload buttons to turn blue"""
+    return {'rows': TABLE_ROWS, 'dataId': str(data_id), 'validation': VALIDATION_BUTTON,
+            'upload': UPLOAD_BUTTON, 'className': BTN_PRIMARY_CLASS}
+
+
+def row_without_buttons():
+    """Button fields of a row whose buttons are gone from the page"""
+    return {'validation_button': None, 'upload_button': None, 'transmit_button': None}
+
 
 class AutomationError(Exception):
     pass
 
+class BrowserLost(AutomationError):
+    """Chromium, the OME context or its page died while a case was being processed"""
+    pass
+
 class BrowserAutomation:
-    def __init__(self, logger=None, settings_manager = None):
+    def __init__(self, logger=None, settings_manager = None, case_source=None, case_store=None, pacer=None):
         self.browser = None
         self.page = None
         self.new_page = None
@@ -23,33 +167,60 @@ class BrowserAutomation:
         self.failed_rows = []
         self.already_processed_cases = []
         self.original_indices = []
+        self.sheet_header = []
+        self.sheet_column_positions = {}
+        self.sheet_data_row_count = 0
+        self.sheet_row_index = {}
+        self.case_source = case_source
+        self.case_store = case_store or CaseStore()
         self.stop_requested = False
+        self.processing_seconds = 0.0
+        self.worker_reports = {}
+        self.case_groups = []
+        self.informe_cache = None
+        self.informe_prefetcher = None
+        
+        pacing_profile = self.settings_manager.get_pacing_profile() if self.settings_manager else PACING_PROFILE
+        self.pacer = pacer or configure_pacing(pacing_profile, self.logger)
+        self.cdp_endpoint = None
+        self.portal_waits = PortalWaits(self.pacer, self.logger)
+        self.session_store = SessionStore(logger=self.logger)
+        self.resource_router = ResourceRouter(self.resource_profile(), logger=self.logger)
+        self.screenshots = self.create_screenshot_pipeline()
+        self.credentials = None
+        self.finished_indices = set()
+        self.last_search = None
+        self.committed_failed_rows = 0
+        self.recovery_seconds = []
+        self.retry_scheduler = RetryScheduler()
+        self.retries_enabled = False
+        self.case_group_numbers = {}
         
     def request_stop(self):
         """Request graceful stop after current case"""
         self.stop_requested = True
         self.log("info", "Solicitud de parada recibida - Terminando con caso actual...")
+        if self.case_source:
+            self.case_source.request_flush()
 
     def log(self, level, message, screenshot_path=None):
         if self.logger:
             getattr(self.logger, level)(message, screenshot_path)
 
+    def create_screenshot_pipeline(self):
+        if not self.settings_manager:
+            return ScreenshotPipeline(logger=self.logger)
+        return ScreenshotPipeline(self.settings_manager.get_screenshot_dir(),
+                                  self.settings_manager.get_screenshot_format(),
+                                  self.settings_manager.get_screenshot_dir_max_mb() * 1024 * 1024,
+                                  self.logger)
+
     def take_screenshot(self, description="error"):
+        """Queue a capture of the current page; returns the path it is written to, or a note if it was skipped"""
         try:
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"{description}_{timestamp}.png"
-            
-            screenshot_dir = self.settings_manager.get_screenshot_dir() if self.settings_manager else SCREENSHOT_DIR
-            
-            if not os.path.exists(screenshot_dir):
-                os.makedirs(screenshot_dir)
-            
-            filepath = os.path.join(screenshot_dir, filename)
-            
             current_page = self.new_page if self.new_page else self.page
             if current_page:
-                current_page.screenshot(path=filepath)
-                return filepath
+                return self.screenshots.capture(current_page, description)
         except Exception as e:
             self.log("error", f"Failed to take screenshot: {str(e)}")
         return None
@@ -65,7 +236,10 @@ class BrowserAutomation:
     def start_browser(self):
         self.log("info", "Iniciando Playwright")
         self.playwright = sync_playwright().start()
+        self.launch_browser()
+        self.open_start_page()
 
+    def launch_browser(self):
         self.log("info", "Lanzando navegador Chromium")
         
         try:
@@ -76,7 +250,7 @@ class BrowserAutomation:
                     os.environ['PLAYWRIGHT_BROWSERS_PATH'] = browsers_path
                     self.log("info", f"Using bundled browsers from: {browsers_path}")
             
-            self.browser = self.playwright.chromium.launch(headless=HEADLESS)
+            self.browser = self.playwright.chromium.launch(headless=self.headless(), args=self.browser_launch_args())
             
         except Exception as e:
             if "Executable doesn't exist" in str(e):
@@ -97,7 +271,7 @@ class BrowserAutomation:
                         raise AutomationError(f"Failed to install browsers: {result.stderr}")
                     
                     self.log("info", "Navegadores instalados exitosamente")
-                    self.browser = self.playwright.chromium.launch(headless=HEADLESS)
+                    self.browser = self.playwright.chromium.launch(headless=self.headless(), args=self.browser_launch_args())
                     
                 except subprocess.TimeoutExpired:
                     self.log("error", "Timeout instalando navegadores")
@@ -108,31 +282,284 @@ class BrowserAutomation:
             else:
                 raise e
 
+    def open_start_page(self):
         timeout = self.settings_manager.get_browser_timeout() if self.settings_manager else BROWSER_TIMEOUT
         self.page = self.browser.new_page()
         self.page.set_default_timeout(timeout)
+        self.resource_router.install(self.page.context)
 
         self.log("info", f"Navegador iniciado correctamente (timeout: {timeout}ms)")
 
+    def attach_browser(self, playwright, browser, cdp_endpoint=None):
+        """Run on a Chromium already launched by the browser service instead of starting one"""
+        self.playwright = playwright
+        self.browser = browser
+        self.cdp_endpoint = cdp_endpoint
+        self.open_start_page()
+
+    def launch_signature(self):
+        """Launch options the browser service compares before reusing a running Chromium"""
+        tab_workers = self.settings_manager.get_tab_workers() if self.settings_manager else TAB_WORKERS
+        return (self.headless(), tab_workers > 1, self.resource_profile())
+
+    def headless(self):
+        return self.settings_manager.is_headless_enabled() if self.settings_manager else HEADLESS
+
+    def resource_profile(self):
+        return self.settings_manager.get_resource_profile() if self.settings_manager else RESOURCE_PROFILE
+
+    def resource_launch_args(self):
+        """Chromium flags of the resource profile; the light one trims JavaScript heap and GPU use"""
+        return list(LIGHT_BROWSER_ARGS) if self.resource_profile() == RESOURCE_PROFILE_LIGHT else []
+
+    def watch_page(self, page):
+        """Feed a portal page's timings to the pacer and the resource measurements"""
+        self.pacer.watch_page(page)
+        self.resource_router.watch_page(page)
+
+    def unwatch_page(self, page):
+        self.pacer.unwatch_page(page)
+        self.resource_router.unwatch_page(page)
+
+    def resume_warm_page(self, page):
+        """Continue on the OME page a previous run left open; False when its session is no longer usable"""
+        try:
+            if page.is_closed() or not self.probe_session(page.context, page.url):
+                self.log("info", "La sesión del navegador abierto venció - Iniciando sesión nuevamente")
+                return False
+            timeout = self.settings_manager.get_browser_timeout() if self.settings_manager else BROWSER_TIMEOUT
+            page.set_default_timeout(timeout)
+            self.resource_router.install(page.context)
+            self.watch_page(page)
+            with self.portal_waits.step(page, "recarga del panel", response_urls=PANEL_RESPONSE_URLS,
+                                        load_state="load", fallback_kind="medium"):
+                page.goto(page.url)
+            page.wait_for_selector(AFILIADO_DROPDOWN, state="visible", timeout=10000)
+        except Exception as e:
+            self.log("warning", f"No se pudo reutilizar la página abierta - Iniciando sesión nuevamente: {str(e)}")
+            return False
+
+        if self.page:
+            self.page.close()
+        self.page = page
+        self.new_page = page
+        self.log("info", f"Panel de prestaciones reutilizado de la ejecución anterior: {page.url}")
+        return True
+
+    def detach_browser(self):
+        """End a run on the service's browser: keep the OME page open and return it"""
+        self.stop_writeback()
+        self.screenshots.close()
+        page = self.new_page
+        if self.page and self.page is not page and not self.page.is_closed():
+            self.page.close()
+        if page is not None:
+            self.unwatch_page(page)
+            self.resource_router.uninstall(page.context)
+        self.page = None
+        self.new_page = None
+        self.browser = None
+        self.playwright = None
+        return page
+
+    def browser_launch_args(self):
+        """Chromium flags; tab workers need a DevTools port to attach their own connections"""
+        args = self.resource_launch_args()
+        tab_workers = self.settings_manager.get_tab_workers() if self.settings_manager else TAB_WORKERS
+        if tab_workers > 1:
+            port = find_free_port()
+            self.cdp_endpoint = f"http://127.0.0.1:{port}"
+            args.append(f"--remote-debugging-port={port}")
+        return args
+
+    def create_tab_worker(self, page):
+        """Automation bound to another OME tab, sharing this run's cases, results, store, pacing and retries"""
+        tab = BrowserAutomation(self.logger, self.settings_manager, case_source=self.case_source,
+                                case_store=self.case_store, pacer=self.pacer)
+        tab.page = page
+        tab.new_page = page
+        tab.portal_waits = self.portal_waits
+        tab.excel_data = self.excel_data
+        tab.sheet_row_index = self.sheet_row_index
+        tab.processed_rows = self.processed_rows
+        tab.failed_rows = self.failed_rows
+        tab.case_groups = self.case_groups
+        tab.informe_cache = self.informe_cache
+        tab.informe_prefetcher = self.informe_prefetcher
+        tab.resource_router = self.resource_router
+        tab.screenshots = self.screenshots
+        tab.retry_scheduler = self.retry_scheduler
+        tab.retries_enabled = self.retries_enabled
+        tab.case_group_numbers = self.case_group_numbers
+        tab.watch_page(page)
+        return tab
+
+    def open_portal(self, username, password):
+        """Open the Panel de prestaciones, through the saved session when it is still valid"""
+        self.remember_credentials(username, password)
+        if self.open_saved_session(username, password):
+            return
+        self.navigate_to_login()
+        self.fill_login_form(username, password)
+        self.click_ome_button()
+        self.click_panel_prestaciones()
+        self.save_session(username, password)
+
+    def remember_credentials(self, username, password):
+        """Keep the login in memory so a crashed browser can be restarted mid-batch"""
+        self.credentials = (username, password)
+
+    def browser_alive(self):
+        """False when Chromium, the OME context or its page is gone or crashed"""
+        page = self.new_page or self.page
+        try:
+            return bool(self.browser and self.browser.is_connected() and page and not page.is_closed()
+                        and page.evaluate("() => 1") == 1)
+        except Exception:
+            return False
+
+    def check_browser(self, error=None):
+        """Raise BrowserLost instead of failing a case when the browser died (recovery enabled only)"""
+        if self.credentials and not self.browser_alive():
+            raise BrowserLost(str(error) if error else "el navegador o la página se cerró")
+
+    def restart_browser(self):
+        """Replace a dead Chromium with a new one and open the portal again; returns the seconds it took"""
+        start = time.perf_counter()
+        for page in (self.new_page, self.page):
+            if page is not None:
+                self.unwatch_page(page)
+        self.page = None
+        self.new_page = None
+        try:
+            if self.browser:
+                self.browser.close()
+        except Exception:
+            pass
+
+        try:
+            self.launch_browser()
+        except Exception as e:
+            self.log("warning", f"Playwright no responde, se reinicia: {str(e)}")
+            try:
+                self.playwright.stop()
+            except Exception:
+                pass
+            self.playwright = sync_playwright().start()
+            self.launch_browser()
+        self.open_start_page()
+        self.open_portal(*self.credentials)
+
+        seconds = time.perf_counter() - start
+        self.recovery_seconds.append(seconds)
+        return seconds
+
+    def process_group_supervised(self, group_number, cases):
+        """process_patient, restarting a dead browser and resuming from the first case without an outcome.
+
+        The attempt cut short by the crash is not counted against the case.
+        """
+        for recovery in range(BROWSER_RECOVERY_ATTEMPTS + 1):
+            failed_rows_before = len(self.failed_rows)
+            try:
+                self.process_patient(group_number, cases)
+                return
+            except BrowserLost as e:
+                # Filas de error agregadas por el caso que se estaba procesando cuando cayó el navegador
+                del self.failed_rows[max(failed_rows_before, self.committed_failed_rows):]
+                cases = [(index, row) for index, row in cases
+                         if index not in self.finished_indices and not self.retry_scheduler.queued(index)]
+                if recovery == BROWSER_RECOVERY_ATTEMPTS:
+                    raise AutomationError(f"El navegador se cayó {recovery + 1} veces en el mismo NDO: {str(e)}")
+                if not cases:
+                    return
+
+                self.log("warning", f"Navegador caído ({str(e)}) - Reiniciando y retomando {len(cases)} casos del NDO")
+                for _, row in cases:
+                    self.case_store.forget_attempt(CaseStore.case_key(row))
+                seconds = self.restart_browser()
+                self.log("info", f"Navegador recuperado en {seconds:.1f} s - Retomando desde el caso actual")
+                if self.stop_requested:
+                    return
+
+    def saved_session_enabled(self):
+        return self.settings_manager.is_saved_session_enabled() if self.settings_manager else SAVED_SESSION_ENABLED
+
+    def open_saved_session(self, username, password):
+        """Go straight to transmision.php with the user's saved session; False when a login is needed"""
+        if not self.saved_session_enabled():
+            return False
+        saved = self.session_store.load(username, password)
+        if not saved:
+            return False
+
+        self.log("info", "Verificando sesión guardada del portal")
+        context = self.browser.new_context(storage_state=saved['storage_state'])
+        self.resource_router.install(context)
+        try:
+            if not self.probe_session(context, saved['transmision_url']):
+                self.log("info", "La sesión guardada venció - Iniciando sesión nuevamente")
+                self.session_store.delete(username)
+                context.close()
+                return False
+
+            page = context.new_page()
+            timeout = self.settings_manager.get_browser_timeout() if self.settings_manager else BROWSER_TIMEOUT
+            page.set_default_timeout(timeout)
+            self.watch_page(page)
+            with self.portal_waits.step(page, "apertura con sesión guardada", response_urls=PANEL_RESPONSE_URLS,
+                                        load_state="load", fallback_kind="medium"):
+                page.goto(saved['transmision_url'])
+            page.wait_for_selector(AFILIADO_DROPDOWN, state="visible", timeout=10000)
+        except Exception as e:
+            self.log("warning", f"No se pudo usar la sesión guardada - Iniciando sesión nuevamente: {str(e)}")
+            context.close()
+            return False
+
+        if self.page:
+            self.page.close()
+        self.page = page
+        self.new_page = page
+        self.log("info", f"Sesión guardada válida - Panel de prestaciones abierto sin login: {page.url}")
+        return True
+
+    @staticmethod
+    def probe_session(context, transmision_url):
+        """Cheap validity check: fetch transmision.php without redirects and look for the orders table"""
+        response = context.request.get(transmision_url, max_redirects=0, timeout=10000)
+        return response.ok and SESSION_PROBE_MARKER in response.text()
+
+    def save_session(self, username, password):
+        """Save the logged-in context's storage_state, encrypted, for the next run"""
+        if not self.saved_session_enabled() or not self.new_page:
+            return
+        try:
+            self.session_store.save(username, password, self.new_page.context.storage_state(), self.new_page.url)
+            self.log("info", "Sesión del portal guardada para la próxima ejecución")
+        except Exception as e:
+            self.log("warning", f"No se pudo guardar la sesión del portal: {str(e)}")
+
     def navigate_to_login(self):
         self.log("info", f"Navegando a: {LOGIN_URL}")
         self.page.goto(LOGIN_URL)
         self.log("info", "Página cargada correctamente")
 
     def close_browser(self):
+        self.stop_writeback()
+        self.screenshots.close()
         if hasattr(self, 'new_page') and self.new_page:
             self.log("info", "Cerrando página OME")
             self.new_page.close()
         if self.browser:
             self.log("info", "Cerrando navegador")
             self.browser.close()
-        if hasattr(self, 'playwright'):
+        if getattr(self, 'playwright', None):
             self.playwright.stop()
 
     def fill_login_form(self, username, password):
         self.log("info", "Esperando que aparezca el campo de usuario")
         self.page.wait_for_selector(LOGIN_USERNAME_FIELD, state="visible")
-        time.sleep(1)
+        settle_delay(1)
 
         self.log("info", "Completando campo de usuario")
         self.page.fill(LOGIN_USERNAME_FIELD, username)
@@ -141,10 +568,11 @@ class BrowserAutomation:
         self.page.fill(LOGIN_PASSWORD_FIELD, password)
 
         self.log("info", "Haciendo clic en botón Ingresar")
-        self.page.click(LOGIN_SUBMIT_BUTTON)
+        with self.portal_waits.step(self.page, "login", response_urls=LOGIN_RESPONSE_URLS, load_state="load",
+                                    fixed_delay=self.pacer.compute_delay("settle", 3)):
+            self.page.click(LOGIN_SUBMIT_BUTTON)
 
-        self.log("info", "Formulario de login completado, esperando...")
-        time.sleep(3)
+        self.log("info", "Formulario de login completado")
         
         self.check_for_errors(self.page)
         
@@ -159,7 +587,7 @@ class BrowserAutomation:
     def click_ome_button(self):
         self.log("info", "Esperando que aparezca el botón OME")
         self.page.wait_for_selector(OME_BUTTON, state="visible")
-        time.sleep(1)
+        settle_delay(1)
 
         self.log("info", "Haciendo clic en botón OME")
         with self.page.context.expect_page() as new_page_info:
@@ -171,20 +599,22 @@ class BrowserAutomation:
         self.new_page.set_default_timeout(timeout)
 
         self.log("info", "Nueva página OME abierta correctamente")
+        self.watch_page(self.new_page)
+        with self.portal_waits.step(self.new_page, "apertura de OME", load_state="load",
+                                    fixed_delay=self.pacer.compute_delay("settle", 2)):
+            pass
         self.log("info", f"URL de nueva página: {self.new_page.url}")
-        time.sleep(2)
 
     def click_panel_prestaciones(self):
         self.log("info", "Esperando que aparezca el botón Panel de prestaciones")
         try:
             self.new_page.wait_for_selector(PANEL_PRESTACIONES_LINK, state="visible")
-            time.sleep(1)
+            settle_delay(1)
 
             self.log("info", "Haciendo clic en Panel de prestaciones")
-            self.new_page.click(PANEL_PRESTACIONES_LINK)
-            
-            delay = random_delay_medium()
-            self.log("info", f"Esperando {delay:.1f} segundos después de cargar panel de prestaciones")
+            with self.portal_waits.step(self.new_page, "panel de prestaciones", response_urls=PANEL_RESPONSE_URLS,
+                                        load_state="load", fallback_kind="medium"):
+                self.new_page.click(PANEL_PRESTACIONES_LINK)
         except:
             screenshot_path = self.take_screenshot("panel_error")
             self.log("error", "Error navegando a Panel de prestaciones", screenshot_path)
@@ -192,38 +622,37 @@ class BrowserAutomation:
             
     def read_excel_data(self):
         try:
-            self.log("info", "Conectando a Google Sheets")
+            self.case_source = self.case_source or create_case_source(self.settings_manager, self.logger)
+            source_name = self.case_source.description
+            self.log("info", f"Leyendo casos desde {source_name}")
             
-            scope = ['https://spreadsheets.google.com/feeds',
-                    'https://www.googleapis.com/auth/drive']
+            header_row, columns = self.case_source.read()
             
-            service_account_file = self.settings_manager.get_service_account_file() if self.settings_manager else SERVICE_ACCOUNT_FILE
-            sheets_id = self.settings_manager.get_google_sheets_id() if self.settings_manager else GOOGLE_SHEETS_ID
-            worksheet_name = self.settings_manager.get_worksheet_name() if self.settings_manager else WORKSHEET_NAME
+            self.sheet_header = header_row
+            self.sheet_column_positions = self.build_column_positions(header_row)
             
-            creds = Credentials.from_service_account_file(service_account_file, scopes=scope)
-            client = gspread.authorize(creds)
+            df = self.build_columns_dataframe(columns)
+            self.sheet_data_row_count = len(df)
+            self.log("info", f"Leídas {len(columns)} columnas y {len(df)} filas desde {source_name}")
             
-            sheet = client.open_by_key(sheets_id).worksheet(worksheet_name)
-            
-            data = sheet.get_all_records()
-            df = pd.DataFrame(data)
-            
-            all_values = sheet.get_all_values()
-            header_row = all_values[0] if all_values else []
-            
-            if 'Procesado' not in header_row:
-                self.log("info", "Agregando columna 'Procesado' a Google Sheets")
-                procesado_col = len(header_row) + 1
-                sheet.update_cell(1, procesado_col, 'Procesado')
-                
-                data = sheet.get_all_records()
-                df = pd.DataFrame(data)
-                self.log("info", "Columna 'Procesado' agregada exitosamente (solo encabezado)")
-            else:
-                self.log("info", "La columna 'Procesado' ya existe en Google Sheets")
-
             df['_original_sheet_row'] = df.index + 2
+            self.sheet_row_index = self.build_row_index(df)
+            
+            self.case_store.set_meta('sheet', {
+                'identity': self.case_source.identity(),
+                'column_positions': self.sheet_column_positions,
+            })
+            store_processed = {key for key, _, outcome in self.case_store.unsynced_outcomes() if outcome == 'Si'}
+            if store_processed and 'NDO' in df.columns and 'CODIGO_PAMI' in df.columns:
+                row_keys = df['NDO'].astype(str) + '\x1f' + df['CODIGO_PAMI'].astype(str)
+                processed_in_store = row_keys.isin({f"{ndo}\x1f{cod}" for ndo, cod in store_processed})
+                df.loc[processed_in_store, 'Procesado'] = 'Si'
+            
+            self.start_writeback()
+            pending_values = self.case_source.pending_status_values()
+            if pending_values:
+                pending_mask = df['_original_sheet_row'].isin(list(pending_values.keys()))
+                df.loc[pending_mask, 'Procesado'] = df.loc[pending_mask, '_original_sheet_row'].map(pending_values)
             
             if self.settings_manager:
                 date_range_start = self.settings_manager.get_date_range_start()
@@ -234,56 +663,20 @@ class BrowserAutomation:
             
             if date_range_start is not None or date_range_end is not None:
                 self.log("info", f"Aplicando filtro de fecha desde {date_range_start} hasta {date_range_end}")
-                
-                df['FechaTurno'] = pd.to_datetime(df['FechaTurno'], errors='coerce')
-                original_count = len(df)
-                
-                if date_range_start is not None:
-                    df = df[df['FechaTurno'] >= date_range_start]
-
-                if date_range_end is not None:
-                    if date_range_end.hour == 0 and date_range_end.minute == 0 and date_range_end.second == 0:
-                        end_date_inclusive = pd.Timestamp(date_range_end).replace(hour=23, minute=59, second=59)
-                    else:
-                        end_date_inclusive = pd.Timestamp(date_range_end)
-                    
-                    df = df[df['FechaTurno'] <= end_date_inclusive]
-                
-                df = df.dropna(subset=['FechaTurno'])
-                filtered_count = len(df)
-                self.log("info", f"Filtro aplicado: {original_count} registros originales -> {filtered_count} registros filtrados")
             else:
                 self.log("info", "Sin filtro de fecha - procesando todos los registros")
             
-            if 'Procesado' in df.columns:
-                df['Procesado'] = df['Procesado'].fillna('No')
-                df.loc[df['Procesado'].isin(['', None, 0]), 'Procesado'] = 'No'
-            else:
-                df['Procesado'] = 'No'
-            
-            self.google_sheet = sheet
-            self.google_df = df
-            
-            already_processed_df = df[df['Procesado'] == 'Si']
-            self.already_processed_cases = []
+            original_count = len(df)
+            df, self.excel_data, self.already_processed_cases = classify_cases(df, date_range_start, date_range_end)
             
-            for _, row in already_processed_df.iterrows():
-                ndo = row.get('NDO', 'N/A')
-                cod = row.get('CODIGO_PAMI', 'N/A')
-                self.already_processed_cases.append({
-                    'NDO': ndo,
-                    'COD': cod,
-                    'Status': 'Ya procesado anteriormente',
-                    'Timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                    'APE': row.get('APE', ''),
-                    'NOM': row.get('NOM', '')
-                })
+            if date_range_start is not None or date_range_end is not None:
+                self.log("info", f"Filtro aplicado: {original_count} registros originales -> {len(df)} registros filtrados")
             
-            unprocessed_df = df[df['Procesado'] == 'No']
-            self.excel_data = unprocessed_df.to_dict('records')
+            self.google_df = df
+            self.case_store.queue_cases(self.excel_data)
             
             total_cases = len(df)
-            processed_cases = len(already_processed_df)
+            processed_cases = len(self.already_processed_cases)
             unprocessed_cases = len(self.excel_data)
             
             self.log("info", f"Total de casos (filtrados): {total_cases}, Ya procesados: {processed_cases}, Sin procesar: {unprocessed_cases}")
@@ -291,353 +684,455 @@ class BrowserAutomation:
             return self.excel_data
             
         except Exception as e:
-            self.log("error", f"Error leyendo Google Sheets: {str(e)}")
-            raise AutomationError(f"Failed to read Google Sheets: {str(e)}")
+            self.log("error", f"Error leyendo casos: {str(e)}")
+            raise AutomationError(f"Failed to read cases: {str(e)}")
         
-    def process_excel_data(self, excel_data):
-        self.log("info", "Procesando datos de Excel")
-        processed_rows = []
-        failed_rows = []
+    def build_column_positions(self, header_row):
+        """Map each header name to its 1-based sheet column (first occurrence wins)"""
+        positions = {}
+        for index, name in enumerate(header_row):
+            if name and name not in positions:
+                positions[name] = index + 1
+        return positions
 
-        for index, row in enumerate(excel_data):
-            if self.stop_requested:
-                self.log("info", f"Parada solicitada - Procesamiento detenido en caso {index + 1}")
-                break
-            
-            if index > 0:
-                delay = random_delay_long()
-                self.log("info", f"Esperando {delay:.1f} segundos antes del siguiente caso")
-                
-                if self.stop_requested:
-                    self.log("info", "Parada solicitada durante espera - Deteniendo procesamiento")
-                    break
-                
-            ndo = row.get('NDO', f'Fila_{index + 1}')
-            cod_excel = row.get('CODIGO_PAMI', '')
-            self.log("info", f"Iniciando procesamiento de NDO: {ndo} (Fila {index + 1})")
+    def build_row_index(self, df):
+        """Map (NDO, CODIGO_PAMI) to its sheet row, keeping the first occurrence like the old linear scan"""
+        if df.empty or 'NDO' not in df.columns or 'CODIGO_PAMI' not in df.columns:
+            return {}
+        
+        keys = pd.DataFrame({
+            'NDO': df['NDO'].astype(str),
+            'CODIGO_PAMI': df['CODIGO_PAMI'].astype(str),
+            'row': df['_original_sheet_row'],
+        }).drop_duplicates(subset=['NDO', 'CODIGO_PAMI'], keep='first')
+        
+        return dict(zip(zip(keys['NDO'], keys['CODIGO_PAMI']), keys['row'].astype(int)))
 
-            try:
-                # seleccionar Nro. Documento del dropdown
-                self.log("info", f"NDO {ndo}: Seleccionando 'Nro. Documento' en dropdown 'Afiliado Por'")
-                self.new_page.wait_for_selector(AFILIADO_DROPDOWN, state="visible")
-                self.new_page.select_option(AFILIADO_DROPDOWN, value=AFILIADO_DROPDOWN_VALUE)
-                self.log("info", f"NDO {ndo}: Selección completada")
-                
-                delay = random_delay_micro()
-                self.log("info", f"NDO {ndo}: Esperando {delay:.1f} segundos después de selección")
-
-                # ingresar primer dia del mes anterior en el campo 'Fecha turno desde'
-                date_value = get_first_day_of_month()
-                self.log("info", f"NDO {ndo}: Ingresando fecha {date_value}")
-                self.new_page.wait_for_selector(FECHA_TURNO_FIELD, state="visible")
-                self.new_page.click(FECHA_TURNO_FIELD)  # Foco
-                self.new_page.fill(FECHA_TURNO_FIELD, "")  # Limpiar
-                self.new_page.type(FECHA_TURNO_FIELD, date_value, delay=100)
-                self.new_page.press(FECHA_TURNO_FIELD, "Enter")
-                self.log("info", f"NDO {ndo}: Fecha tipeada y confirmada correctamente")
-
-                delay = random_delay_short()
-                self.log("info", f"NDO {ndo}: Esperando {delay:.1f} segundos entre fecha y NDO")
-
-                self.log("info", f"NDO {ndo}: Ingresando NDO en campo de afiliado")
-                self.new_page.wait_for_selector(AFILIADO_NUMBER_FIELD, state="visible")
-                self.new_page.fill(AFILIADO_NUMBER_FIELD, str(ndo))
-                self.log("info", f"NDO {ndo}: NDO ingresado correctamente")
-                
-                delay = random_delay_micro()
-                self.log("info", f"NDO {ndo}: Esperando {delay:.1f} segundos antes de buscar")
+    def build_sheet_dataframe(self, header_row, data_rows):
+        """Build a typed DataFrame from raw sheet values, like get_all_records() does"""
+        width = len(header_row)
+        padded_rows = [
+            (row + [''] * (width - len(row)))[:width] if len(row) != width else row
+            for row in data_rows
+        ]
+        columns = {name: [row[index] for row in padded_rows] for index, name in enumerate(header_row)}
+        return self.build_columns_dataframe(columns)
 
-                # apretar en el botón Buscar
-                self.log("info", f"NDO {ndo}: Haciendo clic en botón Buscar")
-                self.new_page.wait_for_selector(SEARCH_BUTTON, state="visible")
-                self.new_page.click(SEARCH_BUTTON)
-                self.log("info", f"NDO {ndo}: Búsqueda iniciada correctamente")
-                
-                delay = random_delay_short()
-                self.log("info", f"NDO {ndo}: Esperando {delay:.1f} segundos para que carguen los resultados")
-                
-                # extraer datos de la tabla
-                table_data = self.extract_table_data(ndo)
-
-                if not table_data:
-                    self.log("warning", f"NDO {ndo}: No se encontraron datos en la tabla.")
-                    failed_rows.append({
-                        'NDO': ndo,
-                        'Status': 'No se encontraron datos en la tabla.',
-                        'Timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                        'Resultados': 0
-                    })
-                    self.update_case_as_failed(index)
-                    continue
-
-                # verificar si coinciden los datos del excel con los de la tabla ('COD' en excel con 'Practica' en tabla)
-                self.log("info", f"NDO {ndo}: Buscando COD {cod_excel} en {len(table_data)} resultados de la tabla.")
-                cod_found = False
-                matching_row = None
-
-                for table_row in table_data:
-                    practica_full = table_row.get('practica', '')
-                    if ' - ' in practica_full:
-                        practica_code = practica_full.split(' - ')[0].strip()
-                    else:
-                        practica_code = practica_full.split()[0] if practica_full else ''
-                    
-                    self.log("info", f"NDO {ndo}: Comparando COD {cod_excel} con codigo de practica {practica_code}")
+    def build_columns_dataframe(self, columns):
+        """Build a typed DataFrame from {column: [raw values]}"""
+        typed_columns = {
+            name: self.numericise_column(pd.Series(values, dtype=object))
+            for name, values in columns.items()
+        }
+        return pd.DataFrame(typed_columns, columns=list(columns.keys()))
+
+    def numericise_column(self, column):
+        """Convert numeric-looking cells to int/float, leaving blanks and text untouched"""
+        if column.empty:
+            return column
+        
+        text = column.astype(str).str.strip()
+        is_int = text.str.fullmatch(r'[+-]?\d+')
+        numeric = pd.to_numeric(text.where(text != '', None), errors='coerce')
+        is_float = numeric.notna() & ~is_int
+        
+        if not is_int.any() and not is_float.any():
+            return column
+        
+        typed = column.copy()
+        if is_int.any():
+            typed[is_int] = [int(value) for value in text[is_int]]
+        if is_float.any():
+            typed[is_float] = [float(value) for value in numeric[is_float]]
+        return typed
+
+    def process_excel_data(self, excel_data):
+        self.log("info", "Procesando datos de Excel")
+        processing_start = time.perf_counter()
+        self.processed_rows = []
+        self.failed_rows = []
+        self.committed_failed_rows = 0
+        self.case_groups = group_cases_by_ndo(excel_data)
+        self.case_group_numbers = {index: number for number, cases in enumerate(self.case_groups) for index, _ in cases}
+        self.log("info", f"{len(excel_data)} casos agrupados en {len(self.case_groups)} NDO")
+        self.start_informe_prefetch()
 
-                    if str(cod_excel) == str(practica_code):
-                        cod_found = True
-                        matching_row = table_row
-                        self.log("info", f"NDO {ndo}: COD {cod_excel} encontrado en la tabla.")
+        tab_workers = self.settings_manager.get_tab_workers() if self.settings_manager else TAB_WORKERS
+        self.retries_enabled = self.case_retries_enabled()
+        try:
+            if tab_workers > 1 and len(self.case_groups) > 1:
+                TabWorkerPool(self, min(tab_workers, len(self.case_groups))).run(self.case_groups)
+            else:
+                for group_number, cases in enumerate(self.case_groups):
+                    if self.stop_requested:
+                        self.log("info", f"Parada solicitada - Procesamiento detenido en caso {cases[0][0] + 1}")
                         break
-                
-                if cod_found:
-                    self.log("info", f"NDO {ndo}: COD encontrado en la tabla.")
-                    
-                    button_status, error_screenshot = self.check_button_status(ndo, matching_row)
                     
-                    if button_status == "processed" or button_status == "already_completed":
-                        if button_status == "processed":
-                            self.log("info", f"NDO {ndo}: Caso ya procesado o validacion manual pendiente - Marcando como completado.")
-                            status_message = f'Ya estaba procesado o falta validacion manual - COD {cod_excel}'
-                            button_status_desc = 'Already processed or manual validation missing'
-                            
-                            failed_rows.append({
-                                'NDO': ndo,
-                                'Status': status_message,
-                                'Timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                                'Resultados': len(table_data),
-                                'COD_Encontrado': cod_excel,
-                                'Button_Status': button_status_desc
-                            })
-                            self.update_case_as_failed(index)
-                        else:
-                            self.log("info", f"NDO {ndo}: Caso ya completado y aceptado - Marcando como completado.")
-                            status_message = f'Ya estaba completado y aceptado - COD {cod_excel}'
-                            button_status_desc = 'Already completed and accepted'
-                            
-                            processed_rows.append({
-                                'NDO': ndo,
-                                'Status': status_message,
-                                'Timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                                'Resultados': len(table_data),
-                                'COD_Encontrado': cod_excel,
-                                'Button_Status': button_status_desc
-                            })
-                            self.update_case_as_processed(index)
-                    elif button_status == "needs_upload":
-                        self.log("info", f"NDO {ndo}: Boton de carga azul encontrado - Verificando estado de carga.")
-                        upload_status, upload_error_screenshot = self.check_upload_button_status(ndo, matching_row)
+                    if group_number > 0:
+                        delay = random_delay_long()
+                        self.log("info", f"Esperando {delay:.1f} segundos antes del siguiente caso")
                         
-                        if upload_status == "needs_file_upload":
-                            self.log("info", f"NDO {ndo}: Requiere subir archivo - Procesando...")
-                            
-                            informe_url = row.get('Informe', '')
-                            if not informe_url:
-                                self.log("error", f"NDO {ndo}: No se encontró URL de informe en el Excel")
-                                failed_rows.append({
-                                    'NDO': ndo,
-                                    'Status': f'URL de informe no encontrada - COD {cod_excel}',
-                                    'Timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                                    'COD_Buscado': cod_excel,
-                                    'Resultados_Tabla': len(table_data),
-                                    'Button_Status': button_status,
-                                    'Upload_Status': 'No informe URL'
-                                })
-                                self.update_case_as_failed(index)
-                                continue
-                                                    
-                            upload_result = self.handle_file_upload_modal(ndo, matching_row, informe_url)
-                            
-                            self.log("info", f"NDO {ndo}: Upload result: {upload_result}")
-                            self.log("info", f"NDO {ndo}: Upload result type: {type(upload_result)}")
-                            
-                            if upload_result is True:
-                                self.log("info", f"NDO {ndo}: Archivo subido exitosamente - Verificando para transmitir")
-                                transmit_result, transmit_error_screenshot = self.check_and_transmit(ndo, matching_row)
-                                
-                                if transmit_result:
-                                    processed_rows.append({
-                                        'NDO': ndo,
-                                        'Status': f'Archivo subido y transmitido exitosamente - COD {cod_excel}',
-                                        'Timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                                        'Resultados': len(table_data),
-                                        'COD_Encontrado': cod_excel,
-                                        'Button_Status': 'File uploaded and transmitted',
-                                        'Upload_Status': 'Completed'
-                                    })
-                                    
-                                    self.update_case_as_processed(index)
-                                else:
-                                    failed_row_data = {
-                                        'NDO': ndo,
-                                        'Status': f'Archivo subido por el bot pero no se pudo transmitir - COD {cod_excel}',
-                                        'Timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                                        'COD_Buscado': cod_excel,
-                                        'Resultados_Tabla': len(table_data),
-                                        'Button_Status': button_status,
-                                        'Upload_Status': 'Upload successful, transmit failed'
-                                    }
-                                    if transmit_error_screenshot:
-                                        failed_row_data['Screenshot'] = transmit_error_screenshot
-                                    failed_rows.append(failed_row_data)
-                                    self.update_case_as_failed(index)
-                            else:
-                                self.log("error", f"NDO {ndo}: Upload result no es True: {upload_result}")
-                                error_screenshot = upload_result[1] if isinstance(upload_result, tuple) else None
-                                failed_row_data = {
-                                    'NDO': ndo,
-                                    'Status': f'Error subiendo archivo - COD {cod_excel}',
-                                    'Timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                                    'COD_Buscado': cod_excel,
-                                    'Resultados_Tabla': len(table_data),
-                                    'Button_Status': button_status,
-                                    'Upload_Status': 'Upload failed'
-                                }
-                                if error_screenshot:
-                                    failed_row_data['Screenshot'] = error_screenshot
-                                failed_rows.append(failed_row_data)
-                                self.update_case_as_failed(index)
-                        elif upload_status == "file_already_uploaded":
-                            self.log("info", f"NDO {ndo}: Archivo ya subido - Trasmitiendo.")
-                            transmit_result, transmit_error_screenshot = self.check_and_transmit(ndo, matching_row)
-                            if transmit_result:
-                                processed_rows.append({
-                                    'NDO': ndo,
-                                    'Status': f'Archivo ya subido y transmitido - COD {cod_excel}',
-                                    'Timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                                    'Resultados': len(table_data),
-                                    'COD_Encontrado': cod_excel,
-                                    'Button_Status': 'File already uploaded and transmitted',
-                                    'Upload_Status': 'Already uploaded and completed'
-                                })
-                                self.update_case_as_processed(index)
-                            else:
-                                failed_row_data = {
-                                    'NDO': ndo,
-                                    'Status': f'Archivo ya subido anteriormente pero no se pudo transmitir - COD {cod_excel}',
-                                    'Timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                                    'COD_Buscado': cod_excel,
-                                    'Resultados_Tabla': len(table_data),
-                                    'Button_Status': button_status,
-                                    'Upload_Status': 'Already uploaded, transmit failed'
-                                }
-                                if transmit_error_screenshot:
-                                    failed_row_data['Screenshot'] = transmit_error_screenshot
-                                failed_rows.append(failed_row_data)
-                                self.update_case_as_failed(index)
-                        else:
-                            self.log("warning", f"NDO {ndo}: Estado del botón de carga no pudo ser determinado.")
-                            failed_row_data = {
-                                'NDO': ndo,
-                                'Status': f'Error determinando estado del botón de carga - COD {cod_excel}',
-                                'Timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                                'COD_Buscado': cod_excel,
-                                'Resultados_Tabla': len(table_data),
-                                'Button_Status': button_status,
-                                'Upload_Status': upload_status
-                            }
-                            if upload_error_screenshot:
-                                failed_row_data['Screenshot'] = upload_error_screenshot
-                            failed_rows.append(failed_row_data)
-                            self.update_case_as_failed(index)
-                    else:
-                        self.log("warning", f"NDO {ndo}: Estado del boton no pudo ser determinado.")
-                        failed_row_data = {
-                            'NDO': ndo,
-                            'Status': f'Error determinando el estado del boton - COD {cod_excel}',
-                            'Timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                            'COD_Buscado': cod_excel,
-                            'Resultados_Tabla': len(table_data),
-                            'Button_Status': button_status
-                        }
-                        self.update_case_as_failed(index)
-                        if error_screenshot:
-                            failed_row_data['Screenshot'] = error_screenshot
-                        failed_rows.append(failed_row_data)
-                        self.update_case_as_failed(index)
-                else:
-                    self.log("warning", f"NDO {ndo}: COD {cod_excel} no encontrado en ninguna fila de la tabla")
-                    failed_rows.append({
-                        'NDO': ndo,
-                        'Status': f'COD {cod_excel} no encontrado en la tabla',
-                        'Timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                        'COD_Buscado': cod_excel,
-                        'Resultados_Tabla': len(table_data)
-                    })
-                    self.update_case_as_failed(index)
-            except Exception as e:
-                screenshot_path = self.take_screenshot(f"error_ndo_{ndo}")
-                error_msg = f"NDO {ndo}: Error en procesamiento - {str(e)}"
-                self.log("error", error_msg, screenshot_path)
-
-                failed_rows.append({
-                    'NDO': ndo,
-                    'Status': 'Error al procesar NDO.',
-                    'Timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                    'Error': str(e),
-                    'Screenshot': screenshot_path if screenshot_path else 'No se pudo tomar screenshot'
-                })
-                
-                self.update_case_as_failed(index)
-
-        self.processed_rows = processed_rows
-        self.failed_rows = failed_rows
+                        if self.stop_requested:
+                            self.log("info", "Parada solicitada durante espera - Deteniendo procesamiento")
+                            break
+                    
+                    self.process_group_supervised(group_number, cases)
+                    self.run_due_retries()
+                self.run_due_retries(wait=True)
+        finally:
+            self.informe_prefetcher.shutdown()
+        self.processing_seconds = time.perf_counter() - processing_start
+        
+        if self.case_source:
+            self.case_source.request_flush()
         
-        total_processed = len(processed_rows)
-        total_failed = len(failed_rows)
+        total_processed = len(self.processed_rows)
+        total_failed = len(self.failed_rows)
 
         if self.stop_requested:
             self.log("info", f"Procesamiento detenido por usuario. Casos completados: {total_processed}, Fallidos: {total_failed}")
         else:
             self.log("info", f"Procesamiento completado. Exitosos: {total_processed}, Fallidos: {total_failed}")
 
+    def case_retries_enabled(self):
+        return self.settings_manager.is_case_retries_enabled() if self.settings_manager else CASE_RETRIES_ENABLED
+
+    def run_due_retries(self, wait=False):
+        """Process the failed cases whose backoff elapsed; with wait, also sleep for the ones still queued"""
+        while self.retries_enabled and not self.stop_requested:
+            due = self.retry_scheduler.due()
+            if not due:
+                if not wait or not self.retry_scheduler.pending():
+                    return
+                seconds = self.retry_scheduler.seconds_until_next()
+                self.log("info", f"Esperando {seconds:.0f} segundos para reintentar {self.retry_scheduler.pending()} casos")
+                deadline = time.monotonic() + seconds
+                while not self.stop_requested and time.monotonic() < deadline:
+                    time.sleep(min(1.0, max(deadline - time.monotonic(), 0)))
+                continue
+
+            for group_number, cases in due:
+                if self.stop_requested:
+                    break
+                delay = random_delay_long()
+                self.log("info", f"Esperando {delay:.1f} segundos antes de reintentar NDO {cases[0][1].get('NDO')}")
+                self.ensure_portal_session()
+                self.process_group_supervised(group_number, cases)
+
+        if self.stop_requested and self.retry_scheduler.pending():
+            self.log("info", f"Parada solicitada - {self.retry_scheduler.pending()} casos en espera de reintento quedan para la próxima ejecución")
+
+    def ensure_portal_session(self):
+        """Log in again before a retry when the portal session expired"""
+        if not self.credentials or not self.new_page:
+            return
+        try:
+            if self.probe_session(self.new_page.context, self.new_page.url):
+                return
+        except Exception as e:
+            self.log("warning", f"No se pudo verificar la sesión del portal antes de reintentar: {str(e)}")
+            return
+
+        self.log("warning", "La sesión del portal venció - Iniciando sesión nuevamente antes de reintentar")
+        expired_page = self.new_page
+        self.unwatch_page(expired_page)
+        self.open_start_page()
+        self.open_portal(*self.credentials)
+        try:
+            expired_page.context.close()
+        except Exception:
+            pass
+
+    def retry_case(self, case_index, failure):
+        """Send a failed case to the delayed retry queue instead of marking it 'No'; False when it must fail"""
+        if not self.retries_enabled:
+            return False
+        row = self.excel_data[case_index]
+        stage = self.case_store.stage(CaseStore.case_key(row))
+        error_class, retry, delay = self.retry_scheduler.schedule(self.case_group_numbers.get(case_index, 0),
+                                                                  case_index, row, failure, stage)
+        if retry is None:
+            return False
+
+        self.log("warning", f"NDO {row.get('NDO')}: Error {ERROR_CLASS_LABELS[error_class]} ({failure.get('Status')}) - "
+                            f"Reintento {retry}/{self.retry_scheduler.budgets[error_class]} en {delay:.0f} segundos")
+        return True
+
+    def process_in_worker_processes(self, username, password, excel_data):
+        """Process the cases on PROCESS_WORKERS browser processes; this instance only coordinates"""
+        worker_count = self.settings_manager.get_process_workers() if self.settings_manager else PROCESS_WORKERS
+        worker_count = max(1, min(worker_count, len(excel_data)))
+        self.log("info", f"Procesando {len(excel_data)} casos en {worker_count} procesos")
+        processing_start = time.perf_counter()
+        self.processed_rows = []
+        self.failed_rows = []
+
+        self.worker_reports = ProcessPoolRunner(self, worker_count).run(username, password, excel_data)
+
+        self.processing_seconds = time.perf_counter() - processing_start
+        if self.case_source:
+            self.case_source.request_flush()
+        self.log("info", f"Procesamiento en procesos completado. Exitosos: {len(self.processed_rows)}, Fallidos: {len(self.failed_rows)}")
+
+    def process_with_async_engine(self, username, password, excel_data):
+        """Log in and process the cases with the asyncio engine; this instance keeps the results"""
+        from async_automation import AsyncBrowserAutomation
+
+        self.log("info", f"Procesando {len(excel_data)} casos con el motor asíncrono")
+        processing_start = time.perf_counter()
+        try:
+            asyncio.run(AsyncBrowserAutomation(self).run(username, password, excel_data))
+        finally:
+            self.processing_seconds = time.perf_counter() - processing_start
+            if self.case_source:
+                self.case_source.request_flush()
+        self.log("info", f"Procesamiento asíncrono completado. Exitosos: {len(self.processed_rows)}, Fallidos: {len(self.failed_rows)}")
+
+    def process_patient(self, group_number, cases):
+        """Search one NDO once, then match and handle each of its sheet rows against that results table"""
+        first_index, first_row = cases[0]
+        ndo = first_row.get('NDO', f'Fila_{first_index + 1}')
+        filas = ", ".join(str(index + 1) for index, _ in cases)
+        self.log("info", f"Iniciando procesamiento de NDO: {ndo} (Filas {filas})")
+        for _, row in cases:
+            self.case_store.start_attempt(CaseStore.case_key(row))
+        self.prefetch_informes(group_number)
+
+        matched_ids, data_id_hints = set(), {}
+        cache_ttl = self.search_cache_ttl()
+        if cache_ttl:
+            cases, matched_ids, data_id_hints = self.resolve_from_search_cache(ndo, cases, cache_ttl)
+            if not cases:
+                return
+
+        try:
+            # only a table told apart from the previous NDO's results is safe to reuse in a later run
+            checked = can_check_results(ndo, self.last_search)
+            table_data = self.search_ndo(ndo)
+            if table_data and cache_ttl and checked:
+                self.case_store.save_search(ndo, table_data)
+        except Exception as e:
+            self.check_browser(e)
+            screenshot_path = self.take_screenshot(f"error_ndo_{ndo}")
+            self.log("error", f"NDO {ndo}: Error en procesamiento - {str(e)}", screenshot_path)
+            for index, _ in cases:
+                self.finish_case(index, *CaseOutcome(ndo).error(e, screenshot_path))
+            return
+
+        for position, (index, row) in enumerate(cases):
+            if position > 0:
+                if self.stop_requested:
+                    self.log("info", f"Parada solicitada - NDO {ndo}: quedan {len(cases) - position} casos para la próxima ejecución")
+                    return
+                delay = random_delay_micro()
+                self.log("info", f"NDO {ndo}: Esperando {delay:.1f} segundos antes del siguiente COD")
+                table_data = self.refresh_table_data(ndo, table_data)
+            self.process_case(index, row, table_data, matched_ids, data_id_hints.get(index))
+
+    def search_cache_ttl(self):
+        """Seconds a saved results table stays valid (0 disables the search cache)"""
+        hours = self.settings_manager.get_search_cache_ttl_hours() if self.settings_manager else SEARCH_CACHE_TTL_HOURS
+        return hours * 3600
+
+    def resolve_from_search_cache(self, ndo, cases, ttl):
+        """Settle the NDO's cases that its cached results table shows as transmitted.
+
+        Returns the cases that still need the portal, the data_ids already
+        used and, for cases found in the cache, the data_id of their row.
+        """
+        cached = self.case_store.cached_search(ndo, ttl)
+        if cached is None:
+            return cases, set(), {}
+
+        table_data, age = cached
+        self.log("info", f"NDO {ndo}: Resultados de búsqueda en caché (hace {age / 60:.0f} min, {len(table_data)} filas)")
+        pending, matched_ids, hinted, data_id_hints = [], set(), set(), {}
+        for index, row in cases:
+            cod_excel = row.get('CODIGO_PAMI', '')
+            table_row = find_practica(table_data, cod_excel, matched_ids | hinted)
+            if table_row and is_completed_row(table_row):
+                matched_ids.add(table_row.get('data_id'))
+                self.log("info", f"NDO {ndo}: COD {cod_excel} ya completado y aceptado según la caché - Marcando como completado sin buscar.")
+                self.finish_case(index, *CaseOutcome(ndo, cod_excel, len(table_data)).already_completed(cached=True))
+                self.case_store.record_search_resolved()
+                continue
+            if table_row:
+                hinted.add(table_row.get('data_id'))
+                data_id_hints[index] = table_row.get('data_id')
+            pending.append((index, row))
+
+        if pending:
+            self.log("info", f"NDO {ndo}: {len(pending)} casos requieren buscar en el portal")
+        return pending, matched_ids, data_id_hints
+
+    def search_ndo(self, ndo):
+        """Run the Afiliado/fecha/NDO search and return the rows of the results table"""
+        # seleccionar Nro. Documento del dropdown
+        self.log("info", f"NDO {ndo}: Seleccionando 'Nro. Documento' en dropdown 'Afiliado Por'")
+        self.new_page.wait_for_selector(AFILIADO_DROPDOWN, state="visible")
+        self.new_page.select_option(AFILIADO_DROPDOWN, value=AFILIADO_DROPDOWN_VALUE)
+        self.log("info", f"NDO {ndo}: Selección completada")
+        
+        delay = random_delay_micro()
+        self.log("info", f"NDO {ndo}: Esperando {delay:.1f} segundos después de selección")
+
+        # ingresar primer dia del mes anterior en el campo 'Fecha turno desde'
+        date_value = get_first_day_of_month()
+        self.log("info", f"NDO {ndo}: Ingresando fecha {date_value}")
+        self.new_page.wait_for_selector(FECHA_TURNO_FIELD, state="visible")
+        self.new_page.click(FECHA_TURNO_FIELD)  # Foco
+        self.new_page.fill(FECHA_TURNO_FIELD, "")  # Limpiar
+        self.new_page.type(FECHA_TURNO_FIELD, date_value, delay=100)
+        self.new_page.press(FECHA_TURNO_FIELD, "Enter")
+        self.log("info", f"NDO {ndo}: Fecha tipeada y confirmada correctamente")
+
+        delay = random_delay_short()
+        self.log("info", f"NDO {ndo}: Esperando {delay:.1f} segundos entre fecha y NDO")
+
+        self.log("info", f"NDO {ndo}: Ingresando NDO en campo de afiliado")
+        self.new_page.wait_for_selector(AFILIADO_NUMBER_FIELD, state="visible")
+        self.new_page.fill(AFILIADO_NUMBER_FIELD, str(ndo))
+        self.log("info", f"NDO {ndo}: NDO ingresado correctamente")
+        
+        delay = random_delay_micro()
+        self.log("info", f"NDO {ndo}: Esperando {delay:.1f} segundos antes de buscar")
+
+        # apretar en el botón Buscar
+        self.log("info", f"NDO {ndo}: Haciendo clic en botón Buscar")
+        self.new_page.wait_for_selector(SEARCH_BUTTON, state="visible")
+        with self.portal_waits.step(self.new_page, "búsqueda", ndo, response_urls=SEARCH_RESPONSE_URLS,
+                                    mutation_selector=ORDERS_TABLE_BODY, fallback_kind="short") as search_step:
+            self.new_page.click(SEARCH_BUTTON)
+        if not search_step['ok']:
+            raise AutomationError(f"La búsqueda del NDO {ndo} no actualizó la tabla de resultados")
+        self.log("info", f"NDO {ndo}: Búsqueda completada")
+        
+        # extraer datos de la tabla
+        table_data = self.extract_table_data(ndo)
+        if stale_result_ids(ndo, table_data, self.last_search):
+            raise AutomationError(f"La tabla de resultados todavía muestra órdenes del NDO {self.last_search[0]}")
+        self.last_search = (ndo, {row.get('data_id') for row in table_data})
+        return table_data
+
+    def refresh_table_data(self, ndo, table_data):
+        """Re-read the results rows (button states change after an upload/transmit) without searching again"""
+        try:
+            return self.snapshot_table_rows() or table_data
+        except Exception as e:
+            self.log("warning", f"NDO {ndo}: No se pudo releer la tabla, se usan los datos de la búsqueda: {str(e)}")
+            return table_data
+
+    def process_case(self, index, row, table_data, matched_ids=None, data_id_hint=None):
+        """Match one sheet row against its NDO's results table, then upload and transmit its informe as needed"""
+        ndo = row.get('NDO', f'Fila_{index + 1}')
+        cod_excel = row.get('CODIGO_PAMI', '')
+        case_key = CaseStore.case_key(row)
+        matched_ids = matched_ids if matched_ids is not None else set()
+        outcome = CaseOutcome(ndo, cod_excel, len(table_data))
+
+        try:
+            if not table_data:
+                self.log("warning", f"NDO {ndo}: No se encontraron datos en la tabla.")
+                self.finish_case(index, *outcome.no_results())
+                return
+
+            # verificar si coinciden los datos del excel con los de la tabla ('COD' en excel con 'Practica' en tabla)
+            self.log("info", f"NDO {ndo}: Buscando COD {cod_excel} en {len(table_data)} resultados de la tabla.")
+            matching_row = match_practica(table_data, cod_excel, matched_ids, data_id_hint)
+            if not matching_row:
+                self.log("warning", f"NDO {ndo}: COD {cod_excel} no encontrado en ninguna fila de la tabla")
+                self.finish_case(index, *outcome.cod_not_found())
+                return
+
+            self.log("info", f"NDO {ndo}: COD {cod_excel} encontrado en la tabla.")
+            matched_ids.add(matching_row.get('data_id'))
+            self.case_store.set_stage(case_key, 'matched', data_id=matching_row.get('data_id'))
+
+            button_status, error_screenshot = self.check_button_status(ndo, matching_row)
+
+            if button_status == ROW_ALREADY_COMPLETED:
+                self.log("info", f"NDO {ndo}: Caso ya completado y aceptado - Marcando como completado.")
+                self.finish_case(index, *outcome.already_completed())
+                return
+            if button_status == ROW_PROCESSED:
+                self.log("info", f"NDO {ndo}: Caso ya procesado o validacion manual pendiente - Marcando como completado.")
+                self.finish_case(index, *outcome.already_processed())
+                return
+            if button_status != ROW_NEEDS_UPLOAD:
+                self.log("warning", f"NDO {ndo}: Estado del boton no pudo ser determinado.")
+                self.finish_case(index, *outcome.unknown_button(button_status, error_screenshot))
+                return
+
+            self.log("info", f"NDO {ndo}: Boton de carga azul encontrado - Verificando estado de carga.")
+            upload_status, upload_error_screenshot = self.check_upload_button_status(ndo, matching_row)
+
+            if upload_status == UPLOAD_NEEDED:
+                self.log("info", f"NDO {ndo}: Requiere subir archivo - Procesando...")
+                informe_url = row.get('Informe', '')
+                if not informe_url:
+                    self.log("error", f"NDO {ndo}: No se encontró URL de informe en el Excel")
+                    self.finish_case(index, *outcome.missing_informe_url())
+                    return
+
+                self.case_store.set_stage(case_key, 'uploading')
+                self.case_store.invalidate_search(ndo)
+                upload_result = self.handle_file_upload_modal(ndo, matching_row, informe_url)
+                self.log("info", f"NDO {ndo}: Upload result: {upload_result}")
+                if upload_result is not True:
+                    error_screenshot = upload_result[1] if isinstance(upload_result, tuple) else None
+                    self.finish_case(index, *outcome.upload_failed(error_screenshot))
+                    return
+                self.log("info", f"NDO {ndo}: Archivo subido exitosamente - Verificando para transmitir")
+            elif upload_status == UPLOAD_DONE:
+                self.log("info", f"NDO {ndo}: Archivo ya subido - Trasmitiendo.")
+            else:
+                self.log("warning", f"NDO {ndo}: Estado del botón de carga no pudo ser determinado.")
+                self.finish_case(index, *outcome.unknown_upload(upload_status, upload_error_screenshot))
+                return
+
+            already_uploaded = upload_status == UPLOAD_DONE
+            self.case_store.set_stage(case_key, 'transmitting')
+            self.case_store.invalidate_search(ndo)
+            transmit_result, transmit_error_screenshot = self.check_and_transmit(ndo, matching_row)
+            if transmit_result:
+                self.finish_case(index, *outcome.transmitted(already_uploaded))
+            else:
+                self.finish_case(index, *outcome.transmit_failed(already_uploaded, transmit_error_screenshot))
+        except BrowserLost:
+            raise
+        except Exception as e:
+            self.check_browser(e)
+            screenshot_path = self.take_screenshot(f"error_ndo_{ndo}")
+            self.log("error", f"NDO {ndo}: Error en procesamiento - {str(e)}", screenshot_path)
+            self.finish_case(index, *outcome.error(e, screenshot_path))
+
+    def finish_case(self, index, row_data, value):
+        """Record a case's report row and write its 'Procesado' value"""
+        if self.informe_prefetcher:
+            self.informe_prefetcher.release(self.excel_data[index].get('Informe', ''))
+        if value == 'Si':
+            self.processed_rows.append(row_data)
+            self.update_case_as_processed(index)
+        else:
+            self.update_case_as_failed(index, row_data)
+
+    def snapshot_table_rows(self, data_id=None):
+        """Return every results row (or only the one with data_id) with its buttons, in one evaluate call"""
+        return table_rows(self.new_page.evaluate(TABLE_SNAPSHOT_SCRIPT, table_snapshot_args(data_id)))
+
     def extract_table_data(self, ndo):
         try:
             self.log("info", f"NDO {ndo}: Esperando que aparezca la tabla de resultados.")
             self.new_page.wait_for_selector(RESULTS_TABLE, state="visible", timeout=10000)
-            
-            delay = random_delay_micro()
-            self.log("info", f"NDO {ndo}: Esperando {delay:.1f} segundos para estabilización de tabla")
         
-            rows = self.new_page.query_selector_all(TABLE_ROWS)
+            table_data = self.snapshot_table_rows()
 
-            if not rows:
+            if not table_data:
                 self.log("warning", f"NDO {ndo}: No se encontraron resultados en la tabla.")
                 return []
 
-            table_data = []
-            self.log("info", f"NDO {ndo}: Se encontraron {len(rows)} filas en la tabla.")
-
-            for index, row in enumerate(rows):
-                try:
-                    data_id = row.get_attribute("data-id")
-                    data_practica = row.get_attribute("data-practica")
-                    data_n_orden = row.get_attribute("data-n_orden")
-                    data_n_beneficio = row.get_attribute("data-n_beneficio")
-
-                    cells = row.query_selector_all("td")
-                    if len(cells) >= 7:
-                        row_data = {
-                            'data_id': data_id,
-                            'data_practica': data_practica,
-                            'data_n_orden': data_n_orden,
-                            'data_n_beneficio': data_n_beneficio,
-                            'nro_orden': cells[0].inner_text().strip(),
-                            'fecha_emision': cells[1].inner_text().strip(),
-                            'nro_beneficio': cells[2].inner_text().strip(),
-                            'apellido_nombre': cells[3].inner_text().strip(),
-                            'practica': cells[4].inner_text().strip(),
-                            'turno': cells[5].inner_text().strip(),
-                            'transmitida': cells[6].inner_text().strip()
-                        }
-                        table_data.append(row_data)
-                        self.log("info", f"NDO {ndo}: Fila {index + 1} extraída - Orden: {row_data['nro_orden']}")
-
-                except Exception as e:
-                    self.log("warning", f"NDO {ndo}: Error extrayendo fila {index + 1}: {str(e)}")
-                    continue
-                
-            self.log("info", f"NDO {ndo}: Extracción de tabla completada. {len(table_data)} filas procesadas")
+            ordenes = ", ".join(row['nro_orden'] for row in table_data)
+            self.log("info", f"NDO {ndo}: Extracción de tabla completada. {len(table_data)} filas procesadas - Órdenes: {ordenes}")
             return table_data
 
         except Exception as e:
@@ -652,69 +1147,37 @@ class BrowserAutomation:
             delay = random_delay_micro()
             self.log("info", f"NDO {ndo}: Esperando {delay:.1f} segundos antes de verificar botón")
             
-            data_id = matching_row_data.get('data_id')
-            row_selector = f"{TABLE_ROWS}[data-id='{data_id}']"
-            
-            button_selector = f"{row_selector} {VALIDATION_BUTTON}"
-
-            try:
-                self.new_page.wait_for_selector(button_selector, state="visible", timeout=5000)
-                button = self.new_page.query_selector(button_selector)
-                
-                if not button:
-                    self.log("info", f"NDO {ndo}: No se encontró el botón de validación - Caso ya procesado y aceptado")
-                    return "already_completed", None
-                
-                classes = button.get_attribute("class")
-                
-                if BTN_SUCCESS_CLASS in classes:
-                    self.log("info", f"NDO {ndo}: Botón verde - Validación manual no realizada")
-                    return "processed", None
-                elif BTN_PRIMARY_CLASS in classes:
-                    self.log("info", f"NDO {ndo}: Botón azul - Requiere carga de archivo")
-                    return "needs_upload", None
-                else:
-                    self.log("info", f"NDO {ndo}: Estado del botón no reconocido - Asumiendo ya procesado")
-                    return "already_completed", None
-                    
-            except Exception as selector_error:
-                self.log("info", f"NDO {ndo}: No se pudo encontrar botón de validación - Caso ya procesado y aceptado")
-                return "already_completed", None
+            matching_row_data.update(self.current_row_buttons(ndo, matching_row_data.get('data_id')))
+            button_status = validation_state(matching_row_data)
+            self.log("info", f"NDO {ndo}: {VALIDATION_STATE_LOGS[button_status]}")
+            return button_status, None
                 
         except Exception as e:
             screenshot_path = self.take_screenshot(f"button_check_error_ndo_{ndo}")
             self.log("error", f"NDO {ndo}: Error verificando estado del botón: {str(e)}", screenshot_path)
             return "error", screenshot_path
                 
+    def current_row_buttons(self, ndo, data_id):
+        """Re-read the row's buttons, waiting up to VALIDATION_BUTTON_TIMEOUT for its validation button"""
+        current_rows = self.snapshot_table_rows(data_id)
+        button = current_rows[0].get('validation_button') if current_rows else None
+        if not button or not button['visible']:
+            try:
+                self.new_page.wait_for_function(ROW_BUTTONS_READY_SCRIPT, arg=validation_button_args(data_id),
+                                                timeout=VALIDATION_BUTTON_TIMEOUT)
+            except Exception:
+                self.log("info", f"NDO {ndo}: El botón de validación no apareció en {VALIDATION_BUTTON_TIMEOUT / 1000:.0f} segundos")
+                return row_without_buttons()
+            current_rows = self.snapshot_table_rows(data_id)
+        return current_rows[0] if current_rows else row_without_buttons()
+
     def check_upload_button_status(self, ndo, matching_row_data):
         try:
             self.log("info", f"NDO {ndo}: Verificando estado del botón de carga")
             
-            data_id = matching_row_data.get('data_id')
-            row_selector = f"{TABLE_ROWS}[data-id='{data_id}']"
-            
-            upload_button_selector = f"{row_selector} {UPLOAD_BUTTON}"
-
-            self.new_page.wait_for_selector(upload_button_selector, state="visible", timeout=5000)
-            
-            upload_button = self.new_page.query_selector(upload_button_selector)
-            
-            if not upload_button:
-                self.log("error", f"NDO {ndo}: No se encontró el botón de carga.")
-                return "unknown", None
-            
-            classes = upload_button.get_attribute("class")
-            
-            if BTN_SUCCESS_CLASS in classes:
-                self.log("info", f"NDO {ndo}: Botón de carga verde - Requiere subir archivo.")
-                return "needs_file_upload", None
-            elif BTN_PRIMARY_CLASS in classes:
-                self.log("info", f"NDO {ndo}: Botón de carga azul - Archivo ya subido.")
-                return "file_already_uploaded", None
-            else:
-                bg_color = self.new_page.evaluate("(element) => window.getComputedStyle(element).backgroundColor", upload_button)
-                self.log("info", f"NDO {ndo}: Color de fondo del botón de carga: {bg_color}")
-                return "unknown", None
+            upload_status = upload_state(matching_row_data)
+            self.log("info", f"NDO {ndo}: {UPLOAD_STATE_LOGS[upload_status]}")
+            return upload_status, None
                 
         except Exception as e:
             screenshot_path = self.take_screenshot(f"upload_button_check_error_ndo_{ndo}")
@@ -737,15 +1200,14 @@ class BrowserAutomation:
             row_selector = f"{TABLE_ROWS}[data-id='{data_id}']"
             upload_button_selector = f"{row_selector} {UPLOAD_BUTTON}"
             
-            self.new_page.click(upload_button_selector)
-            self.log("info", f"NDO {ndo}: Botón de carga presionado")
+            options_ready = (MODAL_OPTIONS_READY_SCRIPT, {'selector': MODAL_DOCTYPE_DROPDOWN, 'text': INFORME_OPTION_TEXT})
+            with self.portal_waits.step(self.new_page, "modal de carga", ndo, condition=options_ready, fallback_kind="short"):
+                self.new_page.click(upload_button_selector)
+                self.log("info", f"NDO {ndo}: Botón de carga presionado")
             
             self.log("info", f"NDO {ndo}: Esperando que aparezca el modal de carga")
             self.new_page.wait_for_selector(MODAL_DOCTYPE_DROPDOWN, state="visible", timeout=10000)
             
-            delay = random_delay_short()
-            self.log("info", f"NDO {ndo}: Esperando {delay:.1f} segundos para que cargue el modal")
-            
             self.log("info", f"NDO {ndo}: Modal de carga detectado, obteniendo opciones del dropdown")
             
             options = self.new_page.query_selector_all(f"{MODAL_DOCTYPE_DROPDOWN} option")
@@ -779,7 +1241,7 @@ class BrowserAutomation:
             
             self.log("info", f"NDO {ndo}: Esperando que aparezca el campo de archivo")
             self.new_page.wait_for_selector(MODAL_FILE_INPUT, state="visible", timeout=10000)
-            time.sleep(2)
+            settle_delay(2)
             
             self.log("info", f"NDO {ndo}: Preparando carga del archivo descargado: {downloaded_file_path}")
             
@@ -789,11 +1251,10 @@ class BrowserAutomation:
             
             file_chooser = fc_info.value
             self.log("info", f"NDO {ndo}: Seleccionando archivo en el diálogo")
-            file_chooser.set_files(downloaded_file_path)
-            self.log("info", f"NDO {ndo}: Archivo seleccionado exitosamente")
-            
-            delay = random_delay_file_operations()
-            self.log("info", f"NDO {ndo}: Esperando {delay:.1f} segundos después de seleccionar archivo")
+            with self.portal_waits.step(self.new_page, "carga de archivo", ndo, response_urls=UPLOAD_RESPONSE_URLS,
+                                        mutation_selector=DOCUMENTS_TABLE_BODY, fallback_kind="file_operations"):
+                file_chooser.set_files(self.informe_upload_file(ndo, downloaded_file_path))
+                self.log("info", f"NDO {ndo}: Archivo seleccionado exitosamente")
             
             self.log("info", f"NDO {ndo}: Esperando confirmación de carga de archivo")
             try:
@@ -850,25 +1311,41 @@ class BrowserAutomation:
         
         return True
         
+    def open_informe_cache(self):
+        """Informe cache of the downloads directory, opened on first use"""
+        if self.informe_cache is None:
+            downloads_dir = self.settings_manager.get_downloads_dir() if self.settings_manager else DOWNLOADS_DIR
+            max_mb = self.settings_manager.get_informe_cache_max_mb() if self.settings_manager else INFORME_CACHE_MAX_MB
+            self.informe_cache = InformeCache(downloads_dir, max_mb * 1024 * 1024, self.logger)
+        return self.informe_cache
+
+    def start_informe_prefetch(self):
+        depth = self.settings_manager.get_informe_prefetch_depth() if self.settings_manager else INFORME_PREFETCH_DEPTH
+        self.informe_prefetcher = InformePrefetcher(self.open_informe_cache(), depth, self.logger)
+
+    def prefetch_informes(self, group_number):
+        """Start downloading the informes of this NDO's other cases and of the next queued cases"""
+        if not self.informe_prefetcher:
+            return
+        current = self.case_groups[group_number][1:]
+        upcoming = [case for cases in self.case_groups[group_number + 1:] for case in cases]
+        for _, row in current + upcoming[:self.informe_prefetcher.depth]:
+            self.informe_prefetcher.prefetch(row.get('Informe', ''))
+
+    @staticmethod
+    def informe_upload_file(ndo, filepath):
+        """File payload for the upload input: cached content under the informe_{ndo}.pdf name"""
+        with open(filepath, 'rb') as file:
+            return {'name': f"informe_{ndo}.pdf", 'mimeType': 'application/pdf', 'buffer': file.read()}
+
     def download_file(self, ndo, informe_url):
         try:
-            downloads_dir = self.settings_manager.get_downloads_dir() if self.settings_manager else DOWNLOADS_DIR
-            
-            if not os.path.exists(downloads_dir):
-                os.makedirs(downloads_dir)
-                
-            self.log("info", f"NDO {ndo}: Descargando archivo desde: {informe_url}")
-            
-            response = requests.get(informe_url, timeout = 30)
-            response.raise_for_status()
-            
-            filename = f"informe_{ndo}.pdf"
-            filepath = os.path.join(downloads_dir, filename)
-            
-            with open(filepath, 'wb') as file:
-                file.write(response.content)
-                
-            self.log("info", f"NDO {ndo}: Archivo descargado exitosamente: {filepath}")
+            self.log("info", f"NDO {ndo}: Obteniendo archivo desde: {informe_url}")
+            if self.informe_prefetcher:
+                filepath = self.informe_prefetcher.get(informe_url)
+            else:
+                filepath = self.open_informe_cache().fetch(informe_url)
+            self.log("info", f"NDO {ndo}: Archivo disponible: {filepath}")
             return filepath
         
         except Exception as e:
@@ -879,136 +1356,169 @@ class BrowserAutomation:
         try:
             self.log("info", f"NDO {ndo}: Verificando estado de ambos botones antes de transmitir")
             
-            delay = random_delay_short()
-            self.log("info", f"NDO {ndo}: Esperando {delay:.1f} segundos antes de verificar transmisión")
-            
             data_id = matching_row_data.get('data_id')
             row_selector = f"{TABLE_ROWS}[data-id='{data_id}']"
             
-            time.sleep(3)
+            fixed_delay = self.pacer.compute_delay("short") + self.pacer.compute_delay("settle", 3)
+            buttons_ready = (ROW_BUTTONS_READY_SCRIPT, transmit_buttons_args(data_id))
+            with self.portal_waits.step(self.new_page, "botones listos para transmitir", ndo, condition=buttons_ready,
+                                        fixed_delay=fixed_delay, timeout=max(int(fixed_delay * 1000), 3000)):
+                pass
             
-            check_button_selector = f"{row_selector} {VALIDATION_BUTTON}"
-            check_button = self.new_page.query_selector(check_button_selector)
+            current_rows = self.snapshot_table_rows(data_id)
+            current_row = current_rows[0] if current_rows else {}
             
-            if not check_button:
-                self.log("error", f"NDO {ndo}: No se encontró el botón de validación")
+            if not ready_to_transmit(current_row):
+                self.log("error", f"NDO {ndo}: Los botones de validación y carga no están listos para transmitir")
                 return False, None
             
-            check_classes = check_button.get_attribute("class")
-            check_is_blue = BTN_PRIMARY_CLASS in check_classes
-            
-            upload_button_selector = f"{row_selector} {UPLOAD_BUTTON}"
-            upload_button = self.new_page.query_selector(upload_button_selector)
+            self.log("info", f"NDO {ndo}: Ambos botones están azules - Procediendo a transmitir")
             
-            if not upload_button:
-                self.log("error", f"NDO {ndo}: No se encontró el botón de carga")
-                return False, None
+            delay = random_delay_short()
+            self.log("info", f"NDO {ndo}: Esperando {delay:.1f} segundos antes de transmitir")
+       
+            transmit_button_selector = f"{row_selector} {TRANSMIT_BUTTON}"
             
-            upload_classes = upload_button.get_attribute("class")
-            upload_is_blue = BTN_PRIMARY_CLASS in upload_classes
+            self.new_page.wait_for_selector(transmit_button_selector, state="visible", timeout=5000)
+            self.new_page.click(transmit_button_selector)
             
-            self.log("info", f"NDO {ndo}: Estado botones - Validación: {'azul' if check_is_blue else 'otro'}, Carga: {'azul' if upload_is_blue else 'otro'}")
+            self.log("info", f"NDO {ndo}: Botón transmitir presionado exitosamente")
             
-            if check_is_blue and upload_is_blue:
-                self.log("info", f"NDO {ndo}: Ambos botones están azules - Procediendo a transmitir")
-                
-                delay = random_delay_short()
-                self.log("info", f"NDO {ndo}: Esperando {delay:.1f} segundos antes de transmitir")
-           
-                transmit_button_selector = f"{row_selector} {TRANSMIT_BUTTON}"
-                
-                self.new_page.wait_for_selector(transmit_button_selector, state="visible", timeout=5000)
-                self.new_page.click(transmit_button_selector)
-                
-                self.log("info", f"NDO {ndo}: Botón transmitir presionado exitosamente")
-                
-                self.log("info", f"NDO {ndo}: Esperando botón 'Confirmar'")
+            self.log("info", f"NDO {ndo}: Esperando botón 'Confirmar'")
 
-                self.new_page.wait_for_selector(TRANSMIT_CONFIRM_BUTTON, state="visible", timeout=10000)
+            self.new_page.wait_for_selector(TRANSMIT_CONFIRM_BUTTON, state="visible", timeout=10000)
 
-                confirm_buttons = self.new_page.query_selector_all(f"{TRANSMIT_CONFIRM_BUTTON}.btn.btn-success")
+            confirm_buttons = self.new_page.query_selector_all(f"{TRANSMIT_CONFIRM_BUTTON}.btn.btn-success")
 
-                confirm_button = None
-                for button in confirm_buttons:
-                    button_text = button.inner_text().strip()
-                    if CONFIRM_BUTTON_TEXT in button_text:
-                        confirm_button = button
-                        self.log("info", f"NDO {ndo}: Botón 'Confirmar' encontrado con texto: '{button_text}'")
-                        break
+            confirm_button = None
+            for button in confirm_buttons:
+                button_text = button.inner_text().strip()
+                if CONFIRM_BUTTON_TEXT in button_text:
+                    confirm_button = button
+                    self.log("info", f"NDO {ndo}: Botón 'Confirmar' encontrado con texto: '{button_text}'")
+                    break
 
-                if not confirm_button:
-                    self.log("error", f"NDO {ndo}: No se encontró el botón 'Confirmar' específico")
-                    return False, None
+            if not confirm_button:
+                self.log("error", f"NDO {ndo}: No se encontró el botón 'Confirmar' específico")
+                return False, None
 
-                self.log("info", f"NDO {ndo}: Haciendo clic en botón 'Confirmar' y manejando diálogo")
+            self.log("info", f"NDO {ndo}: Haciendo clic en botón 'Confirmar' y manejando diálogo")
 
-                try:
-                    with self.new_page.expect_event("dialog", timeout=15000) as dialog_info:
-                        confirm_button.click()
-                        
-                    dialog = dialog_info.value
-                    dialog_message = dialog.message
-                    self.log("info", f"NDO {ndo}: Dialogo del navegador recibido: '{dialog_message}'")
+            try:
+                with self.new_page.expect_event("dialog", timeout=15000) as dialog_info:
+                    confirm_button.click()
                     
-                    dialog.accept()
-
-                    if TRANSMISSION_SUCCESS_TEXT in dialog_message:
-                        self.log("info", f"NDO {ndo}: Diálogo de confirmación aceptado - Transmisión completada")
-                    else:
-                        self.log("warning", f"NDO {ndo}: Mensaje de diálogo inesperado: {dialog_message}")
-                    return True, None
-                except Exception as dialog_error:
-                    self.log("error", f"NDO {ndo}: Error manejando diálogo: {str(dialog_error)}")
-                    return False, None
+                dialog = dialog_info.value
+                dialog_message = dialog.message
+                self.log("info", f"NDO {ndo}: Dialogo del navegador recibido: '{dialog_message}'")
                 
+                dialog.accept()
+
+                if TRANSMISSION_SUCCESS_TEXT in dialog_message:
+                    self.log("info", f"NDO {ndo}: Diálogo de confirmación aceptado - Transmisión completada")
+                else:
+                    self.log("warning", f"NDO {ndo}: Mensaje de diálogo inesperado: {dialog_message}")
+                return True, None
+            except Exception as dialog_error:
+                self.log("error", f"NDO {ndo}: Error manejando diálogo: {str(dialog_error)}")
+                return False, None
+            
         except Exception as e:
             screenshot_path = self.take_screenshot(f"transmit_error_ndo_{ndo}")
             self.log("error", f"NDO {ndo}: Error verificando/transmitiendo: {str(e)}", screenshot_path)
             return False, screenshot_path
             
+    def build_run_report(self):
+        """Metric rows describing this run, saved as the Run_Report sheet of the log"""
+        attempted = len(self.processed_rows) + len(self.failed_rows)
+        rows = [
+            {'Metrica': 'Origen de casos', 'Valor': self.case_source.description if self.case_source else ''},
+            {'Metrica': 'Casos pendientes leídos', 'Valor': len(self.excel_data)},
+            {'Metrica': 'Casos exitosos', 'Valor': len(self.processed_rows)},
+            {'Metrica': 'Casos no procesados', 'Valor': len(self.failed_rows)},
+            {'Metrica': 'Tiempo de procesamiento (s)', 'Valor': round(self.processing_seconds, 1)},
+            {'Metrica': 'Segundos por caso', 'Valor': round(self.processing_seconds / attempted, 1) if attempted else ''},
+        ]
+        rows.extend(self.pacer.report())
+        rows.extend(self.portal_waits.report())
+        rows.extend(self.resource_router.report())
+        rows.extend(self.screenshots.report())
+        rows.extend(self.retry_scheduler.report())
+        if self.recovery_seconds:
+            rows.append({'Metrica': 'Recuperaciones del navegador (cantidad / promedio s)',
+                         'Valor': f"{len(self.recovery_seconds)} / {sum(self.recovery_seconds) / len(self.recovery_seconds):.1f}"})
+        if self.informe_cache:
+            rows.extend(self.informe_cache.report())
+        rows.extend(self.case_store.search_cache_report())
+        for number, report in sorted(self.worker_reports.items()):
+            rows.extend({'Metrica': f"Proceso {number}: {item['Metrica']}", 'Valor': item['Valor']} for item in report)
+        return rows
+
     def update_case_as_processed(self, case_index):
-        try:
-            case_data = self.excel_data[case_index]
-            ndo_to_update = case_data.get('NDO')
-            cod_to_update = case_data.get('CODIGO_PAMI')
-            
-            if not ndo_to_update or not cod_to_update:
-                self.log("error", f"No NDO or COD found for case index {case_index}")
-                return
-            
-            current_data = self.google_sheet.get_all_records()
-            all_values = self.google_sheet.get_all_values()
-            header_row = all_values[0] if all_values else []
-            
-            if 'Procesado' not in header_row:
-                self.log("error", "Columna 'Procesado' no encontrada en Google Sheets")
-                return
-                
-            procesado_col = header_row.index('Procesado') + 1
-            
-            target_row = None
-            for i, record in enumerate(current_data):
-                if (str(record.get('NDO', '')) == str(ndo_to_update) and 
-                    str(record.get('CODIGO_PAMI', '')) == str(cod_to_update)):
-                    target_row = i + 2
-                    break
-            
-            if target_row is None:
-                self.log("error", f"No se encontró NDO {ndo_to_update} con COD {cod_to_update} en la hoja actual")
-                return
-            
-            current_value = self.google_sheet.cell(target_row, procesado_col).value
-            if current_value == 'Si':
-                self.log("warning", f"NDO {ndo_to_update} COD {cod_to_update} ya estaba marcado como procesado")
+        self.update_case_status(case_index, 'Si')
+        self.retry_scheduler.record_success(case_index)
+
+    def update_case_as_failed(self, case_index, failure=None):
+        """Queue the case for a retry or mark it 'No'; failure is its report row, kept when it is not retried"""
+        self.check_browser()
+        if failure is not None:
+            if self.retry_case(case_index, failure):
                 return
+            self.failed_rows.append(failure)
+        self.update_case_status(case_index, 'No')
+        self.committed_failed_rows = len(self.failed_rows)
+
+    def start_writeback(self):
+        """Start status writeback on the case source, then re-queue outcomes the store has not synced"""
+        self.case_source.start_writeback(self.sheet_row_index, on_written=self.case_store.mark_synced)
+        self.sync_case_store()
+
+    def stop_writeback(self):
+        if self.case_source:
+            self.case_source.close()
+
+    def sync_case_store(self):
+        """Queue every case outcome the store has not yet mirrored to the case source"""
+        unsynced = self.case_store.unsynced_outcomes()
+        if not unsynced:
+            return
+        
+        for key, sheet_row, outcome in unsynced:
+            target_row = self.sheet_row_index.get(key, sheet_row)
+            if target_row:
+                self.case_source.write_status(target_row, outcome, key=key)
+        self.log("info", f"{len(unsynced)} estados del almacén local pendientes de sincronizar con {self.case_source.description}")
+
+    def resume_from_store(self):
+        """Load the unfinished cases of an interrupted run from the local store, without reading the sheet"""
+        try:
+            meta = self.case_store.get_meta('sheet')
+            if not meta:
+                raise AutomationError("No hay una ejecución anterior para reanudar")
+            
+            self.log("info", "Reanudando ejecución anterior desde el almacén local")
+            self.case_source = self.case_source or create_case_source(self.settings_manager, self.logger)
+            if self.case_source.identity() != meta['identity']:
+                raise AutomationError("La ejecución anterior corresponde a otro origen de casos")
+            
+            self.sheet_column_positions = meta['column_positions']
+            self.sheet_row_index = self.case_store.sheet_rows()
+            self.excel_data = self.case_store.unfinished_cases()
+            self.already_processed_cases = []
+            self.start_writeback()
             
-            self.google_sheet.update_cell(target_row, procesado_col, 'Si')
-            self.log("info", f"NDO {ndo_to_update} COD {cod_to_update} marcado como procesado en fila {target_row}")
-            
+            self.log("info", f"Casos pendientes de la ejecución anterior: {len(self.excel_data)}")
+            return self.excel_data
+        
+        except AutomationError:
+            raise
         except Exception as e:
-            self.log("error", f"Error actualizando caso como procesado: {str(e)}")
+            self.log("error", f"Error reanudando desde el almacén local: {str(e)}")
+            raise AutomationError(f"Failed to resume from case store: {str(e)}")
 
-    def update_case_as_failed(self, case_index):
+    def update_case_status(self, case_index, value):
+        """Record the 'Procesado' value for a case; the case source writes it back in batches"""
+        self.finished_indices.add(case_index)
         try:
             case_data = self.excel_data[case_index]
             ndo_to_update = case_data.get('NDO')
@@ -1018,29 +1528,21 @@ class BrowserAutomation:
                 self.log("error", f"No NDO or COD found for case index {case_index}")
                 return
             
-            current_data = self.google_sheet.get_all_records()
-            all_values = self.google_sheet.get_all_values()
-            header_row = all_values[0] if all_values else []
+            key = (str(ndo_to_update), str(cod_to_update))
+            self.case_store.finish(key, value)
             
-            if 'Procesado' not in header_row:
-                self.log("error", "Columna 'Procesado' no encontrada en Google Sheets")
+            if not self.case_source:
+                self.log("error", "No hay origen de casos para escribir el estado")
                 return
-                
-            procesado_col = header_row.index('Procesado') + 1
-            
-            target_row = None
-            for i, record in enumerate(current_data):
-                if (str(record.get('NDO', '')) == str(ndo_to_update) and 
-                    str(record.get('CODIGO_PAMI', '')) == str(cod_to_update)):
-                    target_row = i + 2
-                    break
             
+            target_row = self.sheet_row_index.get(key)
             if target_row is None:
                 self.log("error", f"No se encontró NDO {ndo_to_update} con COD {cod_to_update} en la hoja actual")
                 return
             
-            self.google_sheet.update_cell(target_row, procesado_col, 'No')
-            self.log("info", f"NDO {ndo_to_update} COD {cod_to_update} marcado como NO procesado en fila {target_row}")
+            self.case_source.write_status(target_row, value, key=key)
+            estado = "procesado" if value == 'Si' else "NO procesado"
+            self.log("info", f"NDO {ndo_to_update} COD {cod_to_update} marcado como {estado} en fila {target_row} (pendiente de escritura)")
             
         except Exception as e:
-            self.log("error", f"Error actualizando caso como no procesado: {str(e)}")
\ No newline at end of file
+            self.log("error", f"Error actualizando estado del caso: {str(e)}")
@@ -0,0 +1,175 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from config import *
+
+
+class BrowserService:
+    """Keeps Playwright, Chromium and the logged-in OME page alive between GUI runs.
+
+    Sync Playwright objects can only be used from the thread that created
+    them, so the service owns one long-lived thread and every run is executed
+    on it through submit(). The first run launches Chromium (with the bundled
+    browser path check and install fallback of start_browser); later runs
+    attach to it and continue on the OME page left by the previous run when
+    it still belongs to the same user and its session is valid. The browser
+    is recycled when it disconnects, when the launch options change, or
+    after BROWSER_SERVICE_MAX_RUNS runs / BROWSER_SERVICE_MAX_AGE_HOURS.
+    """
+
+    def __init__(self, logger=None):
+        self.logger = logger
+        self.jobs = queue.Queue()
+        self.thread = threading.Thread(target=self.loop, name="browser-service", daemon=True)
+        self.playwright = None
+        self.browser = None
+        self.cdp_endpoint = None
+        self.signature = None
+        self.launched_at = 0.0
+        self.runs = 0
+        self.warm_page = None
+        self.warm_user = None
+
+    def log(self, level, message):
+        if self.logger:
+            getattr(self.logger, level)(message)
+
+    def start(self):
+        self.thread.start()
+
+    def submit(self, function, *args):
+        """Run function(*args) on the service thread; returns a Future"""
+        future = Future()
+        self.jobs.put((function, args, future))
+        return future
+
+    def stop(self, timeout=30):
+        """Close the browser and end the service thread"""
+        self.jobs.put(None)
+        self.thread.join(timeout)
+
+    def loop(self):
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                break
+            function, args, future = job
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(function(*args))
+            except BaseException as e:
+                future.set_exception(e)
+        self.shutdown_browser()
+
+    def prepare(self, automation, username):
+        """Give the automation the warm browser, launching or recycling it first.
+
+        Returns True when the previous run's OME page was reused, so login,
+        OME and panel navigation can be skipped.
+        """
+        signature = automation.launch_signature()
+        if self.browser is not None:
+            reason = self.recycle_reason(signature)
+            if reason:
+                self.log("info", f"Reiniciando navegador: {reason}")
+                self.shutdown_browser()
+
+        if self.browser is None:
+            start = time.perf_counter()
+            try:
+                automation.start_browser()
+            except Exception:
+                if getattr(automation, 'playwright', None):
+                    automation.playwright.stop()
+                    automation.playwright = None
+                raise
+            self.playwright = automation.playwright
+            self.browser = automation.browser
+            self.cdp_endpoint = automation.cdp_endpoint
+            self.signature = signature
+            self.launched_at = time.time()
+            self.runs = 0
+            self.log("info", f"Navegador iniciado en {time.perf_counter() - start:.1f} s - Queda abierto para las próximas ejecuciones")
+        else:
+            automation.attach_browser(self.playwright, self.browser, self.cdp_endpoint)
+            self.log("info", f"Reutilizando navegador abierto (ejecución {self.runs + 1})")
+        self.runs += 1
+
+        page, self.warm_page = self.warm_page, None
+        if page is None:
+            return False
+        if self.warm_user == username and automation.resume_warm_page(page):
+            return True
+        self.close_page(page)
+        return False
+
+    def release(self, automation, username):
+        """End a run: keep the browser and its OME page for the next one"""
+        playwright, browser = automation.playwright, automation.browser
+        try:
+            if browser is not None and browser is not self.browser:
+                # La ejecución reinició Chromium tras una caída: el servicio sigue con el nuevo
+                self.playwright = playwright
+                self.browser = browser
+                self.cdp_endpoint = automation.cdp_endpoint
+                self.launched_at = time.time()
+                self.runs = 1
+            page = automation.detach_browser()
+            if page is not None and not page.is_closed():
+                self.warm_page = page
+                self.warm_user = username
+        except Exception as e:
+            self.log("warning", f"Error liberando el navegador, se reinicia en la próxima ejecución: {str(e)}")
+            self.shutdown_browser()
+
+    def recycle_reason(self, signature):
+        if signature != self.signature:
+            return "cambiaron las opciones de lanzamiento"
+        if self.runs >= BROWSER_SERVICE_MAX_RUNS:
+            return f"{self.runs} ejecuciones con el mismo proceso"
+        if time.time() - self.launched_at > BROWSER_SERVICE_MAX_AGE_HOURS * 3600:
+            return f"abierto hace más de {BROWSER_SERVICE_MAX_AGE_HOURS} horas"
+        if not self.healthy():
+            return "el navegador no responde"
+        return None
+
+    def healthy(self):
+        """Browser still connected and answering; a dead warm page is dropped but does not recycle the browser"""
+        try:
+            if not self.browser.is_connected():
+                return False
+            if self.warm_page is not None:
+                try:
+                    self.warm_page.evaluate("() => document.readyState")
+                except Exception:
+                    self.close_page(self.warm_page)
+                    self.warm_page = None
+            return True
+        except Exception:
+            return False
+
+    @staticmethod
+    def close_page(page):
+        try:
+            page.context.close()
+        except Exception:
+            pass
+
+    def shutdown_browser(self):
+        self.warm_page = None
+        self.warm_user = None
+        try:
+            if self.browser is not None:
+                self.browser.close()
+        except Exception as e:
+            self.log("warning", f"Error cerrando navegador: {str(e)}")
+        try:
+            if self.playwright is not None:
+                self.playwright.stop()
+        except Exception as e:
+            self.log("warning", f"Error deteniendo Playwright: {str(e)}")
+        self.playwright = None
+        self.browser = None
+        self.cdp_endpoint = None
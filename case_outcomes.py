@@ -0,0 +1,143 @@
+from datetime import datetime
+from config import *
+
+# Row states read from a results row's validation button
+ROW_ALREADY_COMPLETED = "already_completed"
+ROW_PROCESSED = "processed"
+ROW_NEEDS_UPLOAD = "needs_upload"
+
+# Row states read from a results row's upload button
+UPLOAD_NEEDED = "needs_file_upload"
+UPLOAD_DONE = "file_already_uploaded"
+UPLOAD_UNKNOWN = "unknown"
+
+VALIDATION_STATE_LOGS = {
+    ROW_ALREADY_COMPLETED: "Botón de validación ausente o en otro color - Caso ya procesado y aceptado",
+    ROW_PROCESSED: "Botón verde - Validación manual no realizada",
+    ROW_NEEDS_UPLOAD: "Botón azul - Requiere carga de archivo",
+}
+
+UPLOAD_STATE_LOGS = {
+    UPLOAD_NEEDED: "Botón de carga verde - Requiere subir archivo.",
+    UPLOAD_DONE: "Botón de carga azul - Archivo ya subido.",
+    UPLOAD_UNKNOWN: "Estado del botón de carga no reconocido.",
+}
+
+
+def validation_state(table_row):
+    """State of a results row from its validation button: green, blue, or gone/other colour (completed)"""
+    button = table_row.get('validation_button')
+    if not button or not button['visible']:
+        return ROW_ALREADY_COMPLETED
+    if BTN_SUCCESS_CLASS in button['classes']:
+        return ROW_PROCESSED
+    if BTN_PRIMARY_CLASS in button['classes']:
+        return ROW_NEEDS_UPLOAD
+    return ROW_ALREADY_COMPLETED
+
+
+def is_completed_row(table_row):
+    """True only when a visible validation button shows the completed state.
+
+    Used to settle cases from a cached table without opening the portal, so a
+    missing or hidden button (which may just not have rendered yet) does not
+    count as completed here.
+    """
+    button = table_row.get('validation_button')
+    return bool(button) and button['visible'] and validation_state(table_row) == ROW_ALREADY_COMPLETED
+
+
+def upload_state(table_row):
+    """State of a results row from its upload button: green (upload), blue (uploaded) or unknown"""
+    button = table_row.get('upload_button')
+    if not button or not button['visible']:
+        return UPLOAD_UNKNOWN
+    if BTN_SUCCESS_CLASS in button['classes']:
+        return UPLOAD_NEEDED
+    if BTN_PRIMARY_CLASS in button['classes']:
+        return UPLOAD_DONE
+    return UPLOAD_UNKNOWN
+
+
+def ready_to_transmit(table_row):
+    """True when both the validation and upload buttons of the row are blue"""
+    validation = table_row.get('validation_button')
+    upload = table_row.get('upload_button')
+    return (bool(validation) and bool(upload)
+            and BTN_PRIMARY_CLASS in validation['classes'] and BTN_PRIMARY_CLASS in upload['classes'])
+
+
+class CaseOutcome:
+    """Run report row and 'Procesado' value ('Si'/'No') for each way a case can end.
+
+    Every builder returns (row_data, value), so both engines record the same
+    rows for the same portal states.
+    """
+
+    def __init__(self, ndo, cod_excel='', result_count=0):
+        self.ndo = ndo
+        self.cod_excel = cod_excel
+        self.result_count = result_count
+
+    def row(self, status, **fields):
+        return {'NDO': self.ndo, 'Status': status, 'Timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S"), **fields}
+
+    def found(self, status, button_status, **fields):
+        return self.row(status, Resultados=self.result_count, COD_Encontrado=self.cod_excel,
+                        Button_Status=button_status, **fields)
+
+    def searched(self, status, screenshot_path=None, **fields):
+        row_data = self.row(status, COD_Buscado=self.cod_excel, Resultados_Tabla=self.result_count, **fields)
+        if screenshot_path:
+            row_data['Screenshot'] = screenshot_path
+        return row_data
+
+    def error(self, error, screenshot_path=None):
+        return self.row('Error al procesar NDO.', Error=str(error),
+                        Screenshot=screenshot_path if screenshot_path else 'No se pudo tomar screenshot'), 'No'
+
+    def no_results(self):
+        return self.row('No se encontraron datos en la tabla.', Resultados=0), 'No'
+
+    def cod_not_found(self):
+        return self.searched(f'COD {self.cod_excel} no encontrado en la tabla'), 'No'
+
+    def already_completed(self, cached=False):
+        button_status = 'Already completed and accepted (cached search)' if cached else 'Already completed and accepted'
+        return self.found(f'Ya estaba completado y aceptado - COD {self.cod_excel}', button_status), 'Si'
+
+    def already_processed(self):
+        return self.found(f'Ya estaba procesado o falta validacion manual - COD {self.cod_excel}',
+                          'Already processed or manual validation missing'), 'No'
+
+    def unknown_button(self, button_status, screenshot_path=None):
+        return self.searched(f'Error determinando el estado del boton - COD {self.cod_excel}', screenshot_path,
+                             Button_Status=button_status), 'No'
+
+    def unknown_upload(self, upload_status, screenshot_path=None):
+        return self.searched(f'Error determinando estado del botón de carga - COD {self.cod_excel}', screenshot_path,
+                             Button_Status=ROW_NEEDS_UPLOAD, Upload_Status=upload_status), 'No'
+
+    def missing_informe_url(self):
+        return self.searched(f'URL de informe no encontrada - COD {self.cod_excel}',
+                             Button_Status=ROW_NEEDS_UPLOAD, Upload_Status='No informe URL'), 'No'
+
+    def upload_failed(self, screenshot_path=None):
+        return self.searched(f'Error subiendo archivo - COD {self.cod_excel}', screenshot_path,
+                             Button_Status=ROW_NEEDS_UPLOAD, Upload_Status='Upload failed'), 'No'
+
+    def transmitted(self, already_uploaded):
+        if already_uploaded:
+            return self.found(f'Archivo ya subido y transmitido - COD {self.cod_excel}',
+                              'File already uploaded and transmitted', Upload_Status='Already uploaded and completed'), 'Si'
+        return self.found(f'Archivo subido y transmitido exitosamente - COD {self.cod_excel}',
+                          'File uploaded and transmitted', Upload_Status='Completed'), 'Si'
+
+    def transmit_failed(self, already_uploaded, screenshot_path=None):
+        if already_uploaded:
+            return self.searched(f'Archivo ya subido anteriormente pero no se pudo transmitir - COD {self.cod_excel}',
+                                 screenshot_path, Button_Status=ROW_NEEDS_UPLOAD,
+                                 Upload_Status='Already uploaded, transmit failed'), 'No'
+        return self.searched(f'Archivo subido por el bot pero no se pudo transmitir - COD {self.cod_excel}',
+                             screenshot_path, Button_Status=ROW_NEEDS_UPLOAD,
+                             Upload_Status='Upload successful, transmit failed'), 'No'
@@ -0,0 +1,143 @@
+import pandas as pd
+from config import *
+
+PROCESADO_CATEGORIES = ['No', 'Si']
+
+
+class CaseRecord:
+    """Compact, read-only view of one sheet row.
+
+    All records of a read share the same column -> position map, so each
+    record only holds a tuple of values. It offers the dict-style access the
+    rest of the code uses (get, [], keys, items).
+    """
+
+    __slots__ = ('positions', 'values')
+
+    def __init__(self, positions, values):
+        self.positions = positions
+        self.values = values
+
+    def get(self, key, default=None):
+        index = self.positions.get(key)
+        return default if index is None else self.values[index]
+
+    def __getitem__(self, key):
+        return self.values[self.positions[key]]
+
+    def __contains__(self, key):
+        return key in self.positions
+
+    def keys(self):
+        return self.positions.keys()
+
+    def items(self):
+        return zip(self.positions.keys(), self.values)
+
+    def to_dict(self):
+        return dict(self.items())
+
+    def __repr__(self):
+        return f"CaseRecord({self.to_dict()!r})"
+
+
+def parse_fecha_turno(values, formats=FECHA_TURNO_FORMATS):
+    """Parse FechaTurno; unparseable values become NaT.
+
+    Without formats the format is inferred from the first value, as the
+    original pd.to_datetime read did. Otherwise each format is tried in order.
+    """
+    if not formats:
+        return pd.to_datetime(values, errors='coerce')
+    text = values.astype(str)
+    parsed = pd.Series(pd.NaT, index=values.index, dtype='datetime64[ns]')
+    for date_format in formats:
+        missing = parsed.isna()
+        if not missing.any():
+            break
+        parsed[missing] = pd.to_datetime(text[missing], format=date_format, errors='coerce')
+    return parsed
+
+
+def normalize_procesado(values):
+    """Blank, missing and zero 'Procesado' cells mean 'No'; returns a categorical column"""
+    text = values.astype(str)
+    normalized = text.mask(values.isna() | text.isin(['', '0', 'None', 'nan']), 'No')
+    categories = PROCESADO_CATEGORIES + sorted(set(normalized.unique()) - set(PROCESADO_CATEGORIES))
+    return pd.Categorical(normalized, categories=categories)
+
+
+def apply_date_range(df, date_range_start, date_range_end):
+    """Keep rows whose FechaTurno falls in the range; an end at midnight includes the whole day"""
+    fecha_turno = parse_fecha_turno(df['FechaTurno'])
+    mask = fecha_turno.notna()
+
+    if date_range_start is not None:
+        mask &= fecha_turno >= pd.Timestamp(date_range_start)
+
+    if date_range_end is not None:
+        end_date_inclusive = pd.Timestamp(date_range_end)
+        if date_range_end.hour == 0 and date_range_end.minute == 0 and date_range_end.second == 0:
+            end_date_inclusive = end_date_inclusive.replace(hour=23, minute=59, second=59)
+        mask &= fecha_turno <= end_date_inclusive
+
+    filtered = df[mask].copy()
+    filtered['FechaTurno'] = fecha_turno[mask]
+    return filtered
+
+
+def build_already_processed_report(df, timestamp):
+    """Build the 'Already_Processed' report rows column by column"""
+    count = len(df)
+
+    def column(name, default):
+        return df[name].tolist() if name in df.columns else [default] * count
+
+    report = pd.DataFrame({
+        'NDO': column('NDO', 'N/A'),
+        'COD': column('CODIGO_PAMI', 'N/A'),
+        'Status': ['Ya procesado anteriormente'] * count,
+        'Timestamp': [timestamp] * count,
+        'APE': column('APE', ''),
+        'NOM': column('NOM', ''),
+    })
+    return report.to_dict('records')
+
+
+def to_case_records(df):
+    """Convert a DataFrame to CaseRecords, reading it column by column"""
+    positions = {name: index for index, name in enumerate(df.columns)}
+    columns = [df[name].tolist() for name in df.columns]
+    return [CaseRecord(positions, values) for values in zip(*columns)]
+
+
+def classify_cases(df, date_range_start=None, date_range_end=None, timestamp=None):
+    """Filter the sheet by date range and split it into pending and already processed cases.
+
+    Returns (filtered_df, pending_records, already_processed_report).
+    """
+    if date_range_start is not None or date_range_end is not None:
+        df = apply_date_range(df, date_range_start, date_range_end)
+    else:
+        df = df.copy()
+
+    if 'Procesado' in df.columns:
+        df['Procesado'] = normalize_procesado(df['Procesado'])
+    else:
+        df['Procesado'] = pd.Categorical(['No'] * len(df), categories=PROCESADO_CATEGORIES)
+
+    if timestamp is None:
+        timestamp = pd.Timestamp.now().strftime("%Y-%m-%d %H:%M:%S")
+
+    already_processed = build_already_processed_report(df[df['Procesado'] == 'Si'], timestamp)
+    pending_records = to_case_records(df[df['Procesado'] == 'No'])
+    return df, pending_records, already_processed
+
+
+def group_cases_by_ndo(cases):
+    """Group (index, row) pairs by NDO, keeping the order in which each NDO first appears"""
+    groups = {}
+    for index, row in enumerate(cases):
+        ndo = row.get('NDO', f'Fila_{index + 1}')
+        groups.setdefault(str(ndo), []).append((index, row))
+    return list(groups.values())
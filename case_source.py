@@ -0,0 +1,373 @@
+import csv
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from openpyxl import load_workbook
+from config import *
+from sheets_client import get_worksheet
+from sheets_reader import ProjectedSheetReader, sheet_identity
+from sheets_writer import SheetsWriteBehind
+from sheet_sync import SheetDeltaSync
+
+
+class CaseSource(ABC):
+    """Where the cases are read from and where their 'Procesado' status is written back.
+
+    read() returns (header_row, {column: [raw values]}) for SHEETS_READ_COLUMNS,
+    with data starting at sheet row 2 and a 'Procesado' header guaranteed.
+    Status writes are addressed by (row, value, key) and may be buffered until
+    request_flush() or close().
+    """
+
+    description = "origen de casos"
+
+    def __init__(self, logger=None):
+        self.logger = logger
+
+    def log(self, level, message):
+        if self.logger:
+            getattr(self.logger, level)(message)
+
+    @abstractmethod
+    def identity(self):
+        pass
+
+    @abstractmethod
+    def read(self):
+        pass
+
+    @abstractmethod
+    def start_writeback(self, row_index, on_written=None):
+        pass
+
+    def pending_status_values(self):
+        return {}
+
+    @abstractmethod
+    def write_status(self, row, value, key=None):
+        pass
+
+    def request_flush(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class GoogleSheetsCaseSource(CaseSource):
+    """Cases read from the prestaciones worksheet, with write-behind status updates"""
+
+    description = "Google Sheets"
+
+    def __init__(self, settings_manager=None, logger=None):
+        super().__init__(logger)
+        self.settings_manager = settings_manager
+        self.sheet = None
+        self.sheet_sync = None
+        self.writer = None
+        self.procesado_col = None
+
+    def open_worksheet(self, refresh=False):
+        """Return the worksheet from the process-wide client cache; refresh updates its row count"""
+        if self.sheet is not None and not refresh:
+            return self.sheet
+
+        service_account_file = self.settings_manager.get_service_account_file() if self.settings_manager else SERVICE_ACCOUNT_FILE
+        sheets_id = self.settings_manager.get_google_sheets_id() if self.settings_manager else GOOGLE_SHEETS_ID
+        worksheet_name = self.settings_manager.get_worksheet_name() if self.settings_manager else WORKSHEET_NAME
+
+        self.sheet = get_worksheet(service_account_file, sheets_id, worksheet_name)
+        return self.sheet
+
+    def identity(self):
+        return sheet_identity(self.open_worksheet())
+
+    def read(self):
+        sheet = self.open_worksheet(refresh=True)
+        reader = ProjectedSheetReader(sheet, logger=self.logger)
+        header_row = reader.read_header()
+
+        if 'Procesado' not in header_row:
+            self.log("info", "Agregando columna 'Procesado' a Google Sheets")
+            sheet.update_cell(1, len(header_row) + 1, 'Procesado')
+            header_row.append('Procesado')
+            self.log("info", "Columna 'Procesado' agregada exitosamente (solo encabezado)")
+        else:
+            self.log("info", "La columna 'Procesado' ya existe en Google Sheets")
+
+        self.procesado_col = header_row.index('Procesado') + 1
+        self.sheet_sync = SheetDeltaSync(sheet, reader, logger=self.logger)
+        columns = self.sheet_sync.read(header_row)
+        return header_row, columns
+
+    def start_writeback(self, row_index, on_written=None):
+        """Start the write-behind worker, replaying writes left by a previous run"""
+        self.stop_writeback()
+        self.writer = SheetsWriteBehind(self.open_worksheet(), logger=self.logger, on_written=on_written)
+        self.writer.load_pending(row_index)
+        self.writer.start()
+
+    def stop_writeback(self):
+        if self.writer:
+            self.log("info", "Vaciando cola de escrituras a Google Sheets")
+            self.writer.stop()
+            self.writer = None
+
+    def pending_status_values(self):
+        if not self.writer or self.procesado_col is None:
+            return {}
+        return self.writer.pending_values(self.procesado_col)
+
+    def write_status(self, row, value, key=None):
+        if self.writer is None:
+            raise RuntimeError("La escritura a Google Sheets no está iniciada: falta llamar a start_writeback()")
+        if self.procesado_col is None:
+            self.procesado_col = self.open_worksheet().row_values(1).index('Procesado') + 1
+        self.writer.enqueue(row, self.procesado_col, value, key=key)
+        if self.sheet_sync:
+            self.sheet_sync.record_write(row, 'Procesado', value)
+
+    def request_flush(self):
+        if self.writer:
+            self.writer.request_flush()
+
+    def close(self):
+        self.stop_writeback()
+        if self.sheet_sync:
+            self.sheet_sync.close()
+
+
+class FileCaseSource(CaseSource):
+    """Cases read from a local .xlsx or .csv file laid out like the worksheet.
+
+    Workbooks are streamed in read-only mode, so large files are read without
+    loading them whole. Status writes are buffered and a background writer
+    writes them back to the file (atomically, through a temporary copy) at
+    most every CASE_FILE_WRITE_INTERVAL seconds and on request_flush(), so
+    rewriting a large workbook never stalls the automation thread. close()
+    stops the writer and writes what is left.
+    """
+
+    description = "archivo local"
+
+    def __init__(self, path, sheet_name=None, logger=None):
+        super().__init__(logger)
+        self.path = path
+        self.sheet_name = sheet_name
+        self.is_csv = path.lower().endswith('.csv')
+        self.pending = {}
+        self.oldest_pending = time.monotonic()
+        self.condition = threading.Condition()
+        self.flush_lock = threading.Lock()
+        self.flush_requested = False
+        self.stopping = False
+        self.thread = None
+        self.on_written = None
+        self.header_missing_procesado = False
+
+    def identity(self):
+        return {'file': os.path.abspath(self.path), 'worksheet': self.sheet_name}
+
+    def read(self):
+        if not os.path.exists(self.path):
+            raise FileNotFoundError(f"No existe el archivo de casos: {self.path}")
+
+        rows = self.iter_csv_rows() if self.is_csv else self.iter_xlsx_rows()
+        header_row = [self.cell_text(value) for value in next(rows, [])]
+
+        self.header_missing_procesado = 'Procesado' not in header_row
+        if self.header_missing_procesado:
+            self.log("info", "El archivo no tiene columna 'Procesado' - Se agregará al escribir estados")
+            header_row.append('Procesado')
+
+        positions = {name: header_row.index(name) for name in SHEETS_READ_COLUMNS if name in header_row}
+        for name in SHEETS_READ_COLUMNS:
+            if name not in positions:
+                self.log("warning", f"Columna '{name}' no encontrada en {self.path}")
+
+        columns = {name: [] for name in positions}
+        for row in rows:
+            for name, index in positions.items():
+                columns[name].append(self.cell_text(row[index]) if index < len(row) else '')
+
+        row_count = len(next(iter(columns.values()), []))
+        while row_count > 0 and all(columns[name][row_count - 1] == '' for name in columns):
+            row_count -= 1
+        for name in columns:
+            del columns[name][row_count:]
+
+        self.log("info", f"Leídas {row_count} filas de {self.path}")
+        return header_row, columns
+
+    @staticmethod
+    def cell_text(value):
+        if value is None:
+            return ''
+        if isinstance(value, float) and value.is_integer():
+            return str(int(value))
+        return str(value)
+
+    def csv_dialect(self):
+        with open(self.path, 'r', encoding='utf-8-sig', newline='') as f:
+            sample = f.read(4096)
+        try:
+            return csv.Sniffer().sniff(sample, delimiters=',;\t')
+        except csv.Error:
+            return csv.excel
+
+    def iter_csv_rows(self):
+        dialect = self.csv_dialect()
+        with open(self.path, 'r', encoding='utf-8-sig', newline='') as f:
+            for row in csv.reader(f, dialect):
+                yield row
+
+    def iter_xlsx_rows(self):
+        workbook = load_workbook(self.path, read_only=True, data_only=True)
+        try:
+            worksheet = workbook[self.sheet_name] if self.sheet_name else workbook.active
+            for row in worksheet.iter_rows(values_only=True):
+                yield row
+        finally:
+            workbook.close()
+
+    def start_writeback(self, row_index, on_written=None):
+        self.on_written = on_written
+        self.start_writer()
+
+    def start_writer(self):
+        with self.condition:
+            if self.thread and self.thread.is_alive():
+                return
+            self.stopping = False
+            self.thread = threading.Thread(target=self.run, name="case-file-writer", daemon=True)
+            self.thread.start()
+
+    def pending_status_values(self):
+        with self.condition:
+            return {row: item['value'] for row, item in self.pending.items()}
+
+    def write_status(self, row, value, key=None):
+        with self.condition:
+            if not self.pending:
+                self.oldest_pending = time.monotonic()
+            self.pending[row] = {'value': value, 'key': key}
+        self.start_writer()
+
+    def request_flush(self):
+        """Ask the writer to write everything pending now, without waiting"""
+        with self.condition:
+            self.flush_requested = True
+            self.condition.notify_all()
+
+    def close(self):
+        with self.condition:
+            thread, self.thread = self.thread, None
+            self.stopping = True
+            self.condition.notify_all()
+        if thread:
+            thread.join()
+        self.flush()
+
+    def run(self):
+        while True:
+            with self.condition:
+                while not self.stopping:
+                    if not self.pending:
+                        self.flush_requested = False
+                        self.condition.wait()
+                        continue
+                    elapsed = time.monotonic() - self.oldest_pending
+                    if self.flush_requested or elapsed >= CASE_FILE_WRITE_INTERVAL:
+                        break
+                    self.condition.wait(timeout=CASE_FILE_WRITE_INTERVAL - elapsed)
+                if self.stopping:
+                    return
+                self.flush_requested = False
+            self.flush()
+
+    def flush(self):
+        with self.flush_lock:
+            return self.flush_pending()
+
+    def flush_pending(self):
+        with self.condition:
+            self.oldest_pending = time.monotonic()
+            if not self.pending:
+                return True
+            batch = dict(self.pending)
+
+        try:
+            if self.is_csv:
+                self.write_csv(batch)
+            else:
+                self.write_xlsx(batch)
+        except Exception as e:
+            self.log("error", f"Error escribiendo {len(batch)} estados en {self.path}, se reintentará: {str(e)}")
+            return False
+
+        with self.condition:
+            for row, item in batch.items():
+                if self.pending.get(row, {}).get('value') == item['value']:
+                    del self.pending[row]
+        self.header_missing_procesado = False
+        self.log("info", f"{len(batch)} estados escritos en {self.path}")
+
+        if self.on_written:
+            try:
+                self.on_written([item['key'] for item in batch.values() if item['key']])
+            except Exception as e:
+                self.log("error", f"Error registrando escrituras confirmadas: {str(e)}")
+        return True
+
+    def write_xlsx(self, batch):
+        workbook = load_workbook(self.path)
+        worksheet = workbook[self.sheet_name] if self.sheet_name else workbook.active
+        header_row = [self.cell_text(cell.value) for cell in worksheet[1]]
+        if 'Procesado' in header_row:
+            procesado_col = header_row.index('Procesado') + 1
+        else:
+            procesado_col = len(header_row) + 1
+            worksheet.cell(row=1, column=procesado_col, value='Procesado')
+
+        for row, item in batch.items():
+            worksheet.cell(row=row, column=procesado_col, value=item['value'])
+
+        tmp_path = f"{self.path}.tmp.xlsx"
+        workbook.save(tmp_path)
+        workbook.close()
+        os.replace(tmp_path, self.path)
+
+    def write_csv(self, batch):
+        dialect = self.csv_dialect()
+        with open(self.path, 'r', encoding='utf-8-sig', newline='') as f:
+            rows = list(csv.reader(f, dialect))
+
+        header_row = rows[0] if rows else []
+        if 'Procesado' in header_row:
+            procesado_index = header_row.index('Procesado')
+        else:
+            header_row.append('Procesado')
+            procesado_index = len(header_row) - 1
+
+        for row, item in batch.items():
+            values = rows[row - 1]
+            if len(values) <= procesado_index:
+                values.extend([''] * (procesado_index + 1 - len(values)))
+            values[procesado_index] = item['value']
+
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8-sig', newline='') as f:
+            csv.writer(f, dialect).writerows(rows)
+        os.replace(tmp_path, self.path)
+
+
+def create_case_source(settings_manager=None, logger=None):
+    """Build the case source selected in the settings"""
+    source_type = settings_manager.get_case_source() if settings_manager else CASE_SOURCE
+    if source_type == CASE_SOURCE_FILE:
+        path = settings_manager.get_case_file_path() if settings_manager else CASE_FILE_PATH
+        if not path:
+            raise ValueError("No se configuró el archivo local de casos")
+        return FileCaseSource(path, logger=logger)
+    return GoogleSheetsCaseSource(settings_manager, logger=logger)
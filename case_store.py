@@ -0,0 +1,270 @@
+import json
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from config import *
+
+
+def json_default(value):
+    """Serialize numpy scalars as Python numbers and anything else (timestamps) as text"""
+    if hasattr(value, 'item'):
+        return value.item()
+    return str(value)
+
+
+class CaseStore:
+    """Local SQLite record of every case's progress, keyed by (NDO, CODIGO_PAMI).
+
+    The store is the source of truth for case state: the 'Procesado' column
+    in Google Sheets is a mirror that is synced from it, and an interrupted
+    run can be resumed from the store without reading the sheet again. It
+    also keeps the last portal results table of every NDO searched.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS cases (
+            ndo TEXT NOT NULL,
+            codigo_pami TEXT NOT NULL,
+            sheet_row INTEGER,
+            stage TEXT NOT NULL DEFAULT 'pending',
+            outcome TEXT,
+            data_id TEXT,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            payload TEXT,
+            created_at TEXT NOT NULL,
+            updated_at TEXT NOT NULL,
+            started_at TEXT,
+            finished_at TEXT,
+            synced INTEGER NOT NULL DEFAULT 1,
+            PRIMARY KEY (ndo, codigo_pami)
+        );
+        CREATE TABLE IF NOT EXISTS search_results (
+            ndo TEXT PRIMARY KEY,
+            rows TEXT NOT NULL,
+            fetched_at REAL NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS meta (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        );
+    """
+
+    def __init__(self, db_path=CASE_STORE_FILE):
+        self.db_path = db_path
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(db_path, timeout=CASE_STORE_BUSY_TIMEOUT, check_same_thread=False)
+        self.connection.row_factory = sqlite3.Row
+        with self.lock, self.connection:
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.executescript(self.SCHEMA)
+        self.search_stats = {'hits': 0, 'misses': 0, 'invalidated': 0, 'resolved': 0}
+
+    @staticmethod
+    def case_key(case_data):
+        return (str(case_data.get('NDO')), str(case_data.get('CODIGO_PAMI')))
+
+    @staticmethod
+    def now():
+        return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
+
+    def set_meta(self, key, value):
+        with self.lock, self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, json.dumps(value))
+            )
+
+    def get_meta(self, key, default=None):
+        with self.lock:
+            row = self.connection.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return json.loads(row['value']) if row else default
+
+    def queue_cases(self, cases):
+        """Register the cases of a new run as pending, keeping attempts and data_id of known cases.
+
+        Unfinished cases of earlier runs that this read no longer contains
+        (date range changed, row fixed by hand in the sheet) are retired, so
+        only the cases of the latest run can be resumed.
+        """
+        now = self.now()
+        rows = [
+            (
+                *self.case_key(case),
+                int(case['_original_sheet_row']) if case.get('_original_sheet_row') is not None else None,
+                json.dumps(case.to_dict() if hasattr(case, 'to_dict') else case, default=json_default),
+                now,
+                now,
+            )
+            for case in cases
+        ]
+        with self.lock, self.connection:
+            self.connection.executemany(
+                """
+                INSERT INTO cases (ndo, codigo_pami, sheet_row, payload, created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (ndo, codigo_pami) DO UPDATE SET
+                    sheet_row = excluded.sheet_row,
+                    payload = excluded.payload,
+                    stage = 'pending',
+                    outcome = NULL,
+                    updated_at = excluded.updated_at
+                """,
+                rows,
+            )
+            self.connection.execute(
+                "CREATE TEMP TABLE IF NOT EXISTS queued_keys (ndo TEXT, codigo_pami TEXT, PRIMARY KEY (ndo, codigo_pami))"
+            )
+            self.connection.execute("DELETE FROM queued_keys")
+            self.connection.executemany(
+                "INSERT OR IGNORE INTO queued_keys (ndo, codigo_pami) VALUES (?, ?)", [row[:2] for row in rows]
+            )
+            self.connection.execute(
+                """
+                UPDATE cases SET stage = 'retired', updated_at = ?
+                WHERE outcome IS NULL AND stage != 'retired' AND NOT EXISTS (
+                    SELECT 1 FROM queued_keys
+                    WHERE queued_keys.ndo = cases.ndo AND queued_keys.codigo_pami = cases.codigo_pami
+                )
+                """,
+                (now,),
+            )
+
+    def start_attempt(self, key):
+        now = self.now()
+        with self.lock, self.connection:
+            self.connection.execute(
+                """
+                UPDATE cases SET stage = 'started', attempts = attempts + 1, started_at = ?, updated_at = ?
+                WHERE ndo = ? AND codigo_pami = ?
+                """,
+                (now, now, *key),
+            )
+
+    def forget_attempt(self, key):
+        """Undo start_attempt for an attempt cut short by a browser crash"""
+        with self.lock, self.connection:
+            self.connection.execute(
+                """
+                UPDATE cases SET stage = 'pending', attempts = MAX(attempts - 1, 0), updated_at = ?
+                WHERE ndo = ? AND codigo_pami = ? AND outcome IS NULL
+                """,
+                (self.now(), *key),
+            )
+
+    def stage(self, key):
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT stage FROM cases WHERE ndo = ? AND codigo_pami = ?", key
+            ).fetchone()
+        return row['stage'] if row else None
+
+    def set_stage(self, key, stage, data_id=None):
+        with self.lock, self.connection:
+            self.connection.execute(
+                """
+                UPDATE cases SET stage = ?, data_id = COALESCE(?, data_id), updated_at = ?
+                WHERE ndo = ? AND codigo_pami = ?
+                """,
+                (stage, data_id, self.now(), *key),
+            )
+
+    def finish(self, key, outcome):
+        """Record the final 'Procesado' value of a case; it stays unsynced until the sheet is written"""
+        now = self.now()
+        with self.lock, self.connection:
+            self.connection.execute(
+                """
+                UPDATE cases SET stage = 'finished', outcome = ?, finished_at = ?, updated_at = ?, synced = 0
+                WHERE ndo = ? AND codigo_pami = ?
+                """,
+                (outcome, now, now, *key),
+            )
+
+    def mark_synced(self, keys):
+        with self.lock, self.connection:
+            self.connection.executemany(
+                "UPDATE cases SET synced = 1 WHERE ndo = ? AND codigo_pami = ?", list(keys)
+            )
+
+    def unsynced_outcomes(self):
+        """Return [(key, sheet_row, outcome)] for finished cases not yet written to the sheet"""
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT ndo, codigo_pami, sheet_row, outcome FROM cases WHERE synced = 0 AND outcome IS NOT NULL"
+            ).fetchall()
+        return [((row['ndo'], row['codigo_pami']), row['sheet_row'], row['outcome']) for row in rows]
+
+    def sheet_rows(self):
+        """Return {(NDO, CODIGO_PAMI): sheet_row} for every known case"""
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT ndo, codigo_pami, sheet_row FROM cases WHERE sheet_row IS NOT NULL"
+            ).fetchall()
+        return {(row['ndo'], row['codigo_pami']): row['sheet_row'] for row in rows}
+
+    def unfinished_cases(self):
+        """Return the payloads of the cases queued by the last run that never finished, in sheet order"""
+        with self.lock:
+            rows = self.connection.execute(
+                """
+                SELECT payload FROM cases
+                WHERE outcome IS NULL AND stage != 'retired' AND payload IS NOT NULL
+                ORDER BY sheet_row
+                """
+            ).fetchall()
+        return [json.loads(row['payload']) for row in rows]
+
+    def has_unfinished_cases(self):
+        with self.lock:
+            row = self.connection.execute(
+                """
+                SELECT COUNT(*) AS total FROM cases
+                WHERE outcome IS NULL AND stage != 'retired' AND payload IS NOT NULL
+                """
+            ).fetchone()
+        return row['total'] > 0
+
+    def cached_search(self, ndo, ttl_seconds):
+        """Return (rows, age in seconds) of the NDO's saved results table if younger than ttl_seconds, else None"""
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT rows, fetched_at FROM search_results WHERE ndo = ?", (str(ndo),)
+            ).fetchone()
+            age = time.time() - row['fetched_at'] if row else None
+            if row is None or age > ttl_seconds:
+                self.search_stats['misses'] += 1
+                return None
+            self.search_stats['hits'] += 1
+        return json.loads(row['rows']), age
+
+    def save_search(self, ndo, rows):
+        with self.lock, self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO search_results (ndo, rows, fetched_at) VALUES (?, ?, ?)",
+                (str(ndo), json.dumps(rows, default=json_default), time.time()),
+            )
+
+    def invalidate_search(self, ndo):
+        """Forget the NDO's results table; called before anything that changes it on the portal"""
+        with self.lock, self.connection:
+            deleted = self.connection.execute("DELETE FROM search_results WHERE ndo = ?", (str(ndo),)).rowcount
+            self.search_stats['invalidated'] += deleted
+
+    def record_search_resolved(self, count=1):
+        """Count cases settled from a cached results table without searching the portal"""
+        with self.lock:
+            self.search_stats['resolved'] += count
+
+    def search_cache_report(self):
+        """Rows for the run report"""
+        stats = self.search_stats
+        return [
+            {'Metrica': 'Búsquedas servidas desde caché', 'Valor': stats['hits']},
+            {'Metrica': 'Búsquedas sin caché (portal)', 'Valor': stats['misses']},
+            {'Metrica': 'Casos resueltos sin buscar en el portal', 'Valor': stats['resolved']},
+            {'Metrica': 'Resultados en caché invalidados', 'Valor': stats['invalidated']},
+        ]
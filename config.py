@@ -1,7 +1,5 @@
 from datetime import date, datetime
 from dateutil.relativedelta import relativedelta
-import time
-import random
 
 # Variables de ventana de configuracion
 LOGIN_URL = "https://cup.pami.org.ar/controllers/loginController.php"
@@ -20,6 +18,249 @@ GOOGLE_SHEETS_ID = "16r7nB5lPMLEmTEk7Np0knv-AUvBVIktdjA36Ya96JAk"
 WORKSHEET_NAME = "prestaciones_PAMI"
 SERVICE_ACCOUNT_FILE = "credenciales_bio_sheets.json"
 
+# Renovar el token de la cuenta de servicio si vence en menos de estos segundos
+SHEETS_TOKEN_REFRESH_MARGIN = 300
+
+# Origen de los casos: Google Sheets o un archivo local (.xlsx/.csv) con las mismas columnas
+CASE_SOURCE_GOOGLE_SHEETS = "google_sheets"
+CASE_SOURCE_FILE = "file"
+CASE_SOURCE = CASE_SOURCE_GOOGLE_SHEETS
+CASE_FILE_PATH = ""
+CASE_FILE_WRITE_INTERVAL = 60  # segundos mínimos entre reescrituras del archivo
+
+# Lectura proyectada de la hoja: solo las columnas que usa la automatización
+SHEETS_READ_COLUMNS = ['NDO', 'CODIGO_PAMI', 'FechaTurno', 'Informe', 'Procesado', 'APE', 'NOM']
+SHEETS_READ_CHUNK_ROWS = 5000  # filas por bloque
+SHEETS_READ_MAX_WORKERS = 4  # bloques leídos en paralelo
+
+# Almacén local del estado de los casos
+CASE_STORE_FILE = "case_state.db"
+# Segundos que espera una escritura si otro proceso tiene bloqueado el almacén
+CASE_STORE_BUSY_TIMEOUT = 30
+
+# Sincronización incremental de la hoja entre ejecuciones
+SHEETS_SYNC_CACHE_FILE = "sheet_cache.json"
+SHEETS_SYNC_REWIND_ROWS = 200  # filas ya sincronizadas que se vuelven a comparar
+SHEETS_SYNC_MAX_CHANGED_RATIO = 0.5  # si cambian más filas recientes, lectura completa
+SHEETS_SYNC_FULL_EVERY_DAYS = 7
+
+# Escritura por lotes de la columna 'Procesado'
+SHEETS_WRITE_BATCH_SIZE = 10
+SHEETS_WRITE_FLUSH_INTERVAL = 60  # segundos
+SHEETS_WRITE_MAX_BATCH = 500  # celdas por llamada a batch_update
+SHEETS_WRITE_MAX_BACKOFF = 300  # segundos
+SHEETS_WRITE_STOP_TIMEOUT = 60  # segundos esperando vaciar la cola al detener
+SHEETS_WRITE_QUEUE_FILE = "sheets_pending_writes.json"
+
+# Formatos de FechaTurno. None = el formato se infiere del primer valor de la
+# columna, como en la lectura original (una fecha con barras ambigua se lee mes
+# primero: 05/06/2025 es el 6 de mayo). Una lista de formatos explícitos, p. ej.
+# ["%d/%m/%Y %H:%M:%S", "%d/%m/%Y"], se prueba en orden y cambia qué casos pasan
+# el filtro de fecha: solo usarla después de comprobar el formato real de la hoja.
+FECHA_TURNO_FORMATS = None
+
+# Perfiles de ritmo: rango de cada tipo de espera (segundos), acciones del portal
+# por minuto (None = sin límite) y factor sobre la latencia observada (0 = espera
+# aleatoria uniforme, como antes)
+PACING_CONSERVATIVE = "conservative"
+PACING_BALANCED = "balanced"
+PACING_THROUGHPUT = "throughput"
+PACING_PROFILE = PACING_CONSERVATIVE
+
+PACING_PROFILES = {
+    PACING_CONSERVATIVE: {
+        'label': "Conservador",
+        'actions_per_minute': None,
+        'latency_factor': 0,
+        'delays': {
+            'micro': (0.5, 2.0),
+            'short': (3.0, 5.0),
+            'medium': (5.0, 10.0),
+            'long': (10.0, 30.0),
+            'file_operations': (2.0, 7.0),
+        },
+    },
+    PACING_BALANCED: {
+        'label': "Equilibrado",
+        'actions_per_minute': 30,
+        'latency_factor': 2.0,
+        'delays': {
+            'micro': (0.3, 1.0),
+            'short': (1.0, 3.0),
+            'medium': (2.0, 5.0),
+            'long': (3.0, 10.0),
+            'file_operations': (1.0, 4.0),
+        },
+    },
+    PACING_THROUGHPUT: {
+        'label': "Máximo rendimiento",
+        'actions_per_minute': 60,
+        'latency_factor': 1.0,
+        'delays': {
+            'micro': (0.1, 0.5),
+            'short': (0.3, 1.5),
+            'medium': (0.5, 3.0),
+            'long': (1.0, 5.0),
+            'file_operations': (0.5, 2.0),
+        },
+    },
+}
+
+# Pestañas OME procesando casos en paralelo y límite global de acciones del
+# portal por minuto cuando hay más de una
+TAB_WORKERS = 1
+TAB_WORKERS_MAX = 8
+PORTAL_RATE_CEILING = 40
+
+# Procesos en paralelo, cada uno con su propio navegador y login; los casos se
+# reparten por NDO
+PROCESS_WORKERS = 1
+PROCESS_WORKERS_MAX = 16
+
+# Motor de automatización: el síncrono de siempre o el de asyncio, que atiende
+# las pestañas en paralelo desde un solo hilo
+AUTOMATION_ENGINE_SYNC = "sync"
+AUTOMATION_ENGINE_ASYNC = "async"
+AUTOMATION_ENGINE = AUTOMATION_ENGINE_SYNC
+AUTOMATION_ENGINES = {
+    AUTOMATION_ENGINE_SYNC: "Síncrono",
+    AUTOMATION_ENGINE_ASYNC: "Asíncrono (asyncio)",
+}
+
+# Caché de informes en el directorio de descargas: archivos por hash de
+# contenido, índice URL -> hash y límite de tamaño (se borran los menos usados).
+# Se descargan por adelantado los informes de los próximos casos de la cola.
+INFORME_INDEX_FILE = "informes_index.json"
+INFORME_INDEX_TTL_HOURS = 24  # pasado este tiempo la URL se vuelve a descargar (el archivo se reutiliza si no cambió)
+INFORME_CACHE_MAX_MB = 500
+INFORME_PREFETCH_DEPTH = 3
+INFORME_PREFETCH_DEPTH_MAX = 10
+
+# Descarga de informes: timeout de conexión/lectura (s), tamaño de bloque,
+# reintentos con reanudación (Range) y espera entre reintentos (s)
+INFORME_DOWNLOAD_TIMEOUT = (10, 60)
+INFORME_DOWNLOAD_CHUNK = 64 * 1024
+INFORME_DOWNLOAD_RETRIES = 3
+INFORME_DOWNLOAD_BACKOFF = 1.0
+PDF_MAGIC = b"%PDF-"
+
+# Horas que se reutiliza la tabla de resultados guardada de un NDO (0 = siempre
+# buscar en el portal); se descarta al subir o transmitir para ese NDO
+SEARCH_CACHE_TTL_HOURS = 12
+SEARCH_CACHE_TTL_HOURS_MAX = 168
+
+# Sesión del portal guardada por usuario (cifrada con una clave derivada de la
+# contraseña) para entrar directo a transmision.php en la próxima ejecución
+SAVED_SESSION_ENABLED = True
+SESSION_DIR = "sessions"
+SESSION_KDF_ITERATIONS = 390000
+SESSION_PROBE_MARKER = "bandeja-transmision"
+
+# Navegador que la ventana principal mantiene abierto entre ejecuciones: se
+# reinicia tras esta cantidad de ejecuciones o de horas abierto
+BROWSER_SERVICE_MAX_RUNS = 20
+BROWSER_SERVICE_MAX_AGE_HOURS = 8
+
+# Reinicios del navegador por NDO cuando Chromium o la pestaña OME se caen
+# a mitad del lote; al agotarse, los casos quedan para la próxima ejecución
+BROWSER_RECOVERY_ATTEMPTS = 3
+
+# Reintentos de casos fallidos según el tipo de error: transitorio (timeouts,
+# elementos desprendidos, red), estado del portal (sesión, modales, botones) o
+# permanente (COD o informe inexistentes). Cada clase tiene sus reintentos y su
+# espera inicial en segundos, que se duplica en cada reintento
+CASE_RETRIES_ENABLED = True
+ERROR_CLASS_TRANSIENT = "transient"
+ERROR_CLASS_PORTAL_STATE = "portal_state"
+ERROR_CLASS_PERMANENT = "permanent"
+RETRY_BUDGETS = {
+    ERROR_CLASS_TRANSIENT: 3,
+    ERROR_CLASS_PORTAL_STATE: 2,
+    ERROR_CLASS_PERMANENT: 0,
+}
+RETRY_BACKOFF = {
+    ERROR_CLASS_TRANSIENT: 20,
+    ERROR_CLASS_PORTAL_STATE: 60,
+    ERROR_CLASS_PERMANENT: 0,
+}
+RETRY_BACKOFF_MAX = 600
+PERMANENT_FAILURE_MARKERS = [
+    "no encontrado en la tabla",
+    "url de informe no encontrada",
+    "no se encontraron datos en la tabla",
+    "ya estaba procesado",
+]
+TRANSIENT_FAILURE_MARKERS = [
+    "timeout",
+    "detached",
+    "not attached",
+    "net::",
+    "econnreset",
+    "connection",
+    "socket",
+]
+PORTAL_STATE_FAILURE_MARKERS = [
+    "sesión",
+    "session",
+    "login",
+    "modal",
+    "boton",
+    "botón",
+    "subiendo archivo",
+    "transmitir",
+]
+
+# Perfil de recursos: el completo carga todo como antes; el liviano bloquea
+# imágenes, multimedia y analítica, sirve hojas de estilo y scripts desde una
+# caché local y lanza Chromium con menos memoria de JavaScript. Las fuentes no
+# se bloquean nunca: los botones de validar, subir y transmitir son íconos de
+# Font Awesome y su visibilidad decide el resultado de cada caso
+RESOURCE_PROFILE_LIGHT = "light"
+RESOURCE_PROFILE_FULL = "full"
+RESOURCE_PROFILE = RESOURCE_PROFILE_FULL
+RESOURCE_PROFILES = {
+    RESOURCE_PROFILE_LIGHT: "Liviano (sin imágenes ni analítica)",
+    RESOURCE_PROFILE_FULL: "Completo",
+}
+BLOCKED_RESOURCE_TYPES = ["image", "media"]
+BLOCKED_RESOURCE_HOSTS = [
+    "google-analytics.com",
+    "googletagmanager.com",
+    "doubleclick.net",
+    "hotjar.com",
+    "facebook.net",
+]
+CACHED_RESOURCE_TYPES = ["stylesheet", "script"]
+RESOURCE_CACHE_DIR = "resource_cache"
+RESOURCE_CACHE_TTL_HOURS = 24
+LIGHT_BROWSER_ARGS = [
+    "--disable-gpu",
+    "--js-flags=--max-old-space-size=512",
+]
+
+# Capturas de error: formato (las imágenes las codifica Chromium; MHTML guarda
+# el DOM en lugar de una imagen), una captura por tipo de error cada tantos
+# segundos, cola del hilo que las escribe y tamaño máximo del directorio
+SCREENSHOT_FORMAT_JPEG = "jpeg"
+SCREENSHOT_FORMAT_WEBP = "webp"
+SCREENSHOT_FORMAT_MHTML = "mhtml"
+SCREENSHOT_FORMAT = SCREENSHOT_FORMAT_JPEG
+SCREENSHOT_FORMATS = {
+    SCREENSHOT_FORMAT_JPEG: "JPEG",
+    SCREENSHOT_FORMAT_WEBP: "WebP",
+    SCREENSHOT_FORMAT_MHTML: "Instantánea del DOM (MHTML)",
+}
+SCREENSHOT_QUALITY = 60
+SCREENSHOT_SIGNATURE_INTERVAL = 60
+SCREENSHOT_QUEUE_MAX = 20
+SCREENSHOT_DIR_MAX_MB = 200
+
+PACING_BURST = 5
+PACING_JITTER = 0.2
+PACING_LATENCY_ALPHA = 0.3
+PACING_SETTLE_MIN_RATIO = 0.25
+PACING_OBSERVED_RESOURCES = ("document", "xhr", "fetch")
+
 DATE_RANGE_START = datetime(2025, 8, 1, 7, 24) 
 DATE_RANGE_END = datetime(2025, 8, 1, 7, 25)
 
@@ -30,35 +271,34 @@ def get_first_day_of_month():
     previous_month = first_day_current_month - relativedelta(months=1)
     return previous_month.strftime("%d/%m/%Y")
 
+# Las esperas pasan por el perfil de ritmo activo (ver pacing.py)
+def pace(kind, seconds=None):
+    from pacing import get_pacer
+    return get_pacer().wait(kind, seconds)
+
 def random_delay_short():
-    """Random delay between 1-5 seconds (closer to 5)"""
-    delay = random.uniform(3.0, 5.0)
-    time.sleep(delay)
-    return delay
+    """Short delay (3-5 seconds in the conservative profile)"""
+    return pace("short")
 
 def random_delay_medium():
-    """Random delay between 5-10 seconds"""
-    delay = random.uniform(5.0, 10.0)
-    time.sleep(delay)
-    return delay
+    """Medium delay (5-10 seconds in the conservative profile)"""
+    return pace("medium")
 
 def random_delay_long():
-    """Random delay between 10-30 seconds (between cases)"""
-    delay = random.uniform(10.0, 30.0)
-    time.sleep(delay)
-    return delay
+    """Delay between cases (10-30 seconds in the conservative profile)"""
+    return pace("long")
 
 def random_delay_micro():
-    """Very short random delay between 0.5-2 seconds"""
-    delay = random.uniform(0.5, 2.0)
-    time.sleep(delay)
-    return delay
+    """Very short delay (0.5-2 seconds in the conservative profile)"""
+    return pace("micro")
 
 def random_delay_file_operations():
-    """Random delay for file operations 2-7 seconds"""
-    delay = random.uniform(2.0, 7.0)
-    time.sleep(delay)
-    return delay
+    """Delay for file operations (2-7 seconds in the conservative profile)"""
+    return pace("file_operations")
+
+def settle_delay(seconds):
+    """Fixed wait for the portal to settle; adaptive profiles shorten it when the portal answers fast"""
+    return pace("settle", seconds)
 
 def column_number_to_letter(col_num):
     """Convert column number to letter (1=A, 2=B, etc.)"""
@@ -87,6 +327,20 @@ SEARCH_BUTTON = "input[name='buscar']"
 RESULTS_TABLE = "table.bandeja-transmision"
 TABLE_ROWS = "tbody#ordenes tr"
 
+ORDERS_TABLE_BODY = "tbody#ordenes"
+DOCUMENTS_TABLE_BODY = "tbody#documentosGrid"
+
+# Fragmentos de URL de las respuestas del portal que indican que terminó cada paso
+LOGIN_RESPONSE_URLS = ["loginController"]
+PANEL_RESPONSE_URLS = ["transmision"]
+SEARCH_RESPONSE_URLS = ["transmision", "ordenes", "buscar"]
+UPLOAD_RESPONSE_URLS = ["documento", "upload", "subir"]
+PORTAL_RESPONSE_TIMEOUT = 3000  # solo se espera la respuesta si el paso no tiene otra señal
+PORTAL_SIGNAL_TIMEOUT = 15000  # estado de carga, cambios del DOM y condiciones de la página
+DOM_SETTLE_MS = 150
+DOM_UNCHANGED_MS = 2000  # sin cambios en este tiempo, un elemento presente se da por listo
+VALIDATION_BUTTON_TIMEOUT = 5000  # espera máxima del botón de validación antes de dar el caso por completado
+
 VALIDATION_BUTTON = ".boton-historial.fas.fa-check"
 UPLOAD_BUTTON = ".boton-historial.fas.fa-upload"
 TRANSMIT_BUTTON = ".boton-historial.fas.fa-arrow-right.transmitir"
@@ -0,0 +1,61 @@
+import argparse
+import multiprocessing
+import os
+import sys
+from browser_automation import BrowserAutomation, AutomationError
+from config import AUTOMATION_ENGINE_ASYNC
+from logger import AutomationLogger
+from settings_manager import SettingsManager
+
+
+def run_headless(username, password, resume=False):
+    """Run the whole automation without the GUI, optionally resuming an interrupted run"""
+    settings_manager = SettingsManager()
+    logger = AutomationLogger(settings_manager=settings_manager)
+    automation = BrowserAutomation(logger, settings_manager)
+
+    try:
+        if resume:
+            excel_data = automation.resume_from_store()
+        else:
+            excel_data = automation.read_excel_data()
+
+        if settings_manager.get_process_workers() > 1:
+            automation.process_in_worker_processes(username, password, excel_data)
+        elif settings_manager.get_automation_engine() == AUTOMATION_ENGINE_ASYNC:
+            automation.process_with_async_engine(username, password, excel_data)
+        else:
+            automation.start_browser()
+            automation.open_portal(username, password)
+            automation.process_excel_data(excel_data)
+        logger.info("Automatización completada exitosamente")
+        return True
+
+    except AutomationError as e:
+        logger.error(f"Error en automatización: {str(e)}")
+        return False
+
+    finally:
+        automation.close_browser()
+        log_file = logger.save_to_excel(automation.processed_rows, automation.failed_rows, automation.already_processed_cases,
+                                       automation.build_run_report())
+        logger.info(f"Log guardado en: {log_file}")
+
+
+def main():
+    multiprocessing.freeze_support()
+    parser = argparse.ArgumentParser(description="PAMI Automation sin interfaz gráfica")
+    parser.add_argument("--user", default=os.environ.get("PAMI_USER"), help="Usuario del portal (o PAMI_USER)")
+    parser.add_argument("--password", default=os.environ.get("PAMI_PASSWORD"), help="Contraseña del portal (o PAMI_PASSWORD)")
+    parser.add_argument("--resume", action="store_true", help="Reanudar los casos pendientes de la ejecución anterior")
+    args = parser.parse_args()
+
+    if not args.user or not args.password:
+        parser.error("Se requieren usuario y contraseña")
+
+    success = run_headless(args.user, args.password, resume=args.resume)
+    sys.exit(0 if success else 1)
+
+
+if __name__ == "__main__":
+    main()
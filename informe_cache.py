@@ -0,0 +1,215 @@
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from config import *
+from informe_downloader import InformeDownloader
+
+
+class InformeCache:
+    """Content-addressed store of downloaded informes in the downloads directory.
+
+    Every PDF is saved once as <sha256>.pdf. An index file maps each informe
+    URL to the hash of its content, so a URL seen in the last index_ttl
+    seconds is not downloaded again, and two cases sharing a PDF share one
+    file. After index_ttl the URL is downloaded again, in case the informe
+    behind it changed; unchanged content lands on the same file. When the
+    files exceed max_bytes the least recently used ones are deleted, except
+    those a queued case is still waiting for.
+    """
+
+    def __init__(self, downloads_dir=DOWNLOADS_DIR, max_bytes=INFORME_CACHE_MAX_MB * 1024 * 1024, logger=None,
+                 downloader=None, index_ttl=INFORME_INDEX_TTL_HOURS * 3600):
+        self.downloads_dir = downloads_dir
+        self.max_bytes = max_bytes
+        self.index_ttl = index_ttl
+        self.logger = logger
+        self.downloader = downloader or InformeDownloader(logger)
+        self.index_path = os.path.join(downloads_dir, INFORME_INDEX_FILE)
+        self.lock = threading.Lock()
+        self.pinned = {}
+        self.hits = 0
+        self.expired = 0
+        self.downloads = 0
+        self.evicted = 0
+        os.makedirs(downloads_dir, exist_ok=True)
+        self.urls, self.files = self.load_index()
+
+    def log(self, level, message):
+        if self.logger:
+            getattr(self.logger, level)(message)
+
+    def load_index(self):
+        urls, files = {}, {}
+        if os.path.exists(self.index_path):
+            try:
+                with open(self.index_path, 'r', encoding='utf-8') as f:
+                    index = json.load(f)
+                urls, files = index.get('urls', {}), index.get('files', {})
+            except (OSError, ValueError) as e:
+                self.log("warning", f"Índice de informes ilegible, se reconstruye: {str(e)}")
+        files = {digest: entry for digest, entry in files.items() if os.path.exists(self.path_for(digest))}
+        # entries of older indexes are bare hashes: kept, but already due for a new download
+        urls = {url: entry if isinstance(entry, dict) else {'digest': entry, 'indexed': 0}
+                for url, entry in urls.items()}
+        urls = {url: entry for url, entry in urls.items() if entry['digest'] in files}
+        return urls, files
+
+    def save_index(self):
+        temp_path = self.index_path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({'urls': self.urls, 'files': self.files}, f)
+        os.replace(temp_path, self.index_path)
+
+    def path_for(self, digest):
+        return os.path.join(self.downloads_dir, f"{digest}.pdf")
+
+    def lookup(self, url):
+        """Path of the cached informe for url, or None"""
+        with self.lock:
+            entry = self.urls.get(url)
+            if not entry:
+                return None
+            if time.time() - entry['indexed'] > self.index_ttl:
+                del self.urls[url]
+                self.expired += 1
+                return None
+            digest = entry['digest']
+            path = self.path_for(digest)
+            if not os.path.exists(path):
+                del self.urls[url]
+                self.files.pop(digest, None)
+                return None
+            self.files[digest]['last_used'] = time.time()
+            self.hits += 1
+            self.save_index()
+            return path
+
+    def store_file(self, url, temp_path, digest, size):
+        """Move a downloaded file to its hash name, index url to it and return the path"""
+        path = self.path_for(digest)
+        with self.lock:
+            if os.path.exists(path):
+                os.remove(temp_path)
+            else:
+                os.replace(temp_path, path)
+            self.urls[url] = {'digest': digest, 'indexed': time.time()}
+            self.files[digest] = {'size': size, 'last_used': time.time()}
+            self.downloads += 1
+            self.evict()
+            self.save_index()
+        return path
+
+    def fetch(self, url):
+        """Return the cached informe for url, downloading it first on a miss"""
+        path = self.lookup(url)
+        if path:
+            return path
+        temp_path, digest, size = self.downloader.download(url, self.downloads_dir)
+        return self.store_file(url, temp_path, digest, size)
+
+    def pin(self, url):
+        with self.lock:
+            self.pinned[url] = self.pinned.get(url, 0) + 1
+
+    def unpin(self, url):
+        with self.lock:
+            count = self.pinned.get(url, 0) - 1
+            if count > 0:
+                self.pinned[url] = count
+            else:
+                self.pinned.pop(url, None)
+
+    def evict(self):
+        """Delete least recently used files until the cache fits max_bytes (lock held)"""
+        total = sum(entry['size'] for entry in self.files.values())
+        if total <= self.max_bytes:
+            return
+        keep = {self.urls[url]['digest'] for url in self.pinned if url in self.urls}
+        for digest, entry in sorted(self.files.items(), key=lambda item: item[1]['last_used']):
+            if total <= self.max_bytes:
+                break
+            if digest in keep:
+                continue
+            try:
+                os.remove(self.path_for(digest))
+            except FileNotFoundError:
+                pass
+            del self.files[digest]
+            total -= entry['size']
+            self.evicted += 1
+        self.urls = {url: entry for url, entry in self.urls.items() if entry['digest'] in self.files}
+
+    def report(self):
+        """Rows for the run report"""
+        total = sum(entry['size'] for entry in self.files.values())
+        rows = [
+            {'Metrica': 'Informes descargados', 'Valor': self.downloads},
+            {'Metrica': 'Informes servidos desde caché', 'Valor': self.hits},
+            {'Metrica': 'Informes vencidos en el índice (descargados de nuevo)', 'Valor': self.expired},
+            {'Metrica': 'Informes eliminados de la caché', 'Valor': self.evicted},
+            {'Metrica': 'Tamaño de la caché de informes (MB)', 'Valor': round(total / (1024 * 1024), 1)},
+        ]
+        rows.extend(self.downloader.report())
+        return rows
+
+
+class InformePrefetcher:
+    """Downloads the informes of the next depth queued cases in background threads.
+
+    prefetch() starts the download of a URL (at most once while it is in
+    flight); get() returns the cached file, waiting for a prefetch already
+    running or downloading it right away otherwise. release() drops the
+    prefetch of a case that finished without asking for its file.
+    """
+
+    def __init__(self, cache, depth=INFORME_PREFETCH_DEPTH, logger=None):
+        self.cache = cache
+        self.depth = depth
+        self.logger = logger
+        self.executor = ThreadPoolExecutor(max_workers=max(1, depth), thread_name_prefix="informe-prefetch")
+        self.pending = {}
+        self.lock = threading.Lock()
+
+    def log(self, level, message):
+        if self.logger:
+            getattr(self.logger, level)(message)
+
+    def prefetch(self, url):
+        if not isinstance(url, str) or not url.strip():
+            return
+        with self.lock:
+            if url in self.pending:
+                return
+            self.cache.pin(url)
+            self.pending[url] = self.executor.submit(self.cache.fetch, url)
+
+    def get(self, url):
+        with self.lock:
+            future = self.pending.pop(url, None)
+        if future is None:
+            return self.cache.fetch(url)
+        try:
+            return future.result()
+        except Exception as e:
+            self.log("warning", f"Descarga anticipada fallida, se reintenta: {str(e)}")
+            return self.cache.fetch(url)
+        finally:
+            self.cache.unpin(url)
+
+    def release(self, url):
+        """Cancel a pending prefetch nobody will get() and unpin its file"""
+        with self.lock:
+            future = self.pending.pop(url, None)
+        if future is not None:
+            future.cancel()
+            self.cache.unpin(url)
+
+    def shutdown(self):
+        with self.lock:
+            pending, self.pending = self.pending, {}
+        for url, future in pending.items():
+            future.cancel()
+            self.cache.unpin(url)
+        self.executor.shutdown(wait=False)
@@ -0,0 +1,142 @@
+import hashlib
+import os
+import threading
+import time
+import uuid
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from config import *
+
+
+class DownloadError(Exception):
+    pass
+
+
+class InformeDownloader:
+    """Streams informes to disk over one pooled requests.Session.
+
+    The body is written in chunks to a temporary file in the destination
+    directory while it is hashed, so large scanned reports never sit in
+    memory. A dropped connection is resumed with a Range request from the
+    bytes already written (or restarted if the server ignores ranges). The
+    file must start with the PDF signature and match the announced length.
+    Bandwidth and latency are kept per host for the run report.
+    """
+
+    def __init__(self, logger=None, pool_size=INFORME_PREFETCH_DEPTH_MAX + 1):
+        self.logger = logger
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.stats = {}
+        self.lock = threading.Lock()
+
+    def log(self, level, message):
+        if self.logger:
+            getattr(self.logger, level)(message)
+
+    def download(self, url, dest_dir):
+        """Download url into dest_dir; returns (temp_path, sha256 hex digest, size).
+
+        The caller moves the temporary file to its final name.
+        """
+        host = urlsplit(url).netloc or url
+        temp_path = os.path.join(dest_dir, f"{uuid.uuid4().hex}.part")
+        hasher = hashlib.sha256()
+        written = 0
+        expected = None
+        first_byte = None
+        resumes = 0
+        start = time.perf_counter()
+
+        try:
+            with open(temp_path, 'wb') as file:
+                for attempt in range(INFORME_DOWNLOAD_RETRIES + 1):
+                    headers = {'Range': f"bytes={written}-"} if written else {}
+                    request_start = time.perf_counter()
+                    try:
+                        with self.session.get(url, headers=headers, stream=True, timeout=INFORME_DOWNLOAD_TIMEOUT) as response:
+                            if first_byte is None:
+                                first_byte = time.perf_counter() - request_start
+                            if written and response.status_code != 206:
+                                # El servidor no soporta rangos: se empieza de nuevo
+                                file.seek(0)
+                                file.truncate()
+                                hasher = hashlib.sha256()
+                                written = 0
+                            response.raise_for_status()
+                            expected = self.expected_size(response, written) or expected
+
+                            for chunk in response.iter_content(chunk_size=INFORME_DOWNLOAD_CHUNK):
+                                if not chunk:
+                                    continue
+                                if written == 0 and not chunk.startswith(PDF_MAGIC[:len(chunk)]):
+                                    raise DownloadError("el contenido descargado no es un PDF")
+                                file.write(chunk)
+                                hasher.update(chunk)
+                                written += len(chunk)
+                        break
+                    except (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError) as e:
+                        if attempt == INFORME_DOWNLOAD_RETRIES:
+                            raise
+                        resumes += 1
+                        self.log("warning", f"Descarga interrumpida tras {written} bytes, se reanuda ({attempt + 1}/{INFORME_DOWNLOAD_RETRIES}): {str(e)}")
+                        time.sleep(INFORME_DOWNLOAD_BACKOFF * (attempt + 1))
+
+            if written < len(PDF_MAGIC):
+                raise DownloadError("archivo vacío o incompleto")
+            if expected is not None and written != expected:
+                raise DownloadError(f"tamaño {written} bytes, se esperaban {expected}")
+        except Exception:
+            self.record(host, 0, time.perf_counter() - start, first_byte, resumes, failed=True)
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            raise
+
+        self.record(host, written, time.perf_counter() - start, first_byte, resumes)
+        return temp_path, hasher.hexdigest(), written
+
+    @staticmethod
+    def expected_size(response, offset):
+        """Total file size announced by Content-Range (partial) or Content-Length (full)"""
+        if response.status_code == 206:
+            total = response.headers.get('Content-Range', '').rpartition('/')[2]
+            return int(total) if total.isdigit() else None
+        length = response.headers.get('Content-Length')
+        if length and length.isdigit() and 'Content-Encoding' not in response.headers:
+            return offset + int(length)
+        return None
+
+    def record(self, host, size, seconds, first_byte, resumes, failed=False):
+        with self.lock:
+            stats = self.stats.setdefault(host, {'files': 0, 'failures': 0, 'bytes': 0, 'seconds': 0.0,
+                                                 'first_byte': 0.0, 'resumes': 0})
+            if failed:
+                stats['failures'] += 1
+            else:
+                stats['files'] += 1
+                stats['bytes'] += size
+                stats['seconds'] += seconds
+                stats['first_byte'] += first_byte or 0.0
+            stats['resumes'] += resumes
+
+    def report(self):
+        """Rows for the run report"""
+        rows = []
+        for host, stats in sorted(self.stats.items()):
+            megabytes = stats['bytes'] / (1024 * 1024)
+            speed = megabytes / stats['seconds'] if stats['seconds'] else 0.0
+            latency = stats['first_byte'] / stats['files'] if stats['files'] else 0.0
+            rows.append({'Metrica': f"Descargas {host} (archivos / MB / MB/s / latencia s)",
+                         'Valor': f"{stats['files']} / {megabytes:.1f} / {speed:.2f} / {latency:.2f}"})
+            if stats['resumes'] or stats['failures']:
+                rows.append({'Metrica': f"Descargas {host} (reanudadas / fallidas)",
+                             'Valor': f"{stats['resumes']} / {stats['failures']}"})
+        return rows
+
+    def close(self):
+        self.session.close()
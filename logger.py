@@ -66,7 +66,7 @@ class AutomationLogger:
     def warning(self, message, screenshot_path=None):
         self.log("WARNING", message, screenshot_path)
     
-    def save_to_excel(self, processed_rows=None, failed_rows=None, already_processed=None):
+    def save_to_excel(self, processed_rows=None, failed_rows=None, already_processed=None, run_report=None):
         self._ensure_directories_exist()
         
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -89,6 +89,10 @@ class AutomationLogger:
             if already_processed:
                 df_already_processed = pd.DataFrame(already_processed)
                 df_already_processed.to_excel(writer, sheet_name='Already_Processed', index=False)
+            
+            if run_report:
+                df_run_report = pd.DataFrame(run_report)
+                df_run_report.to_excel(writer, sheet_name='Run_Report', index=False)
         
         return filepath
     
@@ -0,0 +1,172 @@
+import asyncio
+import random
+import threading
+import time
+from config import *
+
+_pacer = None
+_pacer_lock = threading.Lock()
+
+
+class TokenBucket:
+    """Blocking token bucket: at most rate_per_minute actions, with bursts of up to capacity"""
+
+    def __init__(self, rate_per_minute, capacity=PACING_BURST):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = max(1, capacity)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Take one token, sleeping until one is available; returns the seconds waited"""
+        waited = 0.0
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                shortfall = (1 - self.tokens) / self.rate
+            time.sleep(shortfall)
+            waited += shortfall
+
+
+class Pacer:
+    """Decides how long to wait before each portal action.
+
+    The conservative profile keeps the original uniform random delays. The
+    other profiles rate-limit actions with a token bucket and size each delay
+    from the observed portal response time (an exponential moving average of
+    request timings), kept within the profile's range for that kind of wait.
+    """
+
+    def __init__(self, profile_name=PACING_PROFILE, logger=None):
+        if profile_name not in PACING_PROFILES:
+            profile_name = PACING_PROFILE
+        self.profile_name = profile_name
+        self.profile = PACING_PROFILES[profile_name]
+        self.logger = logger
+
+        self.actions_per_minute = self.profile['actions_per_minute']
+        self.bucket = TokenBucket(self.actions_per_minute) if self.actions_per_minute else None
+        self.lock = threading.Lock()
+
+        self.latency = None
+        self.latency_samples = 0
+        self.latency_max = 0.0
+        self.waits = {}
+        self.throttled_seconds = 0.0
+
+    def log(self, level, message):
+        if self.logger:
+            getattr(self.logger, level)(message)
+
+    @property
+    def adaptive(self):
+        return self.profile['latency_factor'] > 0
+
+    def limit_rate(self, actions_per_minute):
+        """Cap portal actions per minute across every thread using this pacer"""
+        if self.actions_per_minute and self.actions_per_minute <= actions_per_minute:
+            return
+        self.actions_per_minute = actions_per_minute
+        self.bucket = TokenBucket(actions_per_minute)
+
+    def observe(self, seconds):
+        """Record one portal response time"""
+        with self.lock:
+            if self.latency is None:
+                self.latency = seconds
+            else:
+                self.latency += PACING_LATENCY_ALPHA * (seconds - self.latency)
+            self.latency_samples += 1
+            self.latency_max = max(self.latency_max, seconds)
+
+    def watch_page(self, page):
+        """Feed the pacer with the timings of every document/XHR request the page makes"""
+        page.on("requestfinished", self.on_request_finished)
+
+    def unwatch_page(self, page):
+        page.remove_listener("requestfinished", self.on_request_finished)
+
+    def on_request_finished(self, request):
+        if request.resource_type not in PACING_OBSERVED_RESOURCES:
+            return
+        try:
+            response_end = request.timing.get('responseEnd', -1)
+        except Exception:
+            return
+        if response_end and response_end > 0:
+            self.observe(response_end / 1000.0)
+
+    def compute_delay(self, kind, seconds=None):
+        if kind == "settle":
+            low, high = seconds * PACING_SETTLE_MIN_RATIO, seconds
+            if not self.adaptive or self.latency is None:
+                return seconds
+        else:
+            low, high = self.profile['delays'][kind]
+            if not self.adaptive or self.latency is None:
+                return random.uniform(low, high)
+
+        target = min(max(self.latency * self.profile['latency_factor'], low), high)
+        target *= random.uniform(1 - PACING_JITTER, 1 + PACING_JITTER)
+        return min(max(target, low), high)
+
+    def wait(self, kind, seconds=None):
+        """Wait for the next portal action; returns the delay slept (rate-limit waits excluded)"""
+        throttled = self.bucket.acquire() if self.bucket else 0.0
+        delay = self.compute_delay(kind, seconds)
+        time.sleep(delay)
+        self.record_wait(kind, delay, throttled)
+        return delay
+
+    async def async_wait(self, kind, seconds=None):
+        """wait() for asyncio code: the rate limit and the delay do not block the event loop"""
+        throttled = await asyncio.to_thread(self.bucket.acquire) if self.bucket else 0.0
+        delay = self.compute_delay(kind, seconds)
+        await asyncio.sleep(delay)
+        self.record_wait(kind, delay, throttled)
+        return delay
+
+    def record_wait(self, kind, delay, throttled=0.0):
+        with self.lock:
+            self.throttled_seconds += throttled
+            stats = self.waits.setdefault(kind, [0, 0.0])
+            stats[0] += 1
+            stats[1] += delay
+
+    def report(self):
+        """Rows for the run report"""
+        rows = [
+            {'Metrica': 'Perfil de ritmo', 'Valor': self.profile_name},
+            {'Metrica': 'Acciones por minuto (límite)', 'Valor': self.actions_per_minute or 'sin límite'},
+            {'Metrica': 'Espera por límite de acciones (s)', 'Valor': round(self.throttled_seconds, 1)},
+            {'Metrica': 'Latencia del portal promedio (s)', 'Valor': round(self.latency, 3) if self.latency is not None else ''},
+            {'Metrica': 'Latencia del portal máxima (s)', 'Valor': round(self.latency_max, 3)},
+            {'Metrica': 'Solicitudes del portal medidas', 'Valor': self.latency_samples},
+        ]
+        for kind, (count, total) in sorted(self.waits.items()):
+            rows.append({'Metrica': f"Esperas '{kind}' (cantidad / total s)", 'Valor': f"{count} / {total:.1f}"})
+        return rows
+
+
+def configure_pacing(profile_name=PACING_PROFILE, logger=None):
+    """Replace the process-wide pacer (fresh statistics) and return it"""
+    global _pacer
+    with _pacer_lock:
+        _pacer = Pacer(profile_name, logger)
+    if logger:
+        logger.info(f"Perfil de ritmo: {_pacer.profile['label']} ({_pacer.profile_name})")
+    return _pacer
+
+
+def get_pacer():
+    global _pacer
+    with _pacer_lock:
+        if _pacer is None:
+            _pacer = Pacer()
+        return _pacer
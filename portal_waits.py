@@ -0,0 +1,287 @@
+import threading
+import time
+from contextlib import contextmanager
+from config import *
+
+# Starts counting DOM mutations that touch the elements matching a selector,
+# including the element itself being replaced. With response URL fragments it
+# also notes, on the same clock, when the first matching XHR/fetch response
+# ends; without them the step counts as answered from the start.
+ARM_MUTATIONS_SCRIPT = """
+(args) => {
+    const previous = window.__pamiWait;
+    if (previous) {
+        previous.observer.disconnect();
+        if (previous.responses) previous.responses.disconnect();
+    }
+    const selector = args.selector;
+    const touches = (node) => node.nodeType === Node.ELEMENT_NODE
+        && (node.closest(selector) !== null || node.querySelector(selector) !== null);
+    const armed = performance.now();
+    const state = {mutations: 0, last: 0, armed: armed, responded: args.responseUrls ? null : armed,
+                   observer: null, responses: null};
+    state.observer = new MutationObserver((records) => {
+        for (const record of records) {
+            const node = record.target.nodeType === Node.ELEMENT_NODE ? record.target : record.target.parentElement;
+            if (node && touches(node)) {
+                state.mutations += 1;
+                state.last = performance.now();
+            }
+        }
+    });
+    state.observer.observe(document.body, {childList: true, subtree: true, attributes: true, characterData: true});
+    if (args.responseUrls && window.PerformanceObserver) {
+        const fragments = args.responseUrls.map((fragment) => fragment.toLowerCase());
+        state.responses = new PerformanceObserver((list) => {
+            for (const entry of list.getEntries()) {
+                const url = entry.name.toLowerCase();
+                if (state.responded === null && entry.startTime >= armed
+                        && (entry.initiatorType === 'xmlhttprequest' || entry.initiatorType === 'fetch')
+                        && fragments.some((fragment) => url.includes(fragment))) {
+                    state.responded = entry.responseEnd;
+                }
+            }
+        });
+        state.responses.observe({type: 'resource'});
+    }
+    window.__pamiWait = state;
+}
+"""
+
+# True once the selector exists and either changed and then stayed quiet for
+# settleMs, or the step was answered and nothing changed for unchangedMs after
+# that (same results as before). An unchanged element is never enough before
+# the answer arrives. If the page navigated, the observer is gone and a loaded
+# document is enough.
+MUTATIONS_SETTLED_SCRIPT = """
+(args) => {
+    const target = document.querySelector(args.selector);
+    const state = window.__pamiWait;
+    if (!state) {
+        return !!target && document.readyState !== 'loading';
+    }
+    if (!target) {
+        return false;
+    }
+    const now = performance.now();
+    if (state.responded !== null && state.last <= state.responded) {
+        return now - state.responded >= args.unchangedMs;
+    }
+    return state.mutations > 0 && now - state.last >= args.settleMs;
+}
+"""
+
+
+class PortalWaits:
+    """Waits for the portal's real completion signals instead of fixed sleeps.
+
+    A step may wait for a load state, for the DOM under a selector to change
+    and go quiet, and for a page condition. A network response whose URL
+    contains one of the given fragments is only waited for, briefly, when the
+    step has no other signal; with a mutation selector it is what lets an
+    unchanged element count as ready. Each step logs how long the portal took
+    against the delay the pacing profile would have slept, and keeps the
+    totals for the run report. When a signal does not arrive the step logs it
+    and reports it to the caller ('ok' / the return value of async_step).
+    """
+
+    def __init__(self, pacer, logger=None):
+        self.pacer = pacer
+        self.logger = logger
+        self.stats = {}
+        self.lock = threading.Lock()
+
+    def log(self, level, message):
+        if self.logger:
+            getattr(self.logger, level)(message)
+
+    @staticmethod
+    def response_matcher(url_fragments):
+        fragments = [fragment.lower() for fragment in url_fragments]
+
+        def matches(response):
+            if response.request.resource_type not in PACING_OBSERVED_RESOURCES:
+                return False
+            url = response.url.lower()
+            return any(fragment in url for fragment in fragments)
+        return matches
+
+    @contextmanager
+    def step(self, page, name, ndo=None, response_urls=None, mutation_selector=None,
+             load_state=None, condition=None, fallback_kind="short", fixed_delay=None,
+             timeout=PORTAL_SIGNAL_TIMEOUT):
+        """Run the action in the with-block, then wait for the signals it should produce.
+
+        condition is an optional (script, arg) pair for page.wait_for_function.
+        fixed_delay (default: a fallback_kind delay of the pacing profile) is the
+        sleep this step replaces, used to log the time saved. The yielded dict
+        gets 'ok' (all signals arrived) and 'elapsed' on exit.
+        """
+        if fixed_delay is None:
+            fixed_delay = self.pacer.compute_delay(fallback_kind)
+        outcome = {'ok': False, 'elapsed': 0.0}
+
+        if mutation_selector:
+            page.evaluate(ARM_MUTATIONS_SCRIPT, {'selector': mutation_selector, 'responseUrls': response_urls})
+
+        start = time.perf_counter()
+        matches = self.response_matcher(response_urls) if response_urls else None
+        responses = []
+
+        def on_response(response):
+            if not responses and matches(response):
+                responses.append(response)
+
+        if matches:
+            page.on("response", on_response)
+        try:
+            yield outcome
+
+            def remaining():
+                return max(timeout - (time.perf_counter() - start) * 1000, 1000)
+
+            missing = []
+            if matches and not responses and not (load_state or mutation_selector or condition):
+                try:
+                    responses.append(page.wait_for_event("response", predicate=matches,
+                                                         timeout=PORTAL_RESPONSE_TIMEOUT))
+                except Exception:
+                    missing.append("respuesta de red")
+
+            if load_state:
+                try:
+                    page.wait_for_load_state(load_state, timeout=remaining())
+                except Exception:
+                    missing.append(f"estado '{load_state}'")
+
+            if mutation_selector:
+                try:
+                    page.wait_for_function(MUTATIONS_SETTLED_SCRIPT, arg=self.settle_args(mutation_selector),
+                                           timeout=remaining(), polling=50)
+                except Exception:
+                    missing.append(f"cambios en {mutation_selector}")
+
+            if condition:
+                script, arg = condition
+                try:
+                    page.wait_for_function(script, arg=arg, timeout=remaining(), polling=100)
+                except Exception:
+                    missing.append("estado esperado de la página")
+        finally:
+            if matches:
+                try:
+                    page.remove_listener("response", on_response)
+                except Exception:
+                    pass
+
+        elapsed = time.perf_counter() - start
+        outcome['ok'] = not missing
+        outcome['elapsed'] = elapsed
+        self.record(name, elapsed, fixed_delay, missing, ndo, self.response_seconds(responses))
+
+    @staticmethod
+    def settle_args(selector):
+        return {'selector': selector, 'settleMs': DOM_SETTLE_MS, 'unchangedMs': DOM_UNCHANGED_MS}
+
+    @staticmethod
+    def response_seconds(responses):
+        """Server time of the first matching response, for the step log"""
+        if not responses:
+            return None
+        try:
+            return responses[0].request.timing['responseEnd'] / 1000.0
+        except Exception:
+            return None
+
+    def record(self, name, elapsed, fixed_delay, missing=None, ndo=None, response_seconds=None):
+        """Count one step and log its latency against the fixed delay it replaced"""
+        prefix = f"NDO {ndo}: " if ndo is not None else ""
+        saved = fixed_delay - elapsed
+        with self.lock:
+            stats = self.stats.setdefault(name, {'count': 0, 'elapsed': 0.0, 'saved': 0.0, 'missing': 0})
+            stats['count'] += 1
+            stats['elapsed'] += elapsed
+            stats['saved'] += saved
+            if missing:
+                stats['missing'] += 1
+
+        if missing:
+            self.log("warning", f"{prefix}{name}: sin señal de {', '.join(missing)} tras {elapsed:.2f} s - Se continúa con la verificación de la página")
+        else:
+            detail = f", respuesta de red {response_seconds:.2f} s" if response_seconds and response_seconds > 0 else ""
+            self.log("info", f"{prefix}{name}: el portal respondió en {elapsed:.2f} s (espera fija {fixed_delay:.1f} s, ahorro {saved:.1f} s{detail})")
+
+    def report(self):
+        """Rows for the run report"""
+        rows = []
+        for name, stats in self.stats.items():
+            rows.append({'Metrica': f"Paso '{name}' (cantidad / promedio s)",
+                         'Valor': f"{stats['count']} / {stats['elapsed'] / stats['count']:.2f}"})
+            rows.append({'Metrica': f"Paso '{name}' ahorro total (s)", 'Valor': round(stats['saved'], 1)})
+            if stats['missing']:
+                rows.append({'Metrica': f"Paso '{name}' sin señal", 'Valor': stats['missing']})
+        return rows
+
+    async def async_step(self, page, name, action, ndo=None, response_urls=None, mutation_selector=None,
+                         load_state=None, condition=None, fallback_kind="short", fixed_delay=None,
+                         timeout=PORTAL_SIGNAL_TIMEOUT):
+        """step() for playwright.async_api pages: awaits action(), then its completion signals"""
+        if fixed_delay is None:
+            fixed_delay = self.pacer.compute_delay(fallback_kind)
+
+        if mutation_selector:
+            await page.evaluate(ARM_MUTATIONS_SCRIPT, {'selector': mutation_selector, 'responseUrls': response_urls})
+
+        start = time.perf_counter()
+        matches = self.response_matcher(response_urls) if response_urls else None
+        responses = []
+
+        def on_response(response):
+            if not responses and matches(response):
+                responses.append(response)
+
+        if matches:
+            page.on("response", on_response)
+        try:
+            await action()
+
+            def remaining():
+                return max(timeout - (time.perf_counter() - start) * 1000, 1000)
+
+            missing = []
+            if matches and not responses and not (load_state or mutation_selector or condition):
+                try:
+                    responses.append(await page.wait_for_event("response", predicate=matches,
+                                                               timeout=PORTAL_RESPONSE_TIMEOUT))
+                except Exception:
+                    missing.append("respuesta de red")
+
+            if load_state:
+                try:
+                    await page.wait_for_load_state(load_state, timeout=remaining())
+                except Exception:
+                    missing.append(f"estado '{load_state}'")
+
+            if mutation_selector:
+                try:
+                    await page.wait_for_function(MUTATIONS_SETTLED_SCRIPT, arg=self.settle_args(mutation_selector),
+                                                 timeout=remaining(), polling=50)
+                except Exception:
+                    missing.append(f"cambios en {mutation_selector}")
+
+            if condition:
+                script, arg = condition
+                try:
+                    await page.wait_for_function(script, arg=arg, timeout=remaining(), polling=100)
+                except Exception:
+                    missing.append("estado esperado de la página")
+        finally:
+            if matches:
+                try:
+                    page.remove_listener("response", on_response)
+                except Exception:
+                    pass
+
+        elapsed = time.perf_counter() - start
+        self.record(name, elapsed, fixed_delay, missing, ndo, self.response_seconds(responses))
+        return not missing
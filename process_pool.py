@@ -0,0 +1,163 @@
+import multiprocessing
+import queue
+import threading
+import zlib
+from case_source import CaseSource
+from case_store import CaseStore
+from logger import AutomationLogger
+
+
+def shard_for_ndo(ndo, shard_count):
+    """Stable shard number for an NDO, so every case of a patient lands on the same worker"""
+    return zlib.crc32(str(ndo).encode("utf-8")) % shard_count
+
+
+def shard_cases(excel_data, shard_count):
+    shards = [[] for _ in range(shard_count)]
+    for row in excel_data:
+        record = row.to_dict() if hasattr(row, 'to_dict') else dict(row)
+        shards[shard_for_ndo(record.get('NDO'), shard_count)].append(record)
+    return [shard for shard in shards if shard]
+
+
+class QueueLogger(AutomationLogger):
+    """Worker-process logger that forwards every line to the coordinator"""
+
+    def __init__(self, messages, worker_number, settings_manager=None):
+        super().__init__(settings_manager=settings_manager)
+        self.messages = messages
+        self.worker_number = worker_number
+
+    def log(self, level, message, screenshot_path=None):
+        self.messages.put(('log', self.worker_number, level, message, screenshot_path))
+
+
+class QueueCaseSource(CaseSource):
+    """Worker-process case source: status writes go to the coordinator's single writer"""
+
+    description = "coordinador de procesos"
+
+    def __init__(self, messages, worker_number):
+        super().__init__()
+        self.messages = messages
+        self.worker_number = worker_number
+
+    def identity(self):
+        return {'coordinator': self.worker_number}
+
+    def read(self):
+        raise RuntimeError("Los procesos reciben sus casos del coordinador, no leen el origen de casos")
+
+    def start_writeback(self, row_index, on_written=None):
+        pass
+
+    def write_status(self, row, value, key=None):
+        self.messages.put(('status', self.worker_number, row, value, key))
+
+
+def run_worker(worker_number, worker_count, username, password, cases, row_index, messages, stop_event):
+    """Entry point of a worker process: log in with its own browser and process one shard"""
+    from browser_automation import BrowserAutomation
+    from settings_manager import SettingsManager
+
+    settings_manager = SettingsManager()
+    settings_manager.set_tab_workers(1)
+    # Cada proceso inicia su propia sesión: compartir el archivo de sesión guardada
+    # haría que todos usen la misma cookie del portal y compitan al renovarla
+    settings_manager.set_saved_session_enabled(False)
+    logger = QueueLogger(messages, worker_number, settings_manager)
+    automation = BrowserAutomation(logger, settings_manager,
+                                   case_source=QueueCaseSource(messages, worker_number),
+                                   case_store=CaseStore())
+    automation.pacer.limit_rate(max(1, settings_manager.get_portal_rate_ceiling() // worker_count))
+    automation.excel_data = cases
+    automation.sheet_row_index = {tuple(key): row for key, row in row_index}
+
+    def watch_stop():
+        stop_event.wait()
+        automation.request_stop()
+    threading.Thread(target=watch_stop, daemon=True).start()
+
+    try:
+        automation.start_browser()
+        automation.open_portal(username, password)
+        automation.process_excel_data(cases)
+    except Exception as e:
+        logger.error(f"Error en el proceso: {str(e)}")
+    finally:
+        try:
+            automation.close_browser()
+        except Exception as e:
+            logger.warning(f"Error cerrando navegador: {str(e)}")
+        messages.put(('done', worker_number, automation.processed_rows, automation.failed_rows,
+                      automation.build_run_report()))
+
+
+class ProcessPoolRunner:
+    """Runs cases on several processes, each with its own Playwright, Chromium and login.
+
+    Cases are sharded by a hash of the NDO. The coordinator (the calling
+    BrowserAutomation) receives every worker's log lines, case status writes
+    and final results over one queue. Status writes go through the
+    coordinator's own case source, so Google Sheets has a single writer. A
+    crashed worker only loses its own shard; its unfinished cases stay queued
+    in the case store for the next run.
+    """
+
+    def __init__(self, automation, worker_count):
+        self.automation = automation
+        self.worker_count = worker_count
+
+    def log(self, level, message, screenshot_path=None):
+        self.automation.log(level, message, screenshot_path)
+
+    def run(self, username, password, excel_data):
+        shards = shard_cases(excel_data, self.worker_count)
+        context = multiprocessing.get_context("spawn")
+        messages = context.Queue()
+        stop_event = context.Event()
+
+        row_index = list(self.automation.sheet_row_index.items())
+        processes = {}
+        for number, cases in enumerate(shards, start=1):
+            keys = {CaseStore.case_key(case) for case in cases}
+            shard_index = [(key, row) for key, row in row_index if key in keys]
+            process = context.Process(target=run_worker, name=f"pami-worker-{number}",
+                                      args=(number, len(shards), username, password, cases, shard_index,
+                                            messages, stop_event))
+            process.start()
+            processes[number] = process
+            self.log("info", f"Proceso {number}: iniciado con {len(cases)} casos")
+
+        reports = {}
+        running = set(processes)
+        while running:
+            if self.automation.stop_requested and not stop_event.is_set():
+                stop_event.set()
+            try:
+                message = messages.get(timeout=1)
+            except queue.Empty:
+                for number in list(running):
+                    if not processes[number].is_alive():
+                        self.log("error", f"Proceso {number}: terminó inesperadamente (código {processes[number].exitcode}) - Sus casos pendientes quedan para la próxima ejecución")
+                        running.discard(number)
+                continue
+
+            kind, number = message[0], message[1]
+            if kind == 'log':
+                _, _, level, text, screenshot_path = message
+                self.log(level.lower(), f"[Proceso {number}] {text}", screenshot_path)
+            elif kind == 'status':
+                _, _, row, value, key = message
+                self.automation.case_source.write_status(row, value, key=tuple(key) if key else None)
+            elif kind == 'done':
+                _, _, processed_rows, failed_rows, report = message
+                self.automation.processed_rows.extend(processed_rows)
+                self.automation.failed_rows.extend(failed_rows)
+                reports[number] = report
+                running.discard(number)
+
+        for process in processes.values():
+            process.join(timeout=30)
+
+        return reports
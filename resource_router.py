@@ -0,0 +1,235 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from urllib.parse import urlsplit
+from config import *
+
+# Headers that describe the original transfer, not the decoded body we fulfill with
+TRANSFER_HEADERS = ("content-encoding", "content-length", "transfer-encoding")
+
+
+class ResourceRouter:
+    """Request routing and load measurements for the portal pages.
+
+    With the light profile, images, media and analytics hosts are aborted
+    before they leave the browser (fonts never are: the portal's action
+    buttons are icon-font glyphs), and stylesheets and scripts are
+    fetched once and then served from RESOURCE_CACHE_DIR for
+    RESOURCE_CACHE_TTL_HOURS. With the full profile nothing is routed. In both
+    cases the watched pages report their load times and the bytes Chromium
+    received, so the run reports of the two profiles can be compared.
+    """
+
+    def __init__(self, profile=RESOURCE_PROFILE, cache_dir=RESOURCE_CACHE_DIR, logger=None):
+        self.profile = profile
+        self.cache_dir = cache_dir
+        self.logger = logger
+        self.lock = threading.Lock()
+        self.watched = {}
+        self.navigations = {}
+        self.blocked = 0
+        self.cache_hits = 0
+        self.cache_bytes = 0
+        self.received_bytes = 0
+        self.loads = 0
+        self.load_seconds = 0.0
+
+    def log(self, level, message):
+        if self.logger:
+            getattr(self.logger, level)(message)
+
+    @property
+    def light(self):
+        return self.profile == RESOURCE_PROFILE_LIGHT
+
+    def decide(self, request):
+        """'block', 'cache' or 'continue' for a routed request"""
+        if request.resource_type == "font":
+            return "continue"
+        host = urlsplit(request.url).hostname or ""
+        if any(host == blocked or host.endswith("." + blocked) for blocked in BLOCKED_RESOURCE_HOSTS):
+            return "block"
+        if request.resource_type in BLOCKED_RESOURCE_TYPES:
+            return "block"
+        if request.resource_type in CACHED_RESOURCE_TYPES and request.method == "GET":
+            return "cache"
+        return "continue"
+
+    def paths_for(self, url):
+        name = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, f"{name}.body"), os.path.join(self.cache_dir, f"{name}.json")
+
+    def lookup(self, url):
+        """(status, headers, body) of a fresh cached resource, or None"""
+        body_path, meta_path = self.paths_for(url)
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            if time.time() - meta['stored_at'] > RESOURCE_CACHE_TTL_HOURS * 3600:
+                return None
+            with open(body_path, 'rb') as f:
+                body = f.read()
+        except (OSError, ValueError, KeyError):
+            return None
+        with self.lock:
+            self.cache_hits += 1
+            self.cache_bytes += len(body)
+        return meta['status'], meta['headers'], body
+
+    def store(self, url, status, headers, body):
+        if status != 200 or "no-store" in headers.get("cache-control", ""):
+            return
+        body_path, meta_path = self.paths_for(url)
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(body_path, 'wb') as f:
+                f.write(body)
+            with open(meta_path, 'w', encoding='utf-8') as f:
+                json.dump({'status': status, 'headers': self.body_headers(headers), 'stored_at': time.time()}, f)
+        except OSError as e:
+            self.log("warning", f"No se pudo guardar el recurso en la caché local: {str(e)}")
+
+    @staticmethod
+    def body_headers(headers):
+        return {name: value for name, value in headers.items() if name.lower() not in TRANSFER_HEADERS}
+
+    def count_blocked(self):
+        with self.lock:
+            self.blocked += 1
+
+    def install(self, context):
+        if self.light:
+            context.route("**/*", self.handle)
+
+    def uninstall(self, context):
+        if self.light:
+            try:
+                context.unroute("**/*", self.handle)
+            except Exception:
+                pass
+
+    def handle(self, route):
+        request = route.request
+        action = self.decide(request)
+        if action == "block":
+            self.count_blocked()
+            route.abort("blockedbyclient")
+            return
+        if action == "cache":
+            cached = self.lookup(request.url)
+            if cached:
+                status, headers, body = cached
+                route.fulfill(status=status, headers=headers, body=body)
+                return
+            response = route.fetch()
+            body = response.body()
+            self.store(request.url, response.status, response.headers, body)
+            route.fulfill(status=response.status, headers=self.body_headers(response.headers), body=body)
+            return
+        route.continue_()
+
+    async def install_async(self, context):
+        if self.light:
+            await context.route("**/*", self.handle_async)
+
+    async def handle_async(self, route):
+        request = route.request
+        action = self.decide(request)
+        if action == "block":
+            self.count_blocked()
+            await route.abort("blockedbyclient")
+            return
+        if action == "cache":
+            cached = self.lookup(request.url)
+            if cached:
+                status, headers, body = cached
+                await route.fulfill(status=status, headers=headers, body=body)
+                return
+            response = await route.fetch()
+            body = await response.body()
+            self.store(request.url, response.status, response.headers, body)
+            await route.fulfill(status=response.status, headers=self.body_headers(response.headers), body=body)
+            return
+        await route.continue_()
+
+    def watch_page(self, page):
+        """Measure the page's loads and, through a CDP session, the bytes it receives"""
+        if page in self.watched:
+            return
+        on_request = lambda request: self.on_request(page, request)
+        on_load = lambda _page: self.on_load(page)
+        page.on("request", on_request)
+        page.on("load", on_load)
+        cdp = None
+        try:
+            cdp = page.context.new_cdp_session(page)
+            cdp.on("Network.loadingFinished", self.on_loading_finished)
+            cdp.send("Network.enable")
+        except Exception as e:
+            self.log("warning", f"Sin medición de bytes para la página: {str(e)}")
+        self.watched[page] = (on_request, on_load, cdp)
+
+    async def watch_page_async(self, page):
+        if page in self.watched:
+            return
+        on_request = lambda request: self.on_request(page, request)
+        on_load = lambda _page: self.on_load(page)
+        page.on("request", on_request)
+        page.on("load", on_load)
+        cdp = None
+        try:
+            cdp = await page.context.new_cdp_session(page)
+            cdp.on("Network.loadingFinished", self.on_loading_finished)
+            await cdp.send("Network.enable")
+        except Exception as e:
+            self.log("warning", f"Sin medición de bytes para la página: {str(e)}")
+        self.watched[page] = (on_request, on_load, cdp)
+
+    def unwatch_page(self, page):
+        """Stop measuring a page that outlives this run (warm browser service)"""
+        handlers = self.watched.pop(page, None)
+        if not handlers:
+            return
+        on_request, on_load, cdp = handlers
+        self.navigations.pop(page, None)
+        try:
+            page.remove_listener("request", on_request)
+            page.remove_listener("load", on_load)
+            if cdp is not None:
+                cdp.detach()
+        except Exception:
+            pass
+
+    def on_request(self, page, request):
+        if request.is_navigation_request() and request.frame == page.main_frame:
+            self.navigations[page] = time.perf_counter()
+
+    def on_load(self, page):
+        start = self.navigations.pop(page, None)
+        if start is None:
+            return
+        with self.lock:
+            self.loads += 1
+            self.load_seconds += time.perf_counter() - start
+
+    def on_loading_finished(self, params):
+        with self.lock:
+            self.received_bytes += int(params.get('encodedDataLength', 0))
+
+    def report(self):
+        """Rows for the run report"""
+        megabyte = 1024 * 1024
+        average = self.load_seconds / self.loads if self.loads else 0.0
+        network_bytes = max(self.received_bytes - self.cache_bytes, 0)
+        rows = [
+            {'Metrica': 'Perfil de recursos', 'Valor': RESOURCE_PROFILES.get(self.profile, self.profile)},
+            {'Metrica': 'Cargas de página (cantidad / promedio s)', 'Valor': f"{self.loads} / {average:.2f}"},
+            {'Metrica': 'MB recibidos por red', 'Valor': round(network_bytes / megabyte, 2)},
+        ]
+        if self.light:
+            rows.append({'Metrica': 'Solicitudes bloqueadas', 'Valor': self.blocked})
+            rows.append({'Metrica': 'Recursos servidos desde caché local (cantidad / MB)',
+                         'Valor': f"{self.cache_hits} / {self.cache_bytes / megabyte:.2f}"})
+        return rows
@@ -0,0 +1,116 @@
+import heapq
+import itertools
+import threading
+import time
+from config import *
+
+# Case store stage at the moment a case failed, as shown in the run report
+STAGE_LABELS = {
+    'started': 'búsqueda',
+    'matched': 'verificación',
+    'uploading': 'carga',
+    'transmitting': 'transmisión',
+}
+
+ERROR_CLASS_LABELS = {
+    ERROR_CLASS_TRANSIENT: 'transitorio',
+    ERROR_CLASS_PORTAL_STATE: 'estado del portal',
+    ERROR_CLASS_PERMANENT: 'permanente',
+}
+
+
+def classify_failure(failure):
+    """Error class of a failed case row, from its exception text or its status"""
+    status = str(failure.get('Status', '')).lower()
+    text = f"{failure.get('Error', '')} {status}".lower()
+    if any(marker in status for marker in PERMANENT_FAILURE_MARKERS):
+        return ERROR_CLASS_PERMANENT
+    if any(marker in text for marker in TRANSIENT_FAILURE_MARKERS):
+        return ERROR_CLASS_TRANSIENT
+    if any(marker in text for marker in PORTAL_STATE_FAILURE_MARKERS):
+        return ERROR_CLASS_PORTAL_STATE
+    return ERROR_CLASS_TRANSIENT if failure.get('Error') else ERROR_CLASS_PORTAL_STATE
+
+
+class RetryScheduler:
+    """Delayed retry queue for the failed cases of a run.
+
+    Each error class has its own retry budget and backoff, doubled on every
+    retry of the same case up to RETRY_BACKOFF_MAX. A case with budget left
+    waits in the queue while the run goes on with other NDOs. Cases are
+    counted under the stage of their first retried failure, so the report
+    shows how often a retry at each stage ends in success. The queue is
+    shared by the tab worker threads, so every method holds a lock.
+    """
+
+    def __init__(self, budgets=RETRY_BUDGETS, backoff=RETRY_BACKOFF):
+        self.budgets = budgets
+        self.backoff = backoff
+        self.queue = []
+        self.sequence = itertools.count()
+        self.used = {}
+        self.first_stage = {}
+        self.stats = {}
+        self.lock = threading.Lock()
+
+    def schedule(self, group_number, index, row, failure, stage):
+        """Queue the case for a retry; returns (error_class, retry number, delay) or (error_class, None, None)"""
+        error_class = classify_failure(failure)
+        with self.lock:
+            used = self.used.setdefault(index, {})
+            retries = used.get(error_class, 0)
+            if retries >= self.budgets.get(error_class, 0):
+                return error_class, None, None
+
+            used[error_class] = retries + 1
+            delay = min(self.backoff.get(error_class, 0) * (2 ** retries), RETRY_BACKOFF_MAX)
+            heapq.heappush(self.queue, (time.monotonic() + delay, next(self.sequence), group_number, index, row))
+
+            stage = STAGE_LABELS.get(stage, stage or 'búsqueda')
+            if index not in self.first_stage:
+                self.first_stage[index] = stage
+                self.stage_stats(stage)['cases'] += 1
+            self.stage_stats(stage)['retries'] += 1
+            return error_class, retries + 1, delay
+
+    def stage_stats(self, stage):
+        return self.stats.setdefault(stage, {'cases': 0, 'retries': 0, 'recovered': 0})
+
+    def due(self):
+        """Pop the retries whose backoff elapsed, as (group_number, cases) per NDO group"""
+        now = time.monotonic()
+        groups = {}
+        with self.lock:
+            while self.queue and self.queue[0][0] <= now:
+                _, _, group_number, index, row = heapq.heappop(self.queue)
+                groups.setdefault(group_number, []).append((index, row))
+        return list(groups.items())
+
+    def pending(self):
+        with self.lock:
+            return len(self.queue)
+
+    def queued(self, index):
+        with self.lock:
+            return any(item[3] == index for item in self.queue)
+
+    def seconds_until_next(self):
+        with self.lock:
+            return max(self.queue[0][0] - time.monotonic(), 0.0) if self.queue else 0.0
+
+    def record_success(self, index):
+        with self.lock:
+            stage = self.first_stage.pop(index, None)
+            if stage:
+                self.stage_stats(stage)['recovered'] += 1
+
+    def report(self):
+        """Rows for the run report"""
+        rows = []
+        for stage, stats in self.stats.items():
+            rate = stats['recovered'] / stats['cases'] * 100 if stats['cases'] else 0.0
+            rows.append({'Metrica': f"Reintentos en {stage} (casos / reintentos / exitosos / % éxito)",
+                         'Valor': f"{stats['cases']} / {stats['retries']} / {stats['recovered']} / {rate:.0f}%"})
+        if self.queue:
+            rows.append({'Metrica': 'Casos que quedaron esperando reintento', 'Valor': len(self.queue)})
+        return rows
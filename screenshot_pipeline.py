@@ -0,0 +1,202 @@
+import base64
+import hashlib
+import os
+import queue
+import re
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from urllib.parse import urlsplit
+from config import *
+
+FILE_EXTENSIONS = {
+    SCREENSHOT_FORMAT_JPEG: ".jpg",
+    SCREENSHOT_FORMAT_WEBP: ".webp",
+    SCREENSHOT_FORMAT_MHTML: ".mhtml",
+}
+
+# Captures remembered for dedup; older digests are forgotten
+DIGEST_MEMORY = 200
+
+
+class ScreenshotPipeline:
+    """Error captures that do not hold up the automation thread.
+
+    The caller's thread only asks Chromium for a compressed JPEG/WebP image
+    or an MHTML snapshot of the DOM. Decoding, writing the file and keeping
+    the screenshot directory under its size cap happen on one background
+    writer. A signature is the description without its NDO plus the page
+    path. Each signature is captured at most once every
+    SCREENSHOT_SIGNATURE_INTERVAL seconds, and a capture identical to an
+    earlier one is not written again, so an outage produces one file per kind
+    of error instead of one per case. A skipped capture returns a note naming
+    the signature it matched instead of a path: the earlier file belongs to
+    another case and may be deleted by retention.
+    """
+
+    def __init__(self, screenshot_dir=SCREENSHOT_DIR, image_format=SCREENSHOT_FORMAT,
+                 max_bytes=SCREENSHOT_DIR_MAX_MB * 1024 * 1024, logger=None):
+        self.screenshot_dir = screenshot_dir
+        self.image_format = image_format if image_format in FILE_EXTENSIONS else SCREENSHOT_FORMAT
+        self.max_bytes = max_bytes
+        self.logger = logger
+        self.jobs = queue.Queue(maxsize=SCREENSHOT_QUEUE_MAX)
+        self.lock = threading.Lock()
+        self.thread = None
+        self.recent = {}
+        self.digests = OrderedDict()
+        self.captured = 0
+        self.rate_limited = 0
+        self.duplicates = 0
+        self.dropped = 0
+        self.written_bytes = 0
+        self.deleted = 0
+
+    def log(self, level, message):
+        if self.logger:
+            getattr(self.logger, level)(message)
+
+    @staticmethod
+    def signature(description, url):
+        kind = re.sub(r"_ndo_.*$", "", description)
+        return f"{kind}|{urlsplit(url or '').path}"
+
+    @staticmethod
+    def omitted(reason, signature):
+        """What a case records instead of a path when its capture was skipped"""
+        return f"Captura omitida ({reason}: {signature})"
+
+    def rate_limit_note(self, signature):
+        """Note for a capture skipped because its signature was captured inside the rate-limit window"""
+        with self.lock:
+            captured_at = self.recent.get(signature)
+            if captured_at and time.time() - captured_at < SCREENSHOT_SIGNATURE_INTERVAL:
+                self.rate_limited += 1
+                return self.omitted("mismo error capturado recientemente", signature)
+        return None
+
+    def capture(self, page, description="error"):
+        """Capture page from the Playwright thread; returns the file path the writer will create, or an omission note"""
+        signature = self.signature(description, page.url)
+        note = self.rate_limit_note(signature)
+        if note:
+            return note
+        if self.image_format == SCREENSHOT_FORMAT_JPEG:
+            data = page.screenshot(type="jpeg", quality=SCREENSHOT_QUALITY)
+        else:
+            cdp = page.context.new_cdp_session(page)
+            try:
+                data = cdp.send(*self.cdp_command())['data']
+            finally:
+                cdp.detach()
+        return self.submit(signature, description, data)
+
+    async def capture_async(self, page, description="error"):
+        signature = self.signature(description, page.url)
+        note = self.rate_limit_note(signature)
+        if note:
+            return note
+        if self.image_format == SCREENSHOT_FORMAT_JPEG:
+            data = await page.screenshot(type="jpeg", quality=SCREENSHOT_QUALITY)
+        else:
+            cdp = await page.context.new_cdp_session(page)
+            try:
+                data = (await cdp.send(*self.cdp_command()))['data']
+            finally:
+                await cdp.detach()
+        return self.submit(signature, description, data)
+
+    def cdp_command(self):
+        """CDP capture call; the payload is base64 image data or MHTML text, decoded by the writer"""
+        if self.image_format == SCREENSHOT_FORMAT_MHTML:
+            return "Page.captureSnapshot", {"format": "mhtml"}
+        return "Page.captureScreenshot", {"format": "webp", "quality": SCREENSHOT_QUALITY}
+
+    def submit(self, signature, description, data):
+        digest = hashlib.sha1(data if isinstance(data, bytes) else data.encode("utf-8")).hexdigest()
+        now = time.time()
+        with self.lock:
+            matched = self.digests.get(digest)
+            if matched:
+                self.duplicates += 1
+                self.recent[signature] = now
+                return self.omitted("idéntica a una captura anterior", matched)
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+            path = os.path.join(self.screenshot_dir, f"{description}_{timestamp}{FILE_EXTENSIONS[self.image_format]}")
+            try:
+                self.jobs.put_nowait((path, data))
+            except queue.Full:
+                self.dropped += 1
+                self.log("warning", "Cola de capturas llena - Se descarta la captura")
+                return None
+            self.captured += 1
+            self.recent[signature] = now
+            self.digests[digest] = signature
+            if len(self.digests) > DIGEST_MEMORY:
+                self.digests.popitem(last=False)
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.writer, name="screenshot-writer", daemon=True)
+                self.thread.start()
+        return path
+
+    def writer(self):
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                break
+            path, data = job
+            try:
+                self.write(path, data)
+                self.enforce_retention()
+            except Exception as e:
+                self.log("error", f"Failed to write screenshot: {str(e)}")
+
+    def write(self, path, data):
+        if isinstance(data, str):
+            data = data.encode("utf-8") if self.image_format == SCREENSHOT_FORMAT_MHTML else base64.b64decode(data)
+        os.makedirs(self.screenshot_dir, exist_ok=True)
+        temp_path = f"{path}.tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, path)
+        with self.lock:
+            self.written_bytes += len(data)
+
+    def enforce_retention(self):
+        """Delete the oldest files until screenshot_dir fits max_bytes"""
+        files = []
+        for entry in os.scandir(self.screenshot_dir):
+            if entry.is_file() and not entry.name.endswith(".tmp"):
+                stat = entry.stat()
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            with self.lock:
+                self.deleted += 1
+
+    def close(self, timeout=10):
+        """Write the queued captures and stop the writer"""
+        with self.lock:
+            thread, self.thread = self.thread, None
+        if thread is None:
+            return
+        self.jobs.put(None)
+        thread.join(timeout)
+
+    def report(self):
+        """Rows for the run report"""
+        return [
+            {'Metrica': 'Capturas guardadas (cantidad / MB)',
+             'Valor': f"{self.captured} / {self.written_bytes / (1024 * 1024):.2f}"},
+            {'Metrica': 'Capturas omitidas (mismo error / repetidas / cola llena)',
+             'Valor': f"{self.rate_limited} / {self.duplicates} / {self.dropped}"},
+            {'Metrica': 'Capturas antiguas eliminadas', 'Valor': self.deleted},
+        ]
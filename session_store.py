@@ -0,0 +1,72 @@
+import base64
+import hashlib
+import json
+import os
+import time
+from cryptography.fernet import Fernet, InvalidToken
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+from config import *
+
+
+class SessionStore:
+    """Encrypted per-user copies of the portal session (Playwright storage_state).
+
+    Each file holds a random salt and a Fernet token whose key is derived from
+    the user's portal password with PBKDF2, so a saved session can only be
+    opened by someone who knows the password. A wrong password or a damaged
+    file reads as "no saved session".
+    """
+
+    def __init__(self, directory=SESSION_DIR, logger=None):
+        self.directory = directory
+        self.logger = logger
+
+    def log(self, level, message):
+        if self.logger:
+            getattr(self.logger, level)(message)
+
+    def path_for(self, username):
+        name = hashlib.sha256(username.strip().lower().encode("utf-8")).hexdigest()[:16]
+        return os.path.join(self.directory, f"{name}.session")
+
+    @staticmethod
+    def derive_key(password, salt):
+        kdf = PBKDF2HMAC(algorithm=hashes.SHA256(), length=32, salt=salt, iterations=SESSION_KDF_ITERATIONS)
+        return base64.urlsafe_b64encode(kdf.derive(password.encode("utf-8")))
+
+    def save(self, username, password, storage_state, transmision_url):
+        os.makedirs(self.directory, exist_ok=True)
+        salt = os.urandom(16)
+        payload = json.dumps({
+            'storage_state': storage_state,
+            'transmision_url': transmision_url,
+            'saved_at': time.time(),
+        }).encode("utf-8")
+        token = Fernet(self.derive_key(password, salt)).encrypt(payload)
+
+        path = self.path_for(username)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(salt + token)
+        os.replace(temp_path, path)
+
+    def load(self, username, password):
+        """Return {'storage_state', 'transmision_url', 'saved_at'} or None"""
+        path = self.path_for(username)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            payload = Fernet(self.derive_key(password, data[:16])).decrypt(data[16:])
+            return json.loads(payload)
+        except (OSError, ValueError, InvalidToken):
+            self.log("warning", "No se pudo abrir la sesión guardada (contraseña distinta o archivo dañado)")
+            return None
+
+    def delete(self, username):
+        try:
+            os.remove(self.path_for(username))
+        except FileNotFoundError:
+            pass
@@ -19,6 +19,22 @@ class SettingsManager:
             "worksheet_name": WORKSHEET_NAME,
             "google_sheets_url": GOOGLE_SHEETS_URL,
             "google_sheets_id": GOOGLE_SHEETS_ID,
+            "case_source": CASE_SOURCE,
+            "case_file_path": CASE_FILE_PATH,
+            "pacing_profile": PACING_PROFILE,
+            "tab_workers": TAB_WORKERS,
+            "portal_rate_ceiling": PORTAL_RATE_CEILING,
+            "process_workers": PROCESS_WORKERS,
+            "automation_engine": AUTOMATION_ENGINE,
+            "informe_prefetch_depth": INFORME_PREFETCH_DEPTH,
+            "informe_cache_max_mb": INFORME_CACHE_MAX_MB,
+            "search_cache_ttl_hours": SEARCH_CACHE_TTL_HOURS,
+            "saved_session_enabled": SAVED_SESSION_ENABLED,
+            "headless": HEADLESS,
+            "resource_profile": RESOURCE_PROFILE,
+            "screenshot_format": SCREENSHOT_FORMAT,
+            "screenshot_dir_max_mb": SCREENSHOT_DIR_MAX_MB,
+            "case_retries_enabled": CASE_RETRIES_ENABLED,
         }
         self.settings = self.load_settings()
     
@@ -67,6 +83,22 @@ class SettingsManager:
         """Get screenshot directory"""
         return self.get("screenshot_dir")
     
+    def get_screenshot_format(self):
+        """Get error capture format (jpeg, webp or mhtml)"""
+        return self.get("screenshot_format")
+
+    def set_screenshot_format(self, image_format):
+        """Set error capture format (jpeg, webp or mhtml)"""
+        self.set("screenshot_format", image_format)
+
+    def get_screenshot_dir_max_mb(self):
+        """Get size cap of the screenshot directory in MB"""
+        return int(self.get("screenshot_dir_max_mb"))
+
+    def set_screenshot_dir_max_mb(self, size_mb):
+        """Set size cap of the screenshot directory in MB"""
+        self.set("screenshot_dir_max_mb", size_mb)
+
     def set_screenshot_dir(self, directory):
         """Set screenshot directory"""
         self.set("screenshot_dir", directory)
@@ -157,4 +189,116 @@ class SettingsManager:
 
     def set_google_sheets_id(self, sheets_id):
         """Set Google Sheets ID"""
-        self.set("google_sheets_id", sheets_id)
\ No newline at end of file
+        self.set("google_sheets_id", sheets_id)
+
+    def get_case_source(self):
+        """Get case source type (google_sheets or file)"""
+        return self.get("case_source")
+
+    def set_case_source(self, source_type):
+        """Set case source type"""
+        self.set("case_source", source_type)
+
+    def get_case_file_path(self):
+        """Get local case file path (.xlsx or .csv)"""
+        return self.get("case_file_path")
+
+    def set_case_file_path(self, file_path):
+        """Set local case file path"""
+        self.set("case_file_path", file_path)
+
+    def get_pacing_profile(self):
+        """Get pacing profile name (conservative, balanced or throughput)"""
+        return self.get("pacing_profile")
+
+    def set_pacing_profile(self, profile_name):
+        """Set pacing profile name"""
+        self.set("pacing_profile", profile_name)
+
+    def get_tab_workers(self):
+        """Get number of OME tabs processing cases in parallel"""
+        return int(self.get("tab_workers"))
+
+    def set_tab_workers(self, count):
+        """Set number of OME tabs processing cases in parallel"""
+        self.set("tab_workers", count)
+
+    def get_portal_rate_ceiling(self):
+        """Get maximum portal actions per minute across all tabs"""
+        return int(self.get("portal_rate_ceiling"))
+
+    def set_portal_rate_ceiling(self, actions_per_minute):
+        """Set maximum portal actions per minute across all tabs"""
+        self.set("portal_rate_ceiling", actions_per_minute)
+
+    def get_process_workers(self):
+        """Get number of browser processes processing cases in parallel"""
+        return int(self.get("process_workers"))
+
+    def set_process_workers(self, count):
+        """Set number of browser processes processing cases in parallel"""
+        self.set("process_workers", count)
+
+    def get_automation_engine(self):
+        """Get automation engine (sync or async)"""
+        return self.get("automation_engine")
+
+    def set_automation_engine(self, engine):
+        """Set automation engine (sync or async)"""
+        self.set("automation_engine", engine)
+
+    def get_informe_prefetch_depth(self):
+        """Get number of upcoming cases whose informes are downloaded in advance"""
+        return int(self.get("informe_prefetch_depth"))
+
+    def set_informe_prefetch_depth(self, depth):
+        """Set number of upcoming cases whose informes are downloaded in advance"""
+        self.set("informe_prefetch_depth", depth)
+
+    def get_informe_cache_max_mb(self):
+        """Get size limit of the informe cache in the downloads directory (MB)"""
+        return int(self.get("informe_cache_max_mb"))
+
+    def set_informe_cache_max_mb(self, size_mb):
+        """Set size limit of the informe cache in the downloads directory (MB)"""
+        self.set("informe_cache_max_mb", size_mb)
+
+    def get_search_cache_ttl_hours(self):
+        """Get hours a saved portal results table per NDO is reused (0 disables it)"""
+        return int(self.get("search_cache_ttl_hours"))
+
+    def set_search_cache_ttl_hours(self, hours):
+        """Set hours a saved portal results table per NDO is reused (0 disables it)"""
+        self.set("search_cache_ttl_hours", hours)
+
+    def is_saved_session_enabled(self):
+        """Check if the portal session is saved and reused between runs"""
+        return self.get("saved_session_enabled")
+
+    def set_saved_session_enabled(self, enabled):
+        """Enable or disable saving and reusing the portal session"""
+        self.set("saved_session_enabled", enabled)
+
+    def is_case_retries_enabled(self):
+        """Check if failed cases are retried later in the same run"""
+        return self.get("case_retries_enabled")
+
+    def set_case_retries_enabled(self, enabled):
+        """Enable or disable retrying failed cases later in the same run"""
+        self.set("case_retries_enabled", enabled)
+
+    def is_headless_enabled(self):
+        """Check if Chromium runs without a visible window"""
+        return self.get("headless")
+
+    def set_headless_enabled(self, enabled):
+        """Enable or disable running Chromium without a visible window"""
+        self.set("headless", enabled)
+
+    def get_resource_profile(self):
+        """Get resource profile (light blocks images and analytics)"""
+        return self.get("resource_profile")
+
+    def set_resource_profile(self, profile):
+        """Set resource profile (light blocks images and analytics)"""
+        self.set("resource_profile", profile)
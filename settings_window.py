@@ -1,9 +1,17 @@
 from PyQt6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel, 
                              QPushButton, QSpinBox, QGroupBox, QMessageBox,
-                             QLineEdit, QFileDialog, QDateTimeEdit, QCheckBox)
+                             QLineEdit, QFileDialog, QDateTimeEdit, QCheckBox,
+                             QComboBox)
 from PyQt6.QtCore import Qt, QDateTime
 import os
 from datetime import datetime
+from config import (CASE_SOURCE_GOOGLE_SHEETS, CASE_SOURCE_FILE, PACING_PROFILES, PACING_PROFILE,
+                    TAB_WORKERS, TAB_WORKERS_MAX, PORTAL_RATE_CEILING, PROCESS_WORKERS,
+                    PROCESS_WORKERS_MAX, AUTOMATION_ENGINE, AUTOMATION_ENGINES, INFORME_CACHE_MAX_MB,
+                    INFORME_PREFETCH_DEPTH, INFORME_PREFETCH_DEPTH_MAX, SEARCH_CACHE_TTL_HOURS,
+                    SEARCH_CACHE_TTL_HOURS_MAX, SAVED_SESSION_ENABLED, HEADLESS, RESOURCE_PROFILE,
+                    RESOURCE_PROFILES, SCREENSHOT_FORMAT, SCREENSHOT_FORMATS, SCREENSHOT_DIR_MAX_MB,
+                    CASE_RETRIES_ENABLED)
 
 class SettingsWindow(QDialog):
     def __init__(self, settings_manager, parent=None):
@@ -40,13 +48,126 @@ class SettingsWindow(QDialog):
         
         browser_layout.addLayout(timeout_layout)
         
-        help_label = QLabel("El timeout determina cuánto tiempo espera el navegador\npor los elementos de la página antes de dar error.")
+        self.saved_session_checkbox = QCheckBox("Recordar la sesión del portal entre ejecuciones")
+        self.saved_session_checkbox.setChecked(SAVED_SESSION_ENABLED)
+        browser_layout.addWidget(self.saved_session_checkbox)
+        
+        self.headless_checkbox = QCheckBox("Ejecutar el navegador sin ventana (headless)")
+        self.headless_checkbox.setChecked(HEADLESS)
+        browser_layout.addWidget(self.headless_checkbox)
+        
+        resource_profile_layout = QHBoxLayout()
+        resource_profile_label = QLabel("Perfil de recursos:")
+        self.resource_profile_combo = QComboBox()
+        for profile, label in RESOURCE_PROFILES.items():
+            self.resource_profile_combo.addItem(label, profile)
+        
+        resource_profile_layout.addWidget(resource_profile_label)
+        resource_profile_layout.addWidget(self.resource_profile_combo)
+        resource_profile_layout.addStretch()
+        
+        browser_layout.addLayout(resource_profile_layout)
+        
+        help_label = QLabel("El timeout determina cuánto tiempo espera el navegador\npor los elementos de la página antes de dar error. La sesión\nse guarda cifrada con la contraseña y se vuelve a iniciar si venció.\nEl perfil liviano no descarga imágenes ni analítica.")
         help_label.setStyleSheet("color: #666; font-size: 11px; font-style: italic;")
         browser_layout.addWidget(help_label)
         
         browser_group.setLayout(browser_layout)
         layout.addWidget(browser_group)
         
+        pacing_group = QGroupBox("Ritmo de Procesamiento")
+        pacing_layout = QVBoxLayout()
+        
+        pacing_profile_layout = QHBoxLayout()
+        pacing_profile_label = QLabel("Perfil de ritmo:")
+        self.pacing_profile_combo = QComboBox()
+        for profile_name, profile in PACING_PROFILES.items():
+            self.pacing_profile_combo.addItem(profile['label'], profile_name)
+        
+        pacing_profile_layout.addWidget(pacing_profile_label)
+        pacing_profile_layout.addWidget(self.pacing_profile_combo)
+        pacing_profile_layout.addStretch()
+        
+        pacing_layout.addLayout(pacing_profile_layout)
+        
+        engine_layout = QHBoxLayout()
+        engine_label = QLabel("Motor de automatización:")
+        self.engine_combo = QComboBox()
+        for engine, label in AUTOMATION_ENGINES.items():
+            self.engine_combo.addItem(label, engine)
+        
+        engine_layout.addWidget(engine_label)
+        engine_layout.addWidget(self.engine_combo)
+        engine_layout.addStretch()
+        
+        pacing_layout.addLayout(engine_layout)
+        
+        tab_workers_layout = QHBoxLayout()
+        tab_workers_label = QLabel("Pestañas en paralelo:")
+        self.tab_workers_spinbox = QSpinBox()
+        self.tab_workers_spinbox.setMinimum(1)
+        self.tab_workers_spinbox.setMaximum(TAB_WORKERS_MAX)
+        self.tab_workers_spinbox.setValue(TAB_WORKERS)
+        
+        tab_workers_layout.addWidget(tab_workers_label)
+        tab_workers_layout.addWidget(self.tab_workers_spinbox)
+        tab_workers_layout.addStretch()
+        
+        pacing_layout.addLayout(tab_workers_layout)
+        
+        process_workers_layout = QHBoxLayout()
+        process_workers_label = QLabel("Procesos en paralelo:")
+        self.process_workers_spinbox = QSpinBox()
+        self.process_workers_spinbox.setMinimum(1)
+        self.process_workers_spinbox.setMaximum(PROCESS_WORKERS_MAX)
+        self.process_workers_spinbox.setValue(PROCESS_WORKERS)
+        
+        process_workers_layout.addWidget(process_workers_label)
+        process_workers_layout.addWidget(self.process_workers_spinbox)
+        process_workers_layout.addStretch()
+        
+        pacing_layout.addLayout(process_workers_layout)
+        
+        rate_ceiling_layout = QHBoxLayout()
+        rate_ceiling_label = QLabel("Límite global de acciones:")
+        self.rate_ceiling_spinbox = QSpinBox()
+        self.rate_ceiling_spinbox.setMinimum(5)
+        self.rate_ceiling_spinbox.setMaximum(600)
+        self.rate_ceiling_spinbox.setValue(PORTAL_RATE_CEILING)
+        self.rate_ceiling_spinbox.setSuffix(" por minuto")
+        
+        rate_ceiling_layout.addWidget(rate_ceiling_label)
+        rate_ceiling_layout.addWidget(self.rate_ceiling_spinbox)
+        rate_ceiling_layout.addStretch()
+        
+        pacing_layout.addLayout(rate_ceiling_layout)
+        
+        search_cache_layout = QHBoxLayout()
+        search_cache_label = QLabel("Reutilizar búsquedas del portal:")
+        self.search_cache_spinbox = QSpinBox()
+        self.search_cache_spinbox.setMinimum(0)
+        self.search_cache_spinbox.setMaximum(SEARCH_CACHE_TTL_HOURS_MAX)
+        self.search_cache_spinbox.setValue(SEARCH_CACHE_TTL_HOURS)
+        self.search_cache_spinbox.setSuffix(" horas")
+        self.search_cache_spinbox.setSpecialValueText("No")
+        
+        search_cache_layout.addWidget(search_cache_label)
+        search_cache_layout.addWidget(self.search_cache_spinbox)
+        search_cache_layout.addStretch()
+        
+        pacing_layout.addLayout(search_cache_layout)
+        
+        self.case_retries_checkbox = QCheckBox("Reintentar casos fallidos más tarde en la misma ejecución")
+        self.case_retries_checkbox.setChecked(CASE_RETRIES_ENABLED)
+        pacing_layout.addWidget(self.case_retries_checkbox)
+        
+        pacing_help_label = QLabel("Conservador mantiene las esperas de siempre (10-30 segundos entre casos).\nLos otros perfiles limitan las acciones por minuto y ajustan las esperas\nsegún lo que tarda el portal en responder. Con más de una pestaña o proceso,\nel límite global de acciones se reparte entre todos. Cada proceso abre\nsu propio navegador e inicia sesión por separado. El motor asíncrono atiende\ntodas las pestañas desde un solo hilo. Los reintentos no se aplican\na los casos sin COD o sin informe, y solo funcionan con una pestaña.")
+        pacing_help_label.setStyleSheet("color: #666; font-size: 11px; font-style: italic;")
+        pacing_layout.addWidget(pacing_help_label)
+        
+        pacing_group.setLayout(pacing_layout)
+        layout.addWidget(pacing_group)
+        
         date_group = QGroupBox("Filtro de Rango de Fechas")
         date_layout = QVBoxLayout()
         
@@ -137,6 +258,42 @@ class SettingsWindow(QDialog):
         sheets_group.setLayout(sheets_layout)
         layout.addWidget(sheets_group)
         
+        source_group = QGroupBox("Origen de los Casos")
+        source_layout = QVBoxLayout()
+        
+        source_type_layout = QHBoxLayout()
+        source_type_label = QLabel("Leer casos desde:")
+        self.case_source_combo = QComboBox()
+        self.case_source_combo.addItem("Google Sheets", CASE_SOURCE_GOOGLE_SHEETS)
+        self.case_source_combo.addItem("Archivo local (.xlsx / .csv)", CASE_SOURCE_FILE)
+        self.case_source_combo.currentIndexChanged.connect(self.on_case_source_changed)
+        
+        source_type_layout.addWidget(source_type_label)
+        source_type_layout.addWidget(self.case_source_combo)
+        source_type_layout.addStretch()
+        
+        source_layout.addLayout(source_type_layout)
+        
+        case_file_layout = QHBoxLayout()
+        case_file_label = QLabel("Archivo de casos:")
+        self.case_file_input = QLineEdit()
+        self.case_file_input.setReadOnly(True)
+        self.case_file_browse_btn = QPushButton("Examinar")
+        self.case_file_browse_btn.clicked.connect(self.browse_case_file)
+        
+        case_file_layout.addWidget(case_file_label)
+        case_file_layout.addWidget(self.case_file_input)
+        case_file_layout.addWidget(self.case_file_browse_btn)
+        
+        source_layout.addLayout(case_file_layout)
+        
+        source_help_label = QLabel("El archivo local debe tener las mismas columnas que la hoja de Google Sheets.\nLa columna 'Procesado' se actualiza en el propio archivo.")
+        source_help_label.setStyleSheet("color: #666; font-size: 11px; font-style: italic;")
+        source_layout.addWidget(source_help_label)
+        
+        source_group.setLayout(source_layout)
+        layout.addWidget(source_group)
+        
         dirs_group = QGroupBox("Configuración de Directorios")
         dirs_layout = QVBoxLayout()
         
@@ -153,6 +310,26 @@ class SettingsWindow(QDialog):
         
         dirs_layout.addLayout(screenshot_layout)
         
+        screenshot_options_layout = QHBoxLayout()
+        screenshot_format_label = QLabel("Formato de capturas:")
+        self.screenshot_format_combo = QComboBox()
+        for image_format, label in SCREENSHOT_FORMATS.items():
+            self.screenshot_format_combo.addItem(label, image_format)
+        screenshot_max_label = QLabel("Máximo:")
+        self.screenshot_max_spinbox = QSpinBox()
+        self.screenshot_max_spinbox.setMinimum(10)
+        self.screenshot_max_spinbox.setMaximum(100000)
+        self.screenshot_max_spinbox.setValue(SCREENSHOT_DIR_MAX_MB)
+        self.screenshot_max_spinbox.setSuffix(" MB")
+        
+        screenshot_options_layout.addWidget(screenshot_format_label)
+        screenshot_options_layout.addWidget(self.screenshot_format_combo)
+        screenshot_options_layout.addWidget(screenshot_max_label)
+        screenshot_options_layout.addWidget(self.screenshot_max_spinbox)
+        screenshot_options_layout.addStretch()
+        
+        dirs_layout.addLayout(screenshot_options_layout)
+        
         downloads_layout = QHBoxLayout()
         downloads_label = QLabel("Directorio de descargas:")
         self.downloads_dir_input = QLineEdit()
@@ -166,6 +343,28 @@ class SettingsWindow(QDialog):
         
         dirs_layout.addLayout(downloads_layout)
         
+        informe_cache_layout = QHBoxLayout()
+        informe_cache_label = QLabel("Caché de informes:")
+        self.informe_cache_spinbox = QSpinBox()
+        self.informe_cache_spinbox.setMinimum(10)
+        self.informe_cache_spinbox.setMaximum(100000)
+        self.informe_cache_spinbox.setValue(INFORME_CACHE_MAX_MB)
+        self.informe_cache_spinbox.setSuffix(" MB")
+        prefetch_label = QLabel("Descarga anticipada:")
+        self.prefetch_depth_spinbox = QSpinBox()
+        self.prefetch_depth_spinbox.setMinimum(0)
+        self.prefetch_depth_spinbox.setMaximum(INFORME_PREFETCH_DEPTH_MAX)
+        self.prefetch_depth_spinbox.setValue(INFORME_PREFETCH_DEPTH)
+        self.prefetch_depth_spinbox.setSuffix(" casos")
+        
+        informe_cache_layout.addWidget(informe_cache_label)
+        informe_cache_layout.addWidget(self.informe_cache_spinbox)
+        informe_cache_layout.addWidget(prefetch_label)
+        informe_cache_layout.addWidget(self.prefetch_depth_spinbox)
+        informe_cache_layout.addStretch()
+        
+        dirs_layout.addLayout(informe_cache_layout)
+        
         logs_layout = QHBoxLayout()
         logs_label = QLabel("Directorio de logs:")
         self.logs_dir_input = QLineEdit()
@@ -179,7 +378,7 @@ class SettingsWindow(QDialog):
 
         dirs_layout.addLayout(logs_layout)
         
-        dir_help_label = QLabel("Los directorios se crearán automáticamente si no existen.")
+        dir_help_label = QLabel("Los directorios se crearán automáticamente si no existen. Los informes se guardan\nuna sola vez y se descargan por adelantado para los próximos casos de la cola.")
         dir_help_label.setStyleSheet("color: #666; font-size: 11px; font-style: italic;")
         dirs_layout.addWidget(dir_help_label)
         
@@ -262,9 +461,28 @@ class SettingsWindow(QDialog):
         """Load current settings into the UI"""
         timeout_seconds = self.settings_manager.get_browser_timeout() // 1000
         self.timeout_spinbox.setValue(timeout_seconds)
+        self.saved_session_checkbox.setChecked(self.settings_manager.is_saved_session_enabled())
+        self.headless_checkbox.setChecked(self.settings_manager.is_headless_enabled())
+        resource_profile_index = self.resource_profile_combo.findData(self.settings_manager.get_resource_profile())
+        self.resource_profile_combo.setCurrentIndex(max(resource_profile_index, 0))
+        
+        pacing_index = self.pacing_profile_combo.findData(self.settings_manager.get_pacing_profile())
+        self.pacing_profile_combo.setCurrentIndex(max(pacing_index, 0))
+        self.tab_workers_spinbox.setValue(self.settings_manager.get_tab_workers())
+        self.rate_ceiling_spinbox.setValue(self.settings_manager.get_portal_rate_ceiling())
+        self.search_cache_spinbox.setValue(self.settings_manager.get_search_cache_ttl_hours())
+        self.case_retries_checkbox.setChecked(self.settings_manager.is_case_retries_enabled())
+        self.process_workers_spinbox.setValue(self.settings_manager.get_process_workers())
+        engine_index = self.engine_combo.findData(self.settings_manager.get_automation_engine())
+        self.engine_combo.setCurrentIndex(max(engine_index, 0))
         
         self.screenshot_dir_input.setText(self.settings_manager.get_screenshot_dir())
+        screenshot_format_index = self.screenshot_format_combo.findData(self.settings_manager.get_screenshot_format())
+        self.screenshot_format_combo.setCurrentIndex(max(screenshot_format_index, 0))
+        self.screenshot_max_spinbox.setValue(self.settings_manager.get_screenshot_dir_max_mb())
         self.downloads_dir_input.setText(self.settings_manager.get_downloads_dir())
+        self.informe_cache_spinbox.setValue(self.settings_manager.get_informe_cache_max_mb())
+        self.prefetch_depth_spinbox.setValue(self.settings_manager.get_informe_prefetch_depth())
         self.logs_dir_input.setText(self.settings_manager.get_logs_dir())
         
         start_enabled = self.settings_manager.is_date_range_start_enabled()
@@ -276,6 +494,11 @@ class SettingsWindow(QDialog):
         self.sheets_url_input.setText(self.settings_manager.get_google_sheets_url())
         self.sheets_id_input.setText(self.settings_manager.get_google_sheets_id())
         
+        source_index = self.case_source_combo.findData(self.settings_manager.get_case_source())
+        self.case_source_combo.setCurrentIndex(max(source_index, 0))
+        self.case_file_input.setText(self.settings_manager.get_case_file_path())
+        self.on_case_source_changed()
+        
         start_date = self.settings_manager.get_date_range_start()
         if start_date:
             self.start_datetime.setDateTime(QDateTime.fromSecsSinceEpoch(int(start_date.timestamp())))
@@ -323,9 +546,23 @@ class SettingsWindow(QDialog):
         try:
             timeout_ms = self.timeout_spinbox.value() * 1000
             self.settings_manager.set_browser_timeout(timeout_ms)
+            self.settings_manager.set_saved_session_enabled(self.saved_session_checkbox.isChecked())
+            self.settings_manager.set_headless_enabled(self.headless_checkbox.isChecked())
+            self.settings_manager.set_resource_profile(self.resource_profile_combo.currentData())
+            self.settings_manager.set_pacing_profile(self.pacing_profile_combo.currentData())
+            self.settings_manager.set_tab_workers(self.tab_workers_spinbox.value())
+            self.settings_manager.set_portal_rate_ceiling(self.rate_ceiling_spinbox.value())
+            self.settings_manager.set_search_cache_ttl_hours(self.search_cache_spinbox.value())
+            self.settings_manager.set_case_retries_enabled(self.case_retries_checkbox.isChecked())
+            self.settings_manager.set_process_workers(self.process_workers_spinbox.value())
+            self.settings_manager.set_automation_engine(self.engine_combo.currentData())
             
             self.settings_manager.set_screenshot_dir(self.screenshot_dir_input.text())
+            self.settings_manager.set_screenshot_format(self.screenshot_format_combo.currentData())
+            self.settings_manager.set_screenshot_dir_max_mb(self.screenshot_max_spinbox.value())
             self.settings_manager.set_downloads_dir(self.downloads_dir_input.text())
+            self.settings_manager.set_informe_cache_max_mb(self.informe_cache_spinbox.value())
+            self.settings_manager.set_informe_prefetch_depth(self.prefetch_depth_spinbox.value())
             self.settings_manager.set_logs_dir(self.logs_dir_input.text())
             
             start_enabled = self.start_enabled_checkbox.isChecked()
@@ -347,6 +584,13 @@ class SettingsWindow(QDialog):
             self.settings_manager.set_google_sheets_url(self.sheets_url_input.text())
             self.settings_manager.set_google_sheets_id(self.sheets_id_input.text())
             
+            case_source = self.case_source_combo.currentData()
+            if case_source == CASE_SOURCE_FILE and not self.case_file_input.text():
+                QMessageBox.warning(self, "Configuración", "Seleccione el archivo local de casos.")
+                return
+            self.settings_manager.set_case_source(case_source)
+            self.settings_manager.set_case_file_path(self.case_file_input.text())
+            
             if self.settings_manager.save_settings():
                 QMessageBox.information(self, "Configuración", 
                                       "Configuración guardada exitosamente.\n\nLos cambios se aplicarán inmediatamente.")
@@ -364,8 +608,22 @@ class SettingsWindow(QDialog):
         
         if reply == QMessageBox.StandardButton.Yes:
             self.timeout_spinbox.setValue(30)  # Default 30 seconds
+            self.saved_session_checkbox.setChecked(SAVED_SESSION_ENABLED)
+            self.headless_checkbox.setChecked(HEADLESS)
+            self.resource_profile_combo.setCurrentIndex(self.resource_profile_combo.findData(RESOURCE_PROFILE))
+            self.pacing_profile_combo.setCurrentIndex(self.pacing_profile_combo.findData(PACING_PROFILE))
+            self.tab_workers_spinbox.setValue(TAB_WORKERS)
+            self.rate_ceiling_spinbox.setValue(PORTAL_RATE_CEILING)
+            self.search_cache_spinbox.setValue(SEARCH_CACHE_TTL_HOURS)
+            self.case_retries_checkbox.setChecked(CASE_RETRIES_ENABLED)
+            self.process_workers_spinbox.setValue(PROCESS_WORKERS)
+            self.engine_combo.setCurrentIndex(self.engine_combo.findData(AUTOMATION_ENGINE))
             self.screenshot_dir_input.setText("screenshots")
+            self.screenshot_format_combo.setCurrentIndex(self.screenshot_format_combo.findData(SCREENSHOT_FORMAT))
+            self.screenshot_max_spinbox.setValue(SCREENSHOT_DIR_MAX_MB)
             self.downloads_dir_input.setText("downloads")
+            self.informe_cache_spinbox.setValue(INFORME_CACHE_MAX_MB)
+            self.prefetch_depth_spinbox.setValue(INFORME_PREFETCH_DEPTH)
             self.logs_dir_input.setText("logs")
             
             self.start_enabled_checkbox.setChecked(True)
@@ -380,6 +638,9 @@ class SettingsWindow(QDialog):
             self.worksheet_name_input.setText("prestaciones_PAMI")
             self.sheets_url_input.setText("https://docs.google.com/spreadsheets/d/16r7nB5lPMLEmTEk7Np0knv-AUvBVIktdjA36Ya96JAk/edit?gid=438980283#gid=438980283&fvid=86172977")
             self.sheets_id_input.setText("16r7nB5lPMLEmTEk7Np0knv-AUvBVIktdjA36Ya96JAk")
+            
+            self.case_source_combo.setCurrentIndex(self.case_source_combo.findData(CASE_SOURCE_GOOGLE_SHEETS))
+            self.case_file_input.setText("")
 
     def browse_logs_dir(self):
         """Open folder dialog to select logs directory"""
@@ -420,4 +681,28 @@ class SettingsWindow(QDialog):
         )
         
         if file_path:
-            self.service_account_input.setText(file_path)
\ No newline at end of file
+            self.service_account_input.setText(file_path)
+
+    def on_case_source_changed(self):
+        """Enable the case file picker only for the local file source"""
+        is_file = self.case_source_combo.currentData() == CASE_SOURCE_FILE
+        self.case_file_input.setEnabled(is_file)
+        self.case_file_browse_btn.setEnabled(is_file)
+
+    def browse_case_file(self):
+        """Open file dialog to select the local case file"""
+        current_file = self.case_file_input.text()
+        if current_file and os.path.exists(current_file):
+            current_dir = os.path.dirname(current_file)
+        else:
+            current_dir = os.getcwd()
+        
+        file_path, _ = QFileDialog.getOpenFileName(
+            self,
+            "Seleccionar Archivo de Casos",
+            current_dir,
+            "Planillas (*.xlsx *.csv);;All Files (*)"
+        )
+        
+        if file_path:
+            self.case_file_input.setText(file_path)
\ No newline at end of file
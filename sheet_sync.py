@@ -0,0 +1,177 @@
+import hashlib
+import json
+import os
+import time
+from config import *
+from sheets_client import get_client_session
+from sheets_reader import sheet_identity
+
+DRIVE_FILES_URL = "https://www.googleapis.com/drive/v3/files"
+
+
+class SheetDeltaSync:
+    """Keeps a local copy of the projected sheet columns up to date between runs.
+
+    A persisted cursor records the sheet revision, the row count and one hash
+    per row. When the revision has not changed the cached copy is used as is.
+    Otherwise only the rows after the last synced row are fetched, starting
+    SHEETS_SYNC_REWIND_ROWS rows earlier so recent edits are picked up too.
+    A full resync happens when there is no usable cache, the header changed,
+    rows were deleted, too many rewound rows changed (rows were inserted or
+    sorted), or the last full sync is older than SHEETS_SYNC_FULL_EVERY_DAYS.
+    """
+
+    def __init__(self, sheet, reader, cache_file=SHEETS_SYNC_CACHE_FILE, logger=None):
+        self.sheet = sheet
+        self.reader = reader
+        self.cache_file = cache_file
+        self.logger = logger
+
+        self.state = None
+        self.dirty = False
+        self.last_sync_mode = None
+        self.rows_fetched = 0
+
+    def log(self, level, message):
+        if self.logger:
+            getattr(self.logger, level)(message)
+
+    @staticmethod
+    def row_hash(values):
+        return hashlib.sha1("\x1f".join(str(value) for value in values).encode("utf-8")).hexdigest()[:16]
+
+    def hash_rows(self, columns, start=0, end=None):
+        names = list(columns.keys())
+        if end is None:
+            end = len(columns[names[0]]) if names else 0
+        return [self.row_hash([columns[name][index] for name in names]) for index in range(start, end)]
+
+    def fetch_revision(self):
+        """Return the Drive revision number of the spreadsheet, or None if it cannot be read"""
+        try:
+            session = get_client_session(self.sheet.client)
+            response = session.get(
+                f"{DRIVE_FILES_URL}/{self.sheet.spreadsheet.id}",
+                params={'fields': 'version,modifiedTime', 'supportsAllDrives': 'true'},
+                timeout=30,
+            )
+            response.raise_for_status()
+            return str(response.json().get('version'))
+        except Exception as e:
+            self.log("warning", f"No se pudo obtener la revisión de Google Sheets: {str(e)}")
+            return None
+
+    def load_cache(self):
+        if not os.path.exists(self.cache_file):
+            return None
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            self.log("warning", f"Caché local de la hoja ilegible, se hará lectura completa: {str(e)}")
+            return None
+
+    def save(self):
+        if not self.state:
+            return
+        try:
+            tmp_file = f"{self.cache_file}.tmp"
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(self.state, f)
+            os.replace(tmp_file, self.cache_file)
+            self.dirty = False
+        except Exception as e:
+            self.log("error", f"No se pudo guardar la caché local de la hoja: {str(e)}")
+
+    def read(self, header_row):
+        """Return {column: [values]} for the projected columns, fetching as little as possible"""
+        revision = self.fetch_revision()
+        cache = self.load_cache()
+
+        if not cache or cache.get('sheet') != sheet_identity(self.sheet) or cache.get('header') != header_row:
+            return self.full_sync(header_row, revision, "sin caché válida o encabezado modificado")
+
+        if time.time() - cache.get('full_synced_at', 0) > SHEETS_SYNC_FULL_EVERY_DAYS * 86400:
+            return self.full_sync(header_row, revision, "resincronización periódica")
+
+        if revision is not None and revision == cache.get('revision'):
+            self.state = cache
+            self.last_sync_mode = "cache"
+            self.rows_fetched = 0
+            self.log("info", f"Hoja sin cambios desde la última ejecución (revisión {revision}) - Usando caché local de {cache['row_count']} filas")
+            return cache['columns']
+
+        return self.delta_sync(header_row, revision, cache)
+
+    def full_sync(self, header_row, revision, reason):
+        self.log("info", f"Lectura completa de la hoja ({reason})")
+        _, columns = self.reader.read(header_row)
+        row_count = len(next(iter(columns.values()), []))
+        now = time.time()
+        self.state = {
+            'sheet': sheet_identity(self.sheet),
+            'header': header_row,
+            'revision': revision,
+            'synced_at': now,
+            'full_synced_at': now,
+            'row_count': row_count,
+            'row_hashes': self.hash_rows(columns),
+            'columns': columns,
+        }
+        self.last_sync_mode = "full"
+        self.rows_fetched = row_count
+        self.save()
+        return columns
+
+    def delta_sync(self, header_row, revision, cache):
+        cached_count = cache['row_count']
+        first_row = max(2, cached_count + 2 - SHEETS_SYNC_REWIND_ROWS)
+        first_index = first_row - 2
+
+        _, delta = self.reader.read(header_row, first_row=first_row)
+        delta_count = len(next(iter(delta.values()), []))
+        new_count = first_index + delta_count
+
+        if new_count < cached_count:
+            return self.full_sync(header_row, revision, "se eliminaron filas")
+
+        new_hashes = self.hash_rows(delta)
+        overlap = cached_count - first_index
+        changed = sum(
+            1 for offset in range(overlap)
+            if new_hashes[offset] != cache['row_hashes'][first_index + offset]
+        )
+        if overlap and changed > overlap * SHEETS_SYNC_MAX_CHANGED_RATIO:
+            return self.full_sync(header_row, revision, f"{changed} de {overlap} filas recientes cambiaron")
+
+        columns = cache['columns']
+        for name, values in delta.items():
+            columns[name][first_index:] = values
+        cache['row_hashes'][first_index:] = new_hashes
+        cache['row_count'] = new_count
+        cache['revision'] = revision
+        cache['synced_at'] = time.time()
+
+        self.state = cache
+        self.last_sync_mode = "delta"
+        self.rows_fetched = delta_count
+        self.save()
+
+        self.log("info", f"Sincronización incremental: {new_count - cached_count} filas nuevas, {changed} filas modificadas, {delta_count} filas leídas de {new_count}")
+        return columns
+
+    def record_write(self, sheet_row, column, value):
+        """Apply one of our own writes to the cached copy so the next run does not need to re-read it"""
+        if not self.state or column not in self.state['columns']:
+            return
+        index = sheet_row - 2
+        if index < 0 or index >= self.state['row_count']:
+            return
+        columns = self.state['columns']
+        columns[column][index] = value
+        self.state['row_hashes'][index] = self.row_hash([columns[name][index] for name in columns])
+        self.dirty = True
+
+    def close(self):
+        if self.dirty:
+            self.save()
@@ -0,0 +1,94 @@
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+import gspread
+from google.auth.transport.requests import Request
+from google.oauth2.service_account import Credentials
+from requests.adapters import HTTPAdapter
+from config import *
+
+SCOPES = ['https://spreadsheets.google.com/feeds',
+          'https://www.googleapis.com/auth/drive']
+
+_lock = threading.RLock()
+_clients = {}
+_worksheets = {}
+
+
+def get_client_session(client):
+    """Return the authorized requests session behind a gspread client (gspread 5 and 6)"""
+    http_client = getattr(client, 'http_client', None)
+    if http_client is not None and hasattr(http_client, 'session'):
+        return http_client.session
+    return getattr(client, 'session', None)
+
+
+def configure_session_pool(client, pool_size):
+    """Mount a connection pool big enough for pool_size concurrent requests on the client session"""
+    session = get_client_session(client)
+    if session is None:
+        return None
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    return session
+
+
+def refresh_if_expiring(creds, margin=SHEETS_TOKEN_REFRESH_MARGIN):
+    """Refresh the access token if it is missing or expires within margin seconds"""
+    expiry = creds.expiry
+    if expiry and expiry.tzinfo is None:
+        # google-auth keeps expiry as a naive UTC datetime
+        expiry = expiry.replace(tzinfo=timezone.utc)
+    if creds.token and expiry and expiry - datetime.now(timezone.utc) > timedelta(seconds=margin):
+        return False
+    creds.refresh(Request())
+    return True
+
+
+def get_client(service_account_file):
+    """Return the process-wide authorized gspread client for a service account file.
+
+    The client (and with it the authorized session and its connection pool) is
+    created once per credentials file and reused; the token is refreshed ahead
+    of expiry on every call. Editing the credentials file invalidates the cache.
+    """
+    path = os.path.abspath(service_account_file)
+    mtime = os.path.getmtime(path)
+
+    with _lock:
+        cached = _clients.get(path)
+        if cached is None or cached['mtime'] != mtime:
+            creds = Credentials.from_service_account_file(path, scopes=SCOPES)
+            client = gspread.authorize(creds)
+            configure_session_pool(client, SHEETS_READ_MAX_WORKERS)
+            cached = {'mtime': mtime, 'creds': creds, 'client': client}
+            _clients[path] = cached
+            for key in [key for key in _worksheets if key[0] == path]:
+                del _worksheets[key]
+
+        refresh_if_expiring(cached['creds'])
+        return cached['client']
+
+
+def get_worksheet(service_account_file, sheets_id, worksheet_name):
+    """Return a memoized worksheet handle, refreshed with one metadata call instead of reopening the spreadsheet"""
+    client = get_client(service_account_file)
+    key = (os.path.abspath(service_account_file), sheets_id, worksheet_name)
+
+    with _lock:
+        worksheet = _worksheets.get(key)
+        if worksheet is None:
+            worksheet = client.open_by_key(sheets_id).worksheet(worksheet_name)
+            _worksheets[key] = worksheet
+            return worksheet
+
+    worksheet = worksheet.spreadsheet.get_worksheet_by_id(worksheet.id)
+    with _lock:
+        _worksheets[key] = worksheet
+    return worksheet
+
+
+def clear_cache():
+    with _lock:
+        _clients.clear()
+        _worksheets.clear()
@@ -0,0 +1,100 @@
+from concurrent.futures import ThreadPoolExecutor
+from config import *
+
+
+def sheet_identity(sheet):
+    """Identify a worksheet so cached or queued state is never applied to another sheet"""
+    spreadsheet_id = getattr(getattr(sheet, 'spreadsheet', None), 'id', None)
+    return {'spreadsheet_id': spreadsheet_id, 'worksheet': getattr(sheet, 'title', None)}
+
+
+class ProjectedSheetReader:
+    """Reads only the needed columns of a worksheet.
+
+    Each row chunk is fetched with a single values batch_get carrying one
+    range per projected column, and chunks are fetched concurrently over the
+    client's pooled session (see sheets_client) when the sheet is large.
+    """
+
+    def __init__(self, sheet, columns=SHEETS_READ_COLUMNS, chunk_rows=SHEETS_READ_CHUNK_ROWS,
+                 max_workers=SHEETS_READ_MAX_WORKERS, logger=None):
+        self.sheet = sheet
+        self.columns = list(columns)
+        self.chunk_rows = chunk_rows
+        self.max_workers = max_workers
+        self.logger = logger
+
+    def log(self, level, message):
+        if self.logger:
+            getattr(self.logger, level)(message)
+
+    def read_header(self):
+        return list(self.sheet.row_values(1))
+
+    def chunk_bounds(self, last_row, first_row=2):
+        """Split sheet rows first_row..last_row into (start, end) chunks"""
+        bounds = []
+        start = first_row
+        while start <= last_row:
+            end = min(start + self.chunk_rows - 1, last_row)
+            bounds.append((start, end))
+            start = end + 1
+        return bounds
+
+    def fetch_chunk(self, column_positions, start, end):
+        """Fetch rows start..end for every projected column; returns {name: [values]}"""
+        names = list(column_positions.keys())
+        ranges = [
+            f"{column_number_to_letter(column_positions[name])}{start}:{column_number_to_letter(column_positions[name])}{end}"
+            for name in names
+        ]
+        value_ranges = self.sheet.batch_get(ranges, major_dimension='COLUMNS')
+
+        size = end - start + 1
+        chunk = {}
+        for name, value_range in zip(names, value_ranges):
+            values = list(value_range[0]) if value_range and len(value_range) > 0 else []
+            chunk[name] = values + [''] * (size - len(values))
+        return chunk
+
+    def read(self, header_row=None, last_row=None, first_row=2):
+        """Return (header_row, {column: [values]}) for the projected columns.
+
+        Values start at sheet row first_row. Trailing rows that are empty in
+        every projected column are dropped.
+        """
+        if header_row is None:
+            header_row = self.read_header()
+        if last_row is None:
+            last_row = self.sheet.row_count
+
+        column_positions = {}
+        for name in self.columns:
+            if name in header_row:
+                column_positions[name] = header_row.index(name) + 1
+            else:
+                self.log("warning", f"Columna '{name}' no encontrada en Google Sheets")
+
+        columns = {name: [] for name in column_positions}
+        if not column_positions or last_row < first_row:
+            return header_row, columns
+
+        bounds = self.chunk_bounds(last_row, first_row)
+        if len(bounds) > 1 and self.max_workers > 1:
+            self.log("info", f"Leyendo {len(column_positions)} columnas en {len(bounds)} bloques en paralelo")
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                chunks = list(executor.map(lambda b: self.fetch_chunk(column_positions, *b), bounds))
+        else:
+            chunks = [self.fetch_chunk(column_positions, *b) for b in bounds]
+
+        for chunk in chunks:
+            for name in columns:
+                columns[name].extend(chunk[name])
+
+        row_count = len(next(iter(columns.values())))
+        while row_count > 0 and all(columns[name][row_count - 1] == '' for name in columns):
+            row_count -= 1
+        for name in columns:
+            del columns[name][row_count:]
+
+        return header_row, columns
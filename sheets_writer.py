@@ -0,0 +1,253 @@
+import json
+import os
+import random
+import threading
+import time
+from config import *
+from sheets_reader import sheet_identity
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class SheetsWriteBehind:
+    """Background writer for Google Sheets cell updates.
+
+    Pending writes are merged per cell (the last value wins), persisted to a
+    local JSON file so they survive a crash, and flushed with one batch_update
+    per batch. Quota (429) and server (5xx) errors are retried with exponential
+    backoff; anything still pending when the writer stops stays in the file and
+    is replayed on the next run.
+    """
+
+    def __init__(self, sheet, queue_file=SHEETS_WRITE_QUEUE_FILE, logger=None,
+                 batch_size=SHEETS_WRITE_BATCH_SIZE, flush_interval=SHEETS_WRITE_FLUSH_INTERVAL,
+                 on_written=None):
+        self.sheet = sheet
+        self.on_written = on_written
+        self.queue_file = queue_file
+        self.logger = logger
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        self.pending = {}
+        self.oldest_pending = time.monotonic()
+        self.condition = threading.Condition()
+        self.flush_requested = False
+        self.draining = 0
+        self.stopping = False
+        self.writing = False
+        self.thread = None
+
+        self.written_count = 0
+        self.retry_count = 0
+
+    def log(self, level, message):
+        if self.logger:
+            getattr(self.logger, level)(message)
+
+    def load_pending(self, row_index=None):
+        """Load writes left over by a previous run, remapping rows through (NDO, COD) keys"""
+        if not os.path.exists(self.queue_file):
+            return 0
+
+        try:
+            with open(self.queue_file, 'r') as f:
+                stored = json.load(f)
+        except Exception as e:
+            self.log("error", f"No se pudo leer la cola de escrituras pendientes: {str(e)}")
+            return 0
+
+        if stored.get('sheet') != sheet_identity(self.sheet):
+            self.log("warning", "La cola de escrituras pendientes pertenece a otra hoja - Se ignora")
+            return 0
+
+        loaded = 0
+        with self.condition:
+            for entry in stored.get('entries', []):
+                row = entry['row']
+                key = tuple(entry['key']) if entry.get('key') else None
+                if row_index is not None and key is not None:
+                    row = row_index.get(key)
+                    if row is None:
+                        self.log("warning", f"Escritura pendiente para NDO {key[0]} COD {key[1]} descartada: fila no encontrada")
+                        continue
+                self.pending[(row, entry['col'])] = {'value': entry['value'], 'key': key}
+                loaded += 1
+            self.save_pending()
+
+        if loaded:
+            self.log("info", f"{loaded} escrituras pendientes recuperadas de la ejecución anterior")
+        return loaded
+
+    def save_pending(self):
+        """Persist the pending queue atomically. Caller must hold the condition lock."""
+        entries = [
+            {'row': row, 'col': col, 'value': item['value'], 'key': list(item['key']) if item['key'] else None}
+            for (row, col), item in sorted(self.pending.items())
+        ]
+        try:
+            if not entries:
+                if os.path.exists(self.queue_file):
+                    os.remove(self.queue_file)
+                return
+            tmp_file = f"{self.queue_file}.tmp"
+            with open(tmp_file, 'w') as f:
+                json.dump({'sheet': sheet_identity(self.sheet), 'entries': entries}, f)
+            os.replace(tmp_file, self.queue_file)
+        except Exception as e:
+            self.log("error", f"No se pudo guardar la cola de escrituras pendientes: {str(e)}")
+
+    def pending_values(self, col):
+        """Return {row: value} of the pending writes for one column"""
+        with self.condition:
+            return {row: item['value'] for (row, c), item in self.pending.items() if c == col}
+
+    def enqueue(self, row, col, value, key=None):
+        with self.condition:
+            if not self.pending:
+                self.oldest_pending = time.monotonic()
+            self.pending[(row, col)] = {'value': value, 'key': key}
+            self.save_pending()
+            if len(self.pending) >= self.batch_size:
+                self.condition.notify_all()
+
+    def start(self):
+        if self.thread and self.thread.is_alive():
+            return
+        self.stopping = False
+        self.thread = threading.Thread(target=self.run, name="sheets-writer", daemon=True)
+        self.thread.start()
+
+    def request_flush(self):
+        """Ask the worker to write everything pending now, without waiting"""
+        with self.condition:
+            self.flush_requested = True
+            self.condition.notify_all()
+
+    def flush(self, timeout=SHEETS_WRITE_STOP_TIMEOUT):
+        """Write everything pending and wait until done. Returns True if the queue drained.
+
+        A worker sleeping through a retry backoff is woken up to write now.
+        """
+        if not self.thread or not self.thread.is_alive():
+            return self.write_pending()
+
+        deadline = time.monotonic() + timeout
+        with self.condition:
+            self.flush_requested = True
+            self.draining += 1
+            self.condition.notify_all()
+            try:
+                while self.pending or self.writing:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self.condition.wait(remaining)
+                return not self.pending
+            finally:
+                self.draining -= 1
+
+    def write_pending(self):
+        """Write the queue on the caller's thread, in the worker's batch sizes; False on the first failed batch"""
+        while True:
+            with self.condition:
+                if not self.pending:
+                    return True
+                cells = list(self.pending.keys())[:SHEETS_WRITE_MAX_BATCH]
+                self.writing = True
+            try:
+                success = self.write_batch(cells)
+            finally:
+                with self.condition:
+                    self.writing = False
+                    self.condition.notify_all()
+            if not success:
+                return False
+
+    def stop(self, timeout=SHEETS_WRITE_STOP_TIMEOUT):
+        drained = self.flush(timeout)
+        with self.condition:
+            self.stopping = True
+            self.condition.notify_all()
+        if self.thread:
+            self.thread.join(timeout=5)
+            self.thread = None
+        if not drained:
+            self.log("warning", f"{len(self.pending)} escrituras quedaron pendientes en {self.queue_file} - Se reintentarán en la próxima ejecución")
+        return drained
+
+    def run(self):
+        backoff = 0
+
+        while True:
+            with self.condition:
+                while not self.stopping:
+                    if not self.pending:
+                        self.flush_requested = False
+                        self.condition.wait()
+                        continue
+                    elapsed = time.monotonic() - self.oldest_pending
+                    if self.flush_requested or len(self.pending) >= self.batch_size or elapsed >= self.flush_interval:
+                        break
+                    self.condition.wait(timeout=self.flush_interval - elapsed)
+                if self.stopping:
+                    return
+                cells = list(self.pending.keys())[:SHEETS_WRITE_MAX_BATCH]
+                self.writing = True
+
+            success = self.write_batch(cells)
+
+            with self.condition:
+                self.writing = False
+                self.oldest_pending = time.monotonic()
+                self.condition.notify_all()
+
+            if success:
+                backoff = 0
+                continue
+
+            backoff = min(SHEETS_WRITE_MAX_BACKOFF, max(1, backoff * 2))
+            self.retry_count += 1
+            sleep_time = backoff + random.uniform(0, 1)
+            self.log("warning", f"Reintentando escritura en Google Sheets en {sleep_time:.1f} segundos")
+            with self.condition:
+                self.condition.wait_for(lambda: self.stopping or self.draining, timeout=sleep_time)
+                if self.stopping:
+                    return
+
+    def write_batch(self, cells):
+        with self.condition:
+            batch = {cell: dict(self.pending[cell]) for cell in cells if cell in self.pending}
+        if not batch:
+            return True
+
+        updates = [
+            {'range': f"{column_number_to_letter(col)}{row}", 'values': [[item['value']]]}
+            for (row, col), item in sorted(batch.items())
+        ]
+
+        try:
+            self.sheet.batch_update(updates, value_input_option='USER_ENTERED')
+        except Exception as e:
+            status_code = getattr(getattr(e, 'response', None), 'status_code', None)
+            if status_code in RETRYABLE_STATUS_CODES:
+                self.log("warning", f"Google Sheets respondió {status_code} - Escritura de {len(updates)} celdas en espera")
+            else:
+                self.log("error", f"Error escribiendo {len(updates)} celdas en Google Sheets: {str(e)}")
+            return False
+
+        with self.condition:
+            for cell, item in batch.items():
+                # only drop the cell if it was not overwritten while the batch was in flight
+                if self.pending.get(cell, {}).get('value') == item['value']:
+                    del self.pending[cell]
+            self.save_pending()
+        self.written_count += len(updates)
+        if self.on_written:
+            written_keys = [item['key'] for item in batch.values() if item['key']]
+            try:
+                self.on_written(written_keys)
+            except Exception as e:
+                self.log("error", f"Error registrando escrituras confirmadas: {str(e)}")
+        self.log("info", f"{len(updates)} estados escritos en Google Sheets en una sola operación")
+        return True
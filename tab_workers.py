@@ -0,0 +1,184 @@
+import queue
+import socket
+import threading
+import time
+from playwright.sync_api import sync_playwright
+from config import *
+
+
+def find_free_port():
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class TabWorkerPool:
+    """Processes cases on several OME tabs of the logged-in browser at the same time.
+
+    Playwright's sync API is bound to the thread that created it, so each tab
+    is driven by its own thread through its own Playwright connection to the
+    same Chromium (over the DevTools port opened by start_browser). The tabs
+    share one browser context that receives the session cookies of the
+    logged-in page, and open the same OME URL. Every tab has its own
+    BrowserAutomation (page, modal and dialog handling) while the cases,
+    grouped by NDO, come from one shared queue and results land in the main run's lists. All tabs pace
+    through the same Pacer, capped at PORTAL_RATE_CEILING actions per minute.
+    Failed cases go to the run's shared RetryScheduler; tabs pull the retries
+    whose backoff elapsed and only finish once none are waiting.
+    """
+
+    def __init__(self, automation, tab_count):
+        self.automation = automation
+        self.tab_count = tab_count
+        self.cases = queue.Queue()
+        self.settings_manager = automation.settings_manager
+        self.retry_scheduler = automation.retry_scheduler
+        self.session_lock = threading.Lock()
+
+    def log(self, level, message):
+        self.automation.log(level, message)
+
+    def run(self, case_groups):
+        if not self.automation.cdp_endpoint:
+            raise RuntimeError("El navegador no se inició con puerto de depuración para pestañas en paralelo")
+
+        rate_ceiling = self.settings_manager.get_portal_rate_ceiling() if self.settings_manager else PORTAL_RATE_CEILING
+        self.automation.pacer.limit_rate(rate_ceiling)
+
+        for group_number, cases in enumerate(case_groups):
+            self.cases.put((group_number, cases, False))
+
+        cookies = self.automation.new_page.context.cookies()
+        ome_url = self.automation.new_page.url
+        case_count = sum(len(cases) for cases in case_groups)
+        self.log("info", f"Procesando {case_count} casos ({len(case_groups)} NDO) en {self.tab_count} pestañas (máximo {self.automation.pacer.actions_per_minute} acciones por minuto)")
+
+        threads = [
+            threading.Thread(target=self.worker, args=(number, cookies, ome_url), name=f"tab-worker-{number}", daemon=True)
+            for number in range(1, self.tab_count + 1)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        if not self.cases.empty() and not self.automation.stop_requested:
+            self.log("warning", f"{self.cases.qsize()} NDO quedaron sin procesar - Se retomarán en la próxima ejecución")
+        if self.automation.stop_requested and self.retry_scheduler.pending():
+            self.log("info", f"Parada solicitada - {self.retry_scheduler.pending()} casos en espera de reintento quedan para la próxima ejecución")
+
+    def next_group(self):
+        """(group_number, cases, retried): queued NDOs first, then retries whose backoff elapsed.
+
+        While retries are still waiting the tab sleeps instead of finishing,
+        so the last tab left picks them up.
+        """
+        retries_enabled = self.automation.retries_enabled
+        while not self.automation.stop_requested:
+            if retries_enabled:
+                for group_number, cases in self.retry_scheduler.due():
+                    self.cases.put((group_number, cases, True))
+            try:
+                return self.cases.get_nowait()
+            except queue.Empty:
+                pass
+            if not retries_enabled or not self.retry_scheduler.pending():
+                return None
+            time.sleep(min(1.0, max(self.retry_scheduler.seconds_until_next(), 0.05)))
+        return None
+
+    def ensure_session(self, tab, page):
+        """Log in again on the shared context before a retry when the portal session expired"""
+        credentials = self.automation.credentials
+        with self.session_lock:
+            try:
+                if not credentials or tab.probe_session(page.context, page.url):
+                    return
+            except Exception as e:
+                self.log("warning", f"No se pudo verificar la sesión del portal antes de reintentar: {str(e)}")
+                return
+
+            self.log("warning", "La sesión del portal venció - Iniciando sesión nuevamente antes de reintentar")
+            extra_pages = [page.context.new_page()]
+            tab.page = extra_pages[0]
+            try:
+                tab.navigate_to_login()
+                tab.fill_login_form(*credentials)
+                tab.click_ome_button()
+                extra_pages.append(tab.new_page)
+                tab.unwatch_page(tab.new_page)
+                page.goto(tab.new_page.url)
+            finally:
+                tab.page = page
+                tab.new_page = page
+                for extra_page in extra_pages:
+                    try:
+                        extra_page.close()
+                    except Exception:
+                        pass
+            tab.click_panel_prestaciones()
+
+    def worker(self, number, cookies, ome_url):
+        playwright = sync_playwright().start()
+        page = None
+        tab = None
+        current = None
+        try:
+            browser = playwright.chromium.connect_over_cdp(self.automation.cdp_endpoint)
+            context = browser.contexts[0] if browser.contexts else browser.new_context()
+            context.add_cookies(cookies)
+            self.automation.resource_router.install(context)
+
+            page = context.new_page()
+            timeout = self.settings_manager.get_browser_timeout() if self.settings_manager else BROWSER_TIMEOUT
+            page.set_default_timeout(timeout)
+
+            tab = self.automation.create_tab_worker(page)
+            page.goto(ome_url)
+            tab.click_panel_prestaciones()
+            self.log("info", f"Pestaña {number}: lista")
+
+            first_case = True
+            while not self.automation.stop_requested:
+                current = self.next_group()
+                if current is None:
+                    break
+                group_number, cases, retried = current
+
+                if not first_case:
+                    delay = random_delay_long()
+                    self.log("info", f"Pestaña {number}: Esperando {delay:.1f} segundos antes del siguiente caso")
+                    if self.automation.stop_requested:
+                        self.cases.put(current)
+                        current = None
+                        break
+                first_case = False
+
+                if retried:
+                    self.log("info", f"Pestaña {number}: Reintentando NDO {cases[0][1].get('NDO')}")
+                    self.ensure_session(tab, page)
+                tab.process_patient(group_number, cases)
+                current = None
+
+            self.log("info", f"Pestaña {number}: sin más casos")
+        except Exception as e:
+            self.log("error", f"Pestaña {number}: Error - {str(e)}")
+            self.requeue_unfinished(number, tab, current)
+        finally:
+            if page:
+                try:
+                    page.close()
+                except Exception:
+                    pass
+            playwright.stop()
+
+    def requeue_unfinished(self, number, tab, current):
+        """Put back the cases of the group a failed tab had taken and not finished"""
+        if current is None:
+            return
+        group_number, cases, retried = current
+        finished = tab.finished_indices if tab else set()
+        remaining = [(index, row) for index, row in cases if index not in finished]
+        if remaining:
+            self.cases.put((group_number, remaining, retried))
+            self.log("warning", f"Pestaña {number}: {len(remaining)} casos del NDO en curso vuelven a la cola para las otras pestañas")
@@ -0,0 +1,45 @@
+from browser_automation import can_check_results, find_practica, match_practica, practica_code, stale_result_ids
+
+
+def table_row(data_id, practica):
+    return {'data_id': data_id, 'practica': practica}
+
+
+def test_practica_code_accepts_both_cell_formats():
+    assert practica_code('420101 - Ecografía') == '420101'
+    assert practica_code('420101 Ecografía') == '420101'
+    assert practica_code('') == ''
+
+
+def test_find_practica_skips_rows_matched_to_other_cases():
+    table_data = [table_row('1', '420101 - A'), table_row('2', '420101 - A'), table_row('3', '180104 - B')]
+
+    assert find_practica(table_data, 420101)['data_id'] == '1'
+    assert find_practica(table_data, 420101, {'1'})['data_id'] == '2'
+    assert find_practica(table_data, 420101, {'1', '2'}) is None
+
+
+def test_results_still_showing_the_previous_ndo_are_stale():
+    last_search = (10, {'1', '2'})
+
+    assert stale_result_ids(11, [table_row('1', ''), table_row('9', '')], last_search) == {'1'}
+    assert stale_result_ids(11, [table_row('8', ''), table_row('9', '')], last_search) == set()
+
+
+def test_searching_the_same_ndo_again_or_first_search_is_not_stale():
+    assert stale_result_ids(10, [table_row('1', '')], (10, {'1'})) == set()
+    assert stale_result_ids(10, [table_row('1', '')], None) == set()
+
+
+def test_match_practica_prefers_the_cached_row_while_it_keeps_the_cod():
+    table_data = [table_row('1', '420101 - A'), table_row('2', '420101 - A')]
+
+    assert match_practica(table_data, 420101, set(), '2')['data_id'] == '2'
+    assert match_practica(table_data, 420101, {'2'}, '2')['data_id'] == '1'
+    assert match_practica([table_row('2', '180104 - B')], 420101, set(), '2') is None
+
+
+def test_results_can_only_be_checked_after_searching_another_ndo():
+    assert can_check_results(11, (10, {'1'}))
+    assert not can_check_results(10, (10, {'1'}))
+    assert not can_check_results(10, None)
@@ -0,0 +1,74 @@
+from case_outcomes import (CaseOutcome, ROW_ALREADY_COMPLETED, ROW_NEEDS_UPLOAD, ROW_PROCESSED, UPLOAD_DONE,
+                           UPLOAD_NEEDED, UPLOAD_UNKNOWN, is_completed_row, ready_to_transmit, upload_state,
+                           validation_state)
+from config import BTN_PRIMARY_CLASS, BTN_SUCCESS_CLASS
+
+
+def button(css_class, visible=True):
+    return {'classes': f"btn {css_class}", 'visible': visible, 'background': ''}
+
+
+def test_validation_state_follows_the_button_colour():
+    assert validation_state({'validation_button': button(BTN_SUCCESS_CLASS)}) == ROW_PROCESSED
+    assert validation_state({'validation_button': button(BTN_PRIMARY_CLASS)}) == ROW_NEEDS_UPLOAD
+    assert validation_state({'validation_button': button('btn-secondary')}) == ROW_ALREADY_COMPLETED
+
+
+def test_missing_or_hidden_validation_button_means_completed():
+    assert validation_state({'validation_button': None}) == ROW_ALREADY_COMPLETED
+    assert validation_state({'validation_button': button(BTN_PRIMARY_CLASS, visible=False)}) == ROW_ALREADY_COMPLETED
+
+
+def test_only_a_visible_completed_button_settles_a_cached_row():
+    assert is_completed_row({'validation_button': button('btn-secondary')})
+    assert not is_completed_row({'validation_button': None})
+    assert not is_completed_row({'validation_button': button('btn-secondary', visible=False)})
+    assert not is_completed_row({'validation_button': button(BTN_PRIMARY_CLASS)})
+    assert not is_completed_row({'validation_button': button(BTN_SUCCESS_CLASS)})
+
+
+def test_upload_state_follows_the_button_colour():
+    assert upload_state({'upload_button': button(BTN_SUCCESS_CLASS)}) == UPLOAD_NEEDED
+    assert upload_state({'upload_button': button(BTN_PRIMARY_CLASS)}) == UPLOAD_DONE
+    assert upload_state({'upload_button': button('btn-secondary')}) == UPLOAD_UNKNOWN
+    assert upload_state({}) == UPLOAD_UNKNOWN
+
+
+def test_ready_to_transmit_needs_both_buttons_blue():
+    blue = button(BTN_PRIMARY_CLASS)
+
+    assert ready_to_transmit({'validation_button': blue, 'upload_button': blue})
+    assert not ready_to_transmit({'validation_button': blue, 'upload_button': button(BTN_SUCCESS_CLASS)})
+    assert not ready_to_transmit({'validation_button': blue})
+    assert not ready_to_transmit({})
+
+
+def test_outcomes_pair_the_report_row_with_the_procesado_value():
+    outcome = CaseOutcome(10, '420101', 3)
+
+    row_data, value = outcome.transmitted(already_uploaded=False)
+    assert value == 'Si'
+    assert (row_data['Status'], row_data['Resultados'], row_data['COD_Encontrado']) == \
+        ('Archivo subido y transmitido exitosamente - COD 420101', 3, '420101')
+
+    row_data, value = outcome.transmit_failed(already_uploaded=True, screenshot_path='shot.png')
+    assert value == 'No'
+    assert row_data['Upload_Status'] == 'Already uploaded, transmit failed'
+    assert row_data['Screenshot'] == 'shot.png'
+    assert row_data['Resultados_Tabla'] == 3
+
+
+def test_error_outcome_always_names_a_screenshot():
+    row_data, value = CaseOutcome(10).error(ValueError("boom"))
+
+    assert value == 'No'
+    assert (row_data['Status'], row_data['Error']) == ('Error al procesar NDO.', 'boom')
+    assert row_data['Screenshot'] == 'No se pudo tomar screenshot'
+    assert 'Screenshot' not in CaseOutcome(10, '1').upload_failed()[0]
+
+
+def test_cached_completion_is_labelled():
+    row_data, value = CaseOutcome(10, '420101', 2).already_completed(cached=True)
+
+    assert value == 'Si'
+    assert row_data['Button_Status'] == 'Already completed and accepted (cached search)'
@@ -0,0 +1,92 @@
+from datetime import datetime
+import pandas as pd
+from case_records import (CaseRecord, apply_date_range, classify_cases, group_cases_by_ndo,
+                          normalize_procesado, parse_fecha_turno, to_case_records)
+
+
+def sheet_frame():
+    return pd.DataFrame({
+        'NDO': [10, 11, 12, 13, 14],
+        'CODIGO_PAMI': [420101, 420102, 180104, 340201, 340301],
+        'FechaTurno': ['2025-06-01 08:00:00', '2025-06-15 09:30:00', '2025-06-30 18:00:00',
+                       '2025-07-01 00:00:00', 'sin fecha'],
+        'Procesado': ['Si', '', None, 'No', '0'],
+        'APE': ['A', 'B', 'C', 'D', 'E'],
+        'NOM': ['a', 'b', 'c', 'd', 'e'],
+    })
+
+
+def test_case_record_behaves_like_a_read_only_dict():
+    record = CaseRecord({'NDO': 0, 'CODIGO_PAMI': 1}, (10, 420101))
+
+    assert record['NDO'] == 10
+    assert record.get('CODIGO_PAMI') == 420101
+    assert record.get('APE', '') == ''
+    assert 'NDO' in record and 'APE' not in record
+    assert list(record.keys()) == ['NDO', 'CODIGO_PAMI']
+    assert record.to_dict() == {'NDO': 10, 'CODIGO_PAMI': 420101}
+
+
+def test_to_case_records_shares_one_position_map():
+    records = to_case_records(pd.DataFrame({'NDO': [1, 2], 'COD': ['a', 'b']}))
+
+    assert [record.to_dict() for record in records] == [{'NDO': 1, 'COD': 'a'}, {'NDO': 2, 'COD': 'b'}]
+    assert records[0].positions is records[1].positions
+
+
+def test_fecha_turno_format_is_inferred_like_the_original_read():
+    parsed = parse_fecha_turno(pd.Series(['05/06/2025', '07/06/2025']))
+
+    assert parsed.tolist() == [pd.Timestamp(2025, 5, 6), pd.Timestamp(2025, 7, 6)]
+
+
+def test_explicit_fecha_turno_formats_are_tried_in_order():
+    parsed = parse_fecha_turno(pd.Series(['05/06/2025', '2025-06-07 10:00', 'mañana']),
+                               formats=['%d/%m/%Y', '%Y-%m-%d %H:%M'])
+
+    assert parsed[0] == pd.Timestamp(2025, 6, 5)
+    assert parsed[1] == pd.Timestamp(2025, 6, 7, 10, 0)
+    assert pd.isna(parsed[2])
+
+
+def test_blank_and_zero_procesado_mean_no():
+    normalized = normalize_procesado(pd.Series(['Si', '', None, '0', 'No', 'Revisar']))
+
+    assert list(normalized) == ['Si', 'No', 'No', 'No', 'No', 'Revisar']
+    assert list(normalized.categories[:2]) == ['No', 'Si']
+
+
+def test_date_range_end_at_midnight_includes_the_whole_day():
+    filtered = apply_date_range(sheet_frame(), datetime(2025, 6, 15), datetime(2025, 6, 30))
+
+    assert filtered['NDO'].tolist() == [11, 12]
+
+
+def test_unparseable_dates_are_dropped_by_the_date_range():
+    filtered = apply_date_range(sheet_frame(), datetime(2025, 1, 1), None)
+
+    assert 14 not in filtered['NDO'].tolist()
+    assert len(filtered) == 4
+
+
+def test_classify_cases_splits_pending_and_already_processed():
+    df, pending, processed = classify_cases(sheet_frame(), timestamp='2025-07-02 10:00:00')
+
+    assert len(df) == 5
+    assert [record['NDO'] for record in pending] == [11, 12, 13, 14]
+    assert processed == [{'NDO': 10, 'COD': 420101, 'Status': 'Ya procesado anteriormente',
+                          'Timestamp': '2025-07-02 10:00:00', 'APE': 'A', 'NOM': 'a'}]
+
+
+def test_classify_cases_without_procesado_column_treats_all_as_pending():
+    _, pending, processed = classify_cases(sheet_frame().drop(columns=['Procesado']))
+
+    assert len(pending) == 5
+    assert processed == []
+
+
+def test_group_cases_by_ndo_keeps_first_appearance_order():
+    cases = [{'NDO': 7}, {'NDO': 3}, {'NDO': 7}, {}]
+    groups = group_cases_by_ndo(cases)
+
+    assert [[index for index, _ in group] for group in groups] == [[0, 2], [1], [3]]
@@ -0,0 +1,30 @@
+import os
+import time
+from case_source import FileCaseSource
+
+
+def test_failing_on_written_callback_does_not_stop_the_file_writer(tmp_path):
+    path = os.path.join(tmp_path, "casos.csv")
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write("NDO,CODIGO_PAMI,Procesado\n10,420101,\n11,420102,\n")
+    written = []
+
+    def on_written(keys):
+        written.append(keys)
+        raise RuntimeError("store cerrado")
+
+    source = FileCaseSource(path)
+    source.start_writeback({}, on_written=on_written)
+    source.write_status(2, 'Si', key=('10', '420101'))
+    source.request_flush()
+    deadline = time.monotonic() + 2
+    while not written and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    assert source.thread.is_alive()
+    source.write_status(3, 'No', key=('11', '420102'))
+    source.close()
+
+    _, columns = source.read()
+    assert columns['Procesado'] == ['Si', 'No']
+    assert written == [[('10', '420101')], [('11', '420102')]]
@@ -0,0 +1,105 @@
+import os
+import pytest
+from case_store import CaseStore
+
+
+def case(ndo, cod, sheet_row):
+    return {'NDO': ndo, 'CODIGO_PAMI': cod, '_original_sheet_row': sheet_row}
+
+
+@pytest.fixture
+def store(tmp_path):
+    case_store = CaseStore(os.path.join(tmp_path, "case_state.db"))
+    yield case_store
+    case_store.close()
+
+
+def test_queued_cases_are_unfinished_in_sheet_order(store):
+    store.queue_cases([case(2, 'b', 5), case(1, 'a', 3)])
+
+    assert store.has_unfinished_cases()
+    assert [row['NDO'] for row in store.unfinished_cases()] == [1, 2]
+
+
+def test_finished_cases_are_not_resumed_and_wait_for_sync(store):
+    store.queue_cases([case(1, 'a', 2), case(2, 'b', 3)])
+    store.start_attempt(('1', 'a'))
+    store.finish(('1', 'a'), 'Si')
+
+    assert [row['NDO'] for row in store.unfinished_cases()] == [2]
+    assert store.unsynced_outcomes() == [(('1', 'a'), 2, 'Si')]
+
+    store.mark_synced([('1', 'a')])
+    assert store.unsynced_outcomes() == []
+
+
+def test_requeue_keeps_attempts_and_clears_outcome(store):
+    store.queue_cases([case(1, 'a', 2)])
+    store.start_attempt(('1', 'a'))
+    store.set_stage(('1', 'a'), 'matched', data_id='77')
+    store.finish(('1', 'a'), 'No')
+
+    store.queue_cases([case(1, 'a', 4)])
+
+    row = store.connection.execute("SELECT * FROM cases").fetchone()
+    assert (row['stage'], row['outcome'], row['attempts'], row['data_id'], row['sheet_row']) == \
+        ('pending', None, 1, '77', 4)
+    assert store.has_unfinished_cases()
+
+
+def test_cases_missing_from_the_latest_read_are_retired(store):
+    store.queue_cases([case(1, 'a', 2), case(2, 'b', 3)])
+    store.queue_cases([case(2, 'b', 2)])
+
+    assert [row['NDO'] for row in store.unfinished_cases()] == [2]
+    assert store.stage(('1', 'a')) == 'retired'
+
+    store.queue_cases([])
+    assert not store.has_unfinished_cases()
+
+
+def test_retired_case_comes_back_when_queued_again(store):
+    store.queue_cases([case(1, 'a', 2)])
+    store.queue_cases([])
+    store.queue_cases([case(1, 'a', 2)])
+
+    assert store.stage(('1', 'a')) == 'pending'
+    assert store.has_unfinished_cases()
+
+
+def test_finished_cases_are_not_retired(store):
+    store.queue_cases([case(1, 'a', 2)])
+    store.finish(('1', 'a'), 'Si')
+    store.queue_cases([])
+
+    assert store.stage(('1', 'a')) == 'finished'
+    assert store.unsynced_outcomes() == [(('1', 'a'), 2, 'Si')]
+
+
+def test_forget_attempt_undoes_an_interrupted_start(store):
+    store.queue_cases([case(1, 'a', 2)])
+    store.start_attempt(('1', 'a'))
+    store.forget_attempt(('1', 'a'))
+
+    row = store.connection.execute("SELECT stage, attempts FROM cases").fetchone()
+    assert (row['stage'], row['attempts']) == ('pending', 0)
+
+
+def test_meta_round_trip(store):
+    store.set_meta('sheet', {'identity': {'file': 'casos.xlsx'}, 'column_positions': {'NDO': 1}})
+
+    assert store.get_meta('sheet')['column_positions'] == {'NDO': 1}
+    assert store.get_meta('missing', 'default') == 'default'
+
+
+def test_search_cache_expires_and_invalidates(store):
+    store.save_search(10, [{'data_id': '1', 'practica': '420101'}])
+
+    rows, age = store.cached_search(10, ttl_seconds=60)
+    assert rows == [{'data_id': '1', 'practica': '420101'}]
+    assert age >= 0
+    assert store.cached_search(10, ttl_seconds=-1) is None
+
+    store.invalidate_search(10)
+    assert store.cached_search(10, ttl_seconds=60) is None
+    assert store.search_stats == {'hits': 1, 'misses': 2, 'invalidated': 1, 'resolved': 0}
@@ -0,0 +1,80 @@
+import hashlib
+import json
+import os
+import threading
+import informe_cache
+from informe_cache import InformeCache, InformePrefetcher
+
+
+class FakeDownloader:
+    """Writes the URL's text as the PDF content; blocks while `gate` is clear"""
+
+    def __init__(self):
+        self.calls = []
+        self.gate = threading.Event()
+        self.gate.set()
+
+    def download(self, url, downloads_dir):
+        self.gate.wait(5)
+        self.calls.append(url)
+        content = url.encode()
+        temp_path = os.path.join(downloads_dir, f"{len(self.calls)}.part")
+        with open(temp_path, 'wb') as f:
+            f.write(content)
+        return temp_path, hashlib.sha256(content).hexdigest(), len(content)
+
+    def report(self):
+        return []
+
+
+def make_cache(tmp_path, **kwargs):
+    return InformeCache(str(tmp_path), downloader=FakeDownloader(), **kwargs)
+
+
+def test_indexed_url_is_served_from_the_cache_until_it_expires(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(informe_cache.time, 'time', lambda: now[0])
+    cache = make_cache(tmp_path, index_ttl=60)
+
+    path = cache.fetch('http://informes/1')
+    assert cache.fetch('http://informes/1') == path
+    assert cache.downloader.calls == ['http://informes/1']
+
+    now[0] += 61
+    assert cache.fetch('http://informes/1') == path
+    assert cache.downloader.calls == ['http://informes/1', 'http://informes/1']
+    assert cache.expired == 1
+
+
+def test_index_entries_of_older_versions_are_downloaded_again(tmp_path):
+    cache = make_cache(tmp_path)
+    path = cache.fetch('http://informes/1')
+    with open(cache.index_path, 'r', encoding='utf-8') as f:
+        index = json.load(f)
+    index['urls'] = {url: entry['digest'] for url, entry in index['urls'].items()}
+    with open(cache.index_path, 'w', encoding='utf-8') as f:
+        json.dump(index, f)
+
+    reopened = make_cache(tmp_path)
+    assert reopened.fetch('http://informes/1') == path
+    assert reopened.downloader.calls == ['http://informes/1']
+
+
+def test_release_unpins_a_prefetch_that_was_never_used(tmp_path):
+    cache = make_cache(tmp_path)
+    cache.downloader.gate.clear()
+    prefetcher = InformePrefetcher(cache, depth=1)
+
+    prefetcher.prefetch('http://informes/1')
+    prefetcher.prefetch('http://informes/2')
+    assert set(cache.pinned) == {'http://informes/1', 'http://informes/2'}
+
+    prefetcher.release('http://informes/2')
+    prefetcher.release('http://informes/3')
+    assert set(cache.pinned) == {'http://informes/1'}
+    assert 'http://informes/2' not in prefetcher.pending
+
+    cache.downloader.gate.set()
+    prefetcher.get('http://informes/1')
+    assert cache.pinned == {}
+    prefetcher.shutdown()
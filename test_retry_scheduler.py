@@ -0,0 +1,89 @@
+import retry_scheduler
+from config import (ERROR_CLASS_PERMANENT, ERROR_CLASS_PORTAL_STATE, ERROR_CLASS_TRANSIENT,
+                    RETRY_BACKOFF_MAX)
+from retry_scheduler import RetryScheduler, classify_failure
+
+NO_WAIT = {ERROR_CLASS_TRANSIENT: 0, ERROR_CLASS_PORTAL_STATE: 0, ERROR_CLASS_PERMANENT: 0}
+
+
+def transient_failure():
+    return {'Status': 'Error al procesar NDO.', 'Error': 'Timeout 30000ms exceeded'}
+
+
+def test_permanent_status_wins_over_exception_text():
+    failure = {'Status': 'COD 420101 no encontrado en la tabla', 'Error': 'Timeout 30000ms exceeded'}
+
+    assert classify_failure(failure) == ERROR_CLASS_PERMANENT
+
+
+def test_network_and_timeout_errors_are_transient():
+    assert classify_failure(transient_failure()) == ERROR_CLASS_TRANSIENT
+    assert classify_failure({'Status': 'Error al procesar NDO.', 'Error': 'net::ERR_CONNECTION_RESET'}) == ERROR_CLASS_TRANSIENT
+
+
+def test_portal_state_markers_are_matched_in_status_and_error():
+    assert classify_failure({'Status': 'Error subiendo archivo - COD 420101'}) == ERROR_CLASS_PORTAL_STATE
+    assert classify_failure({'Status': 'Error al procesar NDO.', 'Error': 'Modal de carga no visible'}) == ERROR_CLASS_PORTAL_STATE
+
+
+def test_unmatched_failures_fall_back_on_whether_there_was_an_exception():
+    assert classify_failure({'Status': 'Algo raro', 'Error': 'ValueError: x'}) == ERROR_CLASS_TRANSIENT
+    assert classify_failure({'Status': 'Algo raro'}) == ERROR_CLASS_PORTAL_STATE
+    assert classify_failure({}) == ERROR_CLASS_PORTAL_STATE
+
+
+def test_budget_per_error_class_is_enforced():
+    scheduler = RetryScheduler(budgets={ERROR_CLASS_TRANSIENT: 2, ERROR_CLASS_PERMANENT: 0}, backoff=NO_WAIT)
+
+    assert scheduler.schedule(0, 5, {'NDO': 1}, transient_failure(), 'started')[1] == 1
+    assert scheduler.schedule(0, 5, {'NDO': 1}, transient_failure(), 'started')[1] == 2
+    assert scheduler.schedule(0, 5, {'NDO': 1}, transient_failure(), 'started') == (ERROR_CLASS_TRANSIENT, None, None)
+    permanent = {'Status': 'URL de informe no encontrada - COD 1'}
+    assert scheduler.schedule(0, 6, {'NDO': 2}, permanent, 'matched') == (ERROR_CLASS_PERMANENT, None, None)
+
+
+def test_backoff_doubles_per_retry_up_to_the_cap():
+    scheduler = RetryScheduler(budgets={ERROR_CLASS_TRANSIENT: 10}, backoff={ERROR_CLASS_TRANSIENT: 100})
+
+    delays = [scheduler.schedule(0, 1, {}, transient_failure(), None)[2] for _ in range(4)]
+
+    assert delays == [100, 200, 400, RETRY_BACKOFF_MAX]
+
+
+def test_due_groups_retries_by_ndo_group_once_backoff_elapsed(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(retry_scheduler.time, 'monotonic', lambda: now[0])
+    scheduler = RetryScheduler(budgets={ERROR_CLASS_TRANSIENT: 3}, backoff={ERROR_CLASS_TRANSIENT: 20})
+    scheduler.schedule(4, 10, {'NDO': 7}, transient_failure(), 'started')
+    scheduler.schedule(4, 11, {'NDO': 7}, transient_failure(), 'started')
+    scheduler.schedule(5, 12, {'NDO': 8}, transient_failure(), 'started')
+
+    assert scheduler.due() == []
+    assert scheduler.pending() == 3
+    assert scheduler.queued(11) and not scheduler.queued(99)
+    assert scheduler.seconds_until_next() == 20
+
+    now[0] += 20
+    assert scheduler.due() == [(4, [(10, {'NDO': 7}), (11, {'NDO': 7})]), (5, [(12, {'NDO': 8})])]
+    assert scheduler.pending() == 0
+
+
+def test_report_counts_cases_under_their_first_failed_stage():
+    scheduler = RetryScheduler(budgets={ERROR_CLASS_TRANSIENT: 3}, backoff=NO_WAIT)
+    scheduler.schedule(0, 1, {}, transient_failure(), 'started')
+    scheduler.schedule(0, 1, {}, transient_failure(), 'uploading')
+    scheduler.schedule(0, 2, {}, transient_failure(), 'uploading')
+    scheduler.due()
+    scheduler.record_success(1)
+
+    report = {row['Metrica']: row['Valor'] for row in scheduler.report()}
+
+    assert report['Reintentos en búsqueda (casos / reintentos / exitosos / % éxito)'] == '1 / 1 / 1 / 100%'
+    assert report['Reintentos en carga (casos / reintentos / exitosos / % éxito)'] == '1 / 2 / 0 / 0%'
+
+
+def test_success_without_a_retry_is_not_counted():
+    scheduler = RetryScheduler()
+    scheduler.record_success(3)
+
+    assert scheduler.report() == []
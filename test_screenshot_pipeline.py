@@ -0,0 +1,52 @@
+import os
+import screenshot_pipeline
+from config import SCREENSHOT_FORMAT_JPEG
+from screenshot_pipeline import ScreenshotPipeline
+
+
+class FakePage:
+    def __init__(self, url, content=b"jpeg"):
+        self.url = url
+        self.content = content
+
+    def screenshot(self, type=None, quality=None):
+        return self.content
+
+
+def make_pipeline(tmp_path):
+    return ScreenshotPipeline(str(tmp_path), image_format=SCREENSHOT_FORMAT_JPEG)
+
+
+def test_first_capture_of_a_signature_is_written(tmp_path):
+    pipeline = make_pipeline(tmp_path)
+
+    path = pipeline.capture(FakePage("https://portal/bandeja"), "error_ndo_10")
+    pipeline.close()
+
+    assert os.path.dirname(path) == str(tmp_path)
+    assert os.path.exists(path)
+
+
+def test_rate_limited_capture_names_the_signature_instead_of_another_cases_file(tmp_path):
+    pipeline = make_pipeline(tmp_path)
+    first = pipeline.capture(FakePage("https://portal/bandeja", b"one"), "error_ndo_10")
+
+    second = pipeline.capture(FakePage("https://portal/bandeja", b"two"), "error_ndo_11")
+    pipeline.close()
+
+    assert second != first
+    assert second == "Captura omitida (mismo error capturado recientemente: error|/bandeja)"
+    assert pipeline.rate_limited == 1
+
+
+def test_identical_capture_names_the_signature_it_matched(tmp_path, monkeypatch):
+    monkeypatch.setattr(screenshot_pipeline, 'SCREENSHOT_SIGNATURE_INTERVAL', 0)
+    pipeline = make_pipeline(tmp_path)
+    pipeline.capture(FakePage("https://portal/bandeja"), "table_error_ndo_10")
+
+    note = pipeline.capture(FakePage("https://portal/bandeja"), "transmit_error_ndo_11")
+    pipeline.close()
+
+    assert note == "Captura omitida (idéntica a una captura anterior: table_error|/bandeja)"
+    assert pipeline.duplicates == 1
+    assert len(os.listdir(tmp_path)) == 1
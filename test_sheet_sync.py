@@ -0,0 +1,111 @@
+import os
+import pytest
+import sheet_sync
+from sheet_sync import SheetDeltaSync
+
+HEADER = ['NDO', 'CODIGO_PAMI', 'Procesado']
+
+
+class FakeSpreadsheet:
+    id = "spreadsheet-1"
+
+
+class FakeSheet:
+    title = "prestaciones_PAMI"
+    spreadsheet = FakeSpreadsheet()
+
+
+class FakeReader:
+    """Serves the projected columns of an in-memory sheet, from first_row on"""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.calls = []
+
+    def read(self, header_row, first_row=2):
+        self.calls.append(first_row)
+        rows = self.rows[first_row - 2:]
+        return header_row, {name: [row[index] for row in rows] for index, name in enumerate(header_row)}
+
+
+def make_rows(count):
+    return [[str(1000 + index), '420101', ''] for index in range(count)]
+
+
+@pytest.fixture
+def synced(tmp_path, monkeypatch):
+    """A sync whose cache holds 300 rows, and its reader"""
+    monkeypatch.setattr(sheet_sync, 'SHEETS_SYNC_REWIND_ROWS', 100)
+    reader = FakeReader(make_rows(300))
+    sync = SheetDeltaSync(FakeSheet(), reader, cache_file=os.path.join(tmp_path, "sheet_cache.json"))
+    sync.full_sync(HEADER, "1", "primera lectura")
+    reader.calls.clear()
+    return sync, reader
+
+
+def test_appended_rows_are_read_from_the_rewind_window(synced):
+    sync, reader = synced
+    reader.rows = make_rows(310)
+
+    columns = sync.delta_sync(HEADER, "2", sync.load_cache())
+
+    assert reader.calls == [202]
+    assert sync.last_sync_mode == "delta"
+    assert sync.rows_fetched == 110
+    assert columns['NDO'] == [row[0] for row in reader.rows]
+    assert sync.load_cache()['row_count'] == 310
+
+
+def test_edits_inside_the_rewind_window_are_merged(synced):
+    sync, reader = synced
+    reader.rows = make_rows(300)
+    reader.rows[250][2] = 'Si'
+
+    columns = sync.delta_sync(HEADER, "2", sync.load_cache())
+
+    assert sync.last_sync_mode == "delta"
+    assert columns['Procesado'][250] == 'Si'
+
+
+def test_deleted_rows_force_a_full_sync(synced):
+    sync, reader = synced
+    reader.rows = make_rows(299)
+
+    columns = sync.delta_sync(HEADER, "2", sync.load_cache())
+
+    assert reader.calls == [202, 2]
+    assert sync.last_sync_mode == "full"
+    assert len(columns['NDO']) == 299
+
+
+def test_too_many_changed_rewound_rows_force_a_full_sync(synced):
+    sync, reader = synced
+    reader.rows = make_rows(300)
+    reader.rows.insert(200, ['999', '180104', ''])
+
+    sync.delta_sync(HEADER, "2", sync.load_cache())
+
+    assert sync.last_sync_mode == "full"
+    assert sync.load_cache()['columns']['NDO'][200] == '999'
+
+
+def test_changed_ratio_at_the_limit_stays_incremental(synced, monkeypatch):
+    monkeypatch.setattr(sheet_sync, 'SHEETS_SYNC_MAX_CHANGED_RATIO', 0.5)
+    sync, reader = synced
+    reader.rows = make_rows(300)
+    for index in range(200, 250):
+        reader.rows[index][2] = 'No'
+
+    sync.delta_sync(HEADER, "2", sync.load_cache())
+
+    assert sync.last_sync_mode == "delta"
+
+
+def test_recorded_writes_update_the_cached_copy(synced):
+    sync, reader = synced
+    sync.record_write(5, 'Procesado', 'Si')
+    sync.close()
+
+    cache = sync.load_cache()
+    assert cache['columns']['Procesado'][3] == 'Si'
+    assert cache['row_hashes'][3] == SheetDeltaSync.row_hash(['1003', '420101', 'Si'])
@@ -1,6 +1,7 @@
 from browser_automation import BrowserAutomation
 from logger import AutomationLogger
 import json
+import time
 from config import *
 
 def test_google_sheets_connection():
@@ -38,6 +39,12 @@ def test_google_sheets_connection():
             for case in automation.already_processed_cases[:5]:  # Show first 5
                 print(f"  - NDO {case['NDO']} (COD {case['COD']}) - {case['APE']} {case['NOM']}")
         
+        # Second read reuses the cached client and worksheet handle
+        start = time.perf_counter()
+        automation.read_excel_data()
+        print(f"\nSegunda lectura (cliente en caché): {time.perf_counter() - start:.2f} s")
+        automation.stop_writeback()
+
         print(f"\nTest completado exitosamente!")
         return True
         
@@ -0,0 +1,68 @@
+import os
+import time
+import sheets_writer
+from sheets_writer import SheetsWriteBehind
+
+
+class FakeSpreadsheet:
+    id = "spreadsheet-1"
+
+
+class FakeSheet:
+    """Records batch sizes and fails the first `failures` calls"""
+    title = "prestaciones_PAMI"
+    spreadsheet = FakeSpreadsheet()
+
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.batches = []
+
+    def batch_update(self, updates, value_input_option=None):
+        self.batches.append(len(updates))
+        if self.failures:
+            self.failures -= 1
+            raise Exception("boom")
+
+
+def make_writer(tmp_path, sheet):
+    return SheetsWriteBehind(sheet, queue_file=os.path.join(tmp_path, "queue.json"))
+
+
+def test_flush_without_worker_writes_in_max_batch_chunks(tmp_path, monkeypatch):
+    monkeypatch.setattr(sheets_writer, 'SHEETS_WRITE_MAX_BATCH', 3)
+    sheet = FakeSheet()
+    writer = make_writer(tmp_path, sheet)
+    for row in range(7):
+        writer.enqueue(row + 2, 5, 'Si')
+
+    assert writer.flush()
+    assert sheet.batches == [3, 3, 1]
+    assert not os.path.exists(writer.queue_file)
+
+
+def test_flush_without_worker_stops_on_the_first_failed_chunk(tmp_path, monkeypatch):
+    monkeypatch.setattr(sheets_writer, 'SHEETS_WRITE_MAX_BATCH', 3)
+    sheet = FakeSheet(failures=1)
+    writer = make_writer(tmp_path, sheet)
+    for row in range(5):
+        writer.enqueue(row + 2, 5, 'Si')
+
+    assert not writer.flush()
+    assert sheet.batches == [3]
+    assert len(writer.pending) == 5
+
+
+def test_flush_cuts_the_retry_backoff_short(tmp_path):
+    sheet = FakeSheet(failures=1)
+    writer = make_writer(tmp_path, sheet)
+    writer.start()
+    writer.enqueue(2, 5, 'No')
+    writer.request_flush()
+    deadline = time.monotonic() + 2
+    while not writer.retry_count and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    started = time.monotonic()
+    assert writer.stop(timeout=5)
+    assert time.monotonic() - started < 1
+    assert sheet.batches == [1, 1]
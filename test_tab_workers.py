@@ -0,0 +1,39 @@
+from types import SimpleNamespace
+from config import ERROR_CLASS_PERMANENT, ERROR_CLASS_PORTAL_STATE, ERROR_CLASS_TRANSIENT
+from retry_scheduler import RetryScheduler
+from tab_workers import TabWorkerPool
+
+NO_WAIT = {ERROR_CLASS_TRANSIENT: 0, ERROR_CLASS_PORTAL_STATE: 0, ERROR_CLASS_PERMANENT: 0}
+FAILURE = {'Status': 'Error al procesar NDO.', 'Error': 'Timeout 30000ms exceeded'}
+
+
+def make_pool(retries_enabled=True):
+    automation = SimpleNamespace(settings_manager=None, stop_requested=False, retries_enabled=retries_enabled,
+                                 retry_scheduler=RetryScheduler(backoff=NO_WAIT))
+    return TabWorkerPool(automation, 2)
+
+
+def test_queued_groups_come_before_due_retries():
+    pool = make_pool()
+    pool.cases.put((0, [(0, {'NDO': '1'})], False))
+    pool.retry_scheduler.schedule(1, 1, {'NDO': '2'}, FAILURE, 'started')
+
+    assert pool.next_group() == (0, [(0, {'NDO': '1'})], False)
+    assert pool.next_group() == (1, [(1, {'NDO': '2'})], True)
+    assert pool.next_group() is None
+
+
+def test_tab_waits_for_a_pending_retry_instead_of_finishing():
+    pool = make_pool()
+    pool.retry_scheduler.backoff = {ERROR_CLASS_TRANSIENT: 0.1}
+    pool.retry_scheduler.schedule(0, 3, {'NDO': '4'}, FAILURE, 'started')
+
+    assert pool.next_group() == (0, [(3, {'NDO': '4'})], True)
+
+
+def test_retries_are_not_pulled_when_disabled():
+    pool = make_pool(retries_enabled=False)
+    pool.retry_scheduler.schedule(0, 3, {'NDO': '4'}, FAILURE, 'started')
+
+    assert pool.next_group() is None
+    assert pool.retry_scheduler.pending() == 1